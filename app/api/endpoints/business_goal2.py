@@ -2,7 +2,10 @@
 
 from fastapi import APIRouter, Body, HTTPException
 from ...services import business_goal_service2
+from ...core.rate_limit import UpstreamOverloaded
 from ...api.models.business_goal_model2 import BusinessGoalAnalysisRequest, BusinessGoalAnalysisResponse
+from ...utils.sse import sse_response
+from .context import resolve_request_context
 
 router = APIRouter()
 
@@ -26,15 +29,46 @@ async def analyze_goal_portfolio(
     """
     Accepts a list of business goals and strategic context, then returns a detailed portfolio analysis.
     Handles business validation errors gracefully by returning a 200 OK response with an error message in the payload.
+    Send `context_id` instead of `vision`/`strategic_themes`/`challenges` to reuse an uploaded context.
     """
+    request = await resolve_request_context(request, {
+        "vision": "vision",
+        "strategic_themes": "strategic_themes",
+        "challenges": "challenges"
+    })
     try:
         
         response = await business_goal_service2.analyze_business_goals(request)
         return response
 
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected internal server error occurred: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post(
+    "/analyze2/stream",
+    summary="Analyze Business Goal Portfolio (streaming)",
+    description="""
+    Server-Sent Events variant of /analyze2. Each `section` event carries one completed
+    top-level field of the analysis (`{"name": "alignment_summary", "value": ...}`) as soon
+    as the model has written it; the final `done` event carries the validated full response.
+    If the upstream call is shed (rate limit, overload or deadline), an `error` event with
+    `detail`, `status_code` and `retry_after` ends the stream instead.
+    """,
+    tags=["Business Goals"]
+)
+async def analyze_goal_portfolio_stream(
+    request: BusinessGoalAnalysisRequest = Body(..., example=BusinessGoalAnalysisRequest.Config.json_schema_extra["example"])
+):
+    request = await resolve_request_context(request, {
+        "vision": "vision",
+        "strategic_themes": "strategic_themes",
+        "challenges": "challenges"
+    })
+    return sse_response(business_goal_service2.stream_business_goal_analysis(request))
@@ -9,6 +9,16 @@ from app.api.models.challenge_model import (
     ChallengeRecommendationResponse
 )
 from app.services.challenge_risk_service import generate_challenge_recommendations
+from app.api.models.challenge_model import (
+    ChallengeBatchEvaluationRequest,
+    ChallengeBatchEvaluationResponse
+)
+from app.services.challenge_risk_service import evaluate_challenge_risk_batch
+from app.api.endpoints.context import resolve_request_context
+from app.core.rate_limit import UpstreamOverloaded
+
+# Request fields that may come from an uploaded context instead (request field -> context field)
+SWOT_TRENDS_CONTEXT_FIELDS = {"swot": "swot", "trends": "trends"}
 
 
 router = APIRouter()
@@ -78,7 +88,65 @@ async def assess_challenge_risk(request: ChallengeEvaluationRequest = Body(...,
     }
   })
 ):
-    return await evaluate_challenge_risk(request)
+    request = await resolve_request_context(request, SWOT_TRENDS_CONTEXT_FIELDS)
+    try:
+        return await evaluate_challenge_risk(request)
+    except UpstreamOverloaded:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error evaluating challenge: {str(e)}")
+
+@router.post(
+    "/evaluate-batch",
+    response_model=ChallengeBatchEvaluationResponse,
+    summary="Evaluate Risk Scores for Several Challenges",
+    tags=["Challenge Risk"]
+)
+async def assess_challenge_risk_batch(request: ChallengeBatchEvaluationRequest = Body(..., example={
+    "challenges": [
+        {
+            "title": "Inefficient Remote Work Infrastructure",
+            "category": "Operations",
+            "impact_on_business": "high",
+            "ability_to_address": "moderate",
+            "description": "The current tools and workflows are not optimized for hybrid work, leading to productivity loss."
+        },
+        {
+            "title": "Outdated IT Infrastructure",
+            "category": "Technology",
+            "impact_on_business": "high",
+            "ability_to_address": "low",
+            "description": "Legacy systems are slowing down operations."
+        }
+    ],
+    "swot": {
+        "strengths": ["Strong brand recognition in the market"],
+        "weaknesses": ["High operational costs due to legacy systems"],
+        "opportunities": ["New technology adoption could streamline operations"],
+        "threats": ["Increasing competition from new market entrants"]
+    },
+    "trends": {
+        "customer_insights": [
+            {"question": "What are the evolving needs and preferences of our target customers?", 
+             "answer": "Customers now prefer sustainable products and faster, personalized digital experiences.", 
+             "impact": "High"}
+        ]
+    }
+})):
+    """
+    Scores N challenges against one shared SWOT/trend context in a single request,
+    returning a risk score (or error) and the upstream latency for each challenge.
+    Send `context_id` instead of `swot`/`trends` to reuse an uploaded context.
+    """
+    request = await resolve_request_context(request, SWOT_TRENDS_CONTEXT_FIELDS)
+    try:
+        return await evaluate_challenge_risk_batch(request)
+    except UpstreamOverloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error evaluating challenges: {str(e)}")
 
 @router.post(
     "/recommendations",
@@ -155,7 +223,10 @@ async def recommend_for_challenges(request: ChallengeRecommendationRequest = Bod
         "on_the_radar": []
     }
 })):
+    request = await resolve_request_context(request, SWOT_TRENDS_CONTEXT_FIELDS)
     try:
         return await generate_challenge_recommendations(request)
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
\ No newline at end of file
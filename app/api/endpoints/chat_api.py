@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from app.services.chat_manager import ChatManager
 from app.api.models.chat_model import ChatbotRequest, ChatbotResponse
+from app.core.rate_limit import UpstreamOverloaded
+from app.utils.sse import sse_response
 import uuid
 
 router = APIRouter()
@@ -10,24 +12,63 @@ chat_manager = ChatManager()
 @router.post("/chatbot", response_model=ChatbotResponse)
 async def chatbot_endpoint(request: ChatbotRequest):
     try:
-        session_id = request.session_id if hasattr(request, 'session_id') else str(uuid.uuid4())
+        # Reuse the caller's session; a new ID is returned so the client can continue it
+        session_id = request.session_id or str(uuid.uuid4())
+        usage = {}
         
         response = await chat_manager.chat(
             user_id=session_id,
             prompt=request.message,
-            chat_history=request.history
+            chat_history=request.history,
+            usage=usage
         )
         
-        return ChatbotResponse(response=response)
+        return ChatbotResponse(response=response, session_id=session_id, prompt_tokens=usage.get("prompt_tokens"))
         
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/chatbot/stream")
+async def chatbot_stream_endpoint(request: ChatbotRequest):
+    """
+    Server-Sent Events variant of /chatbot. Each `token` event carries the next
+    chunk of the reply; the final `done` event carries the full response. If
+    the upstream call fails, an `error` event with `detail` and `status_code`
+    (plus `retry_after` when the call was shed locally) ends the stream
+    instead, and the turn is not saved to the session.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+
+    async def chat_events():
+        tokens = []
+        usage = {}
+        try:
+            async for token in chat_manager.stream_chat(
+                user_id=session_id,
+                prompt=request.message,
+                chat_history=request.history,
+                usage=usage
+            ):
+                tokens.append(token)
+                yield "token", {"token": token}
+        except UpstreamOverloaded as e:
+            yield "error", {"detail": str(e), "status_code": e.status_code, "retry_after": e.retry_after, "session_id": session_id}
+            return
+        except Exception as e:
+            yield "error", {"detail": f"Internal server error: {str(e)}", "status_code": 500, "session_id": session_id}
+            return
+
+        yield "done", {"response": "".join(tokens), "session_id": session_id, "prompt_tokens": usage.get("prompt_tokens")}
+
+    return sse_response(chat_events())
     
 @router.post("/chatbot/clear")
 async def clear_chat_history(session_id: str = None):
     try:
         session_id = session_id or str(uuid.uuid4())
-        success = chat_manager.clear_chat_history(session_id)
+        success = await chat_manager.clear_chat_history(session_id)
         return {"success": success, "message": "Chat history cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,88 @@
+# app/api/endpoints/context.py
+
+from typing import Dict, TypeVar
+from fastapi import APIRouter, Body, HTTPException
+from pydantic import BaseModel
+from app.api.models.context_model import ContextUploadRequest, ContextUploadResponse
+from app.memory.context_store import get_context_store
+
+router = APIRouter()
+
+RequestT = TypeVar("RequestT", bound=BaseModel)
+
+
+async def resolve_request_context(request: RequestT, fields: Dict[str, str]) -> RequestT:
+    """
+    Fills the request fields that were left out from the stored context named
+    by `request.context_id`. `fields` maps request field -> context field.
+
+    If the caller sent any of those fields inline, the returned copy drops
+    `context_id` so that prompt fragments cached for the stored context are
+    not reused for different content.
+    """
+    context_id = getattr(request, "context_id", None)
+    missing = [name for name in fields if getattr(request, name) is None]
+
+    if not context_id:
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing required fields: {', '.join(missing)} (or provide a context_id).")
+        return request
+
+    context = await get_context_store().get(context_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired context_id '{context_id}'. Please upload the context again.")
+
+    update = {}
+    for name in missing:
+        value = getattr(context, fields[name])
+        if value is None:
+            raise HTTPException(status_code=422, detail=f"Context '{context_id}' has no '{fields[name]}' and the request did not include '{name}'.")
+        update[name] = value
+
+    if len(missing) < len(fields):
+        update["context_id"] = None
+    return request.model_copy(update=update)
+
+
+@router.post("", response_model=ContextUploadResponse, summary="Upload a strategy context once and reference it by ID")
+async def upload_context(context: ContextUploadRequest = Body(..., example={
+    "vision": "To be the leading provider of agile and sustainable digital solutions in emerging markets.",
+    "swot": {
+        "strengths": ["Strong brand recognition in the market"],
+        "weaknesses": ["High operational costs due to legacy systems"],
+        "opportunities": ["New technology adoption could streamline operations"],
+        "threats": ["Increasing competition from new market entrants"]
+    },
+    "trends": {
+        "customer_insights": [
+            {"question": "What are the evolving needs and preferences of our target customers?",
+             "answer": "Customers now prefer sustainable products and faster, personalized digital experiences.",
+             "impact": "High"}
+        ]
+    }
+})):
+    """
+    Stores SWOT, trends, challenges, themes and/or the full strategy context on the
+    server. Later calls can send `context_id` instead of repeating these blobs.
+    Uploading identical content returns the same `context_id`.
+    """
+    store = get_context_store()
+    context_id, content_hash, size_bytes = await store.put(context)
+    return ContextUploadResponse(
+        context_id=context_id,
+        content_hash=content_hash,
+        size_bytes=size_bytes,
+        ttl_seconds=store.ttl_seconds
+    )
+
+@router.get("/{context_id}", response_model=ContextUploadRequest, response_model_exclude_none=True, summary="Fetch a stored strategy context")
+async def get_context(context_id: str):
+    context = await get_context_store().get(context_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired context_id '{context_id}'.")
+    return context
+
+@router.delete("/{context_id}", summary="Delete a stored strategy context")
+async def delete_context(context_id: str):
+    success = await get_context_store().delete(context_id)
+    return {"success": success, "message": "Context deleted" if success else "Context not found"}
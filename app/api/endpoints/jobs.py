@@ -0,0 +1,107 @@
+# app/api/endpoints/jobs.py
+
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import JSONResponse
+from app.api.models.business_goal_model2 import BusinessGoalAnalysisRequest
+from app.api.models.job_model import JobStatusResponse, JobSubmitResponse
+from app.api.models.strategic_theme2_model import CombinedAnalysisRequest
+from app.api.models.trend_summary_model import TrendDataInput
+from app.api.endpoints.context import resolve_request_context
+from app.core.jobs import JobQueueFull, get_job_queue
+from app.services import business_goal_service2, strategic_theme2_service, trend_summary_service
+
+router = APIRouter()
+
+# Suggested polling interval for clients, in seconds
+POLL_AFTER_SECONDS = 2
+
+
+async def _submit(request: Request, kind: str, handler, payload) -> JSONResponse:
+    try:
+        record = await get_job_queue().submit(kind, handler, payload)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many analyses are waiting ({e}) Please retry shortly.",
+            headers={"Retry-After": str(POLL_AFTER_SECONDS * 5)}
+        )
+    job_id = record["job_id"]
+    body = JobSubmitResponse(
+        job_id=job_id,
+        kind=kind,
+        status=record["status"],
+        status_url=str(request.url_for("get_job_status", job_id=job_id).path),
+        result_url=str(request.url_for("get_job_result", job_id=job_id).path)
+    )
+    return JSONResponse(
+        status_code=202,
+        content=body.model_dump(),
+        headers={"Location": body.status_url, "Retry-After": str(POLL_AFTER_SECONDS)}
+    )
+
+
+@router.post("/business-goal", response_model=JobSubmitResponse, status_code=202, summary="Queue a business goal portfolio analysis")
+async def submit_business_goal_job(
+    request: Request,
+    payload: BusinessGoalAnalysisRequest = Body(..., example=BusinessGoalAnalysisRequest.Config.json_schema_extra["example"])
+):
+    """
+    Same input as /api/business-goal/analyze2. Returns a job ID immediately;
+    poll the status URL and fetch the result once the job has finished.
+    """
+    payload = await resolve_request_context(payload, {
+        "vision": "vision",
+        "strategic_themes": "strategic_themes",
+        "challenges": "challenges"
+    })
+    return await _submit(request, "business_goal", business_goal_service2.analyze_business_goals, payload)
+
+
+@router.post("/trends", response_model=JobSubmitResponse, status_code=202, summary="Queue a trend summary analysis")
+async def submit_trends_job(request: Request, payload: TrendDataInput = Body(...)):
+    """Same input as /api/trends/analyze, run as a background job."""
+    return await _submit(request, "trends", trend_summary_service.generate_combined_summary_and_trends, payload)
+
+
+@router.post("/strategic-theme2", response_model=JobSubmitResponse, status_code=202, summary="Queue a combined strategic theme analysis")
+async def submit_strategic_theme2_job(request: Request, payload: CombinedAnalysisRequest = Body(...)):
+    """Same input as /api/strategic-theme2/combined-analysis, run as a background job."""
+    if not payload.themes:
+        raise HTTPException(status_code=422, detail="At least one strategic theme is required for the analysis.")
+    payload = await resolve_request_context(payload, {"context": "strategy"})
+    return await _submit(request, "strategic_theme2", strategic_theme2_service.generate_combined_analysis, payload)
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse, response_model_exclude={"result"}, summary="Status of a background job")
+async def get_job_status(job_id: str):
+    record = await get_job_queue().store.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job_id '{job_id}'.")
+    return record
+
+
+@router.get("/{job_id}/result", summary="Result of a finished background job")
+async def get_job_result(job_id: str):
+    """
+    200 with the analysis response once the job has succeeded, 202 while it
+    is still queued or running, 500 with the error if it failed, and 404 once
+    the result has expired.
+    """
+    record = await get_job_queue().store.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job_id '{job_id}'.")
+    if record["status"] in ("queued", "running"):
+        return JSONResponse(
+            status_code=202,
+            content=JobStatusResponse(**record).model_dump(exclude={"result"}),
+            headers={"Retry-After": str(POLL_AFTER_SECONDS)}
+        )
+    if record["status"] == "failed":
+        raise HTTPException(status_code=500, detail=record["error"])
+    return record["result"]
+
+
+@router.delete("/{job_id}", summary="Forget a background job and its result")
+async def delete_job(job_id: str):
+    success = await get_job_queue().store.delete(job_id)
+    return {"success": success, "message": "Job deleted" if success else "Job not found"}
@@ -0,0 +1,58 @@
+# app/api/endpoints/ops.py
+
+# The store stats and cache clearing below may hit SQLite (COUNT/SUM over a
+# table, DELETE), so they run in a worker thread like the stores' other calls.
+
+import asyncio
+from fastapi import APIRouter, Depends
+from app.core.llm_client import LLMGateway, get_llm_gateway
+from app.core import metrics, prompts
+from app.core.cache import get_response_cache, get_in_flight
+from app.core.jobs import get_job_queue
+from app.memory.context_store import get_context_store
+from app.memory.store import session_store
+from app.api.endpoints.chat_api import chat_manager
+
+router = APIRouter()
+
+@router.get("/llm", summary="Shared LLM gateway pool and request counters", tags=["Ops"])
+async def llm_gateway_stats(gateway: LLMGateway = Depends(get_llm_gateway)):
+    return await asyncio.to_thread(gateway.stats)
+
+@router.get("/metrics", summary="Snapshot of in-process metrics", tags=["Ops"])
+async def metrics_snapshot():
+    return metrics.snapshot()
+
+@router.get("/prompts", summary="Registered prompt templates with versions and sizes", tags=["Ops"])
+async def prompt_registry():
+    return prompts.snapshot()
+
+@router.get("/cache", summary="Response cache hit/miss/eviction counters", tags=["Ops"])
+async def cache_stats():
+    cache = get_response_cache()
+    stats = await asyncio.to_thread(cache.stats) if cache is not None else {"enabled": False}
+    stats["single_flight"] = get_in_flight().stats()
+    return stats
+
+@router.delete("/cache", summary="Drop every cached analysis response", tags=["Ops"])
+async def clear_cache():
+    cache = get_response_cache()
+    if cache is not None:
+        await asyncio.to_thread(cache.clear)
+    return {"success": True, "message": "Response cache cleared"}
+
+@router.get("/context-store", summary="Stored strategy contexts and prompt-fragment reuse", tags=["Ops"])
+async def context_store_stats():
+    return await asyncio.to_thread(get_context_store().stats)
+
+@router.get("/session-store", summary="Per-session state store size and evictions", tags=["Ops"])
+async def session_store_stats():
+    return await asyncio.to_thread(session_store.stats)
+
+@router.get("/chat-store", summary="Chat session store size and evictions", tags=["Ops"])
+async def chat_store_stats():
+    return await asyncio.to_thread(chat_manager.user_sessions.stats)
+
+@router.get("/jobs", summary="Background job queue depth, workers and outcomes", tags=["Ops"])
+async def job_queue_stats():
+    return await asyncio.to_thread(get_job_queue().stats)
@@ -3,6 +3,7 @@
 from fastapi import APIRouter, Body
 from app.services import strategic_theme2_service as service
 from app.api.models.strategic_theme2_model import CombinedAnalysisRequest, CombinedResponse
+from app.api.endpoints.context import resolve_request_context
  
 router = APIRouter()
  
@@ -99,9 +100,12 @@ async def analyze_combined(request: CombinedAnalysisRequest = Body(..., example=
     - **Goal Mapping**: Connects your themes to concrete, actionable business goals.
    
     If any part of the analysis fails, a top-level error message will be returned.
+    Send `context_id` instead of `context` to reuse an uploaded strategy context.
     """
     if not request.themes:
         return CombinedResponse(error="At least one strategic theme is required for the analysis.")
+
+    request = await resolve_request_context(request, {"context": "strategy"})
        
     response = await service.generate_combined_analysis(request)
     return response
\ No newline at end of file
@@ -3,6 +3,7 @@
 from fastapi import APIRouter, Body, HTTPException
 from app.api.models.swot_model import SWOTDataInput, SWOTAnalysisResponse
 from app.services import swot_service
+from app.core.rate_limit import UpstreamOverloaded
 
 router = APIRouter()
 
@@ -45,11 +46,13 @@ async def create_swot_analysis(
         
         return analysis
         
+    except UpstreamOverloaded:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+        
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while processing SWOT analysis: {str(e)}"
-        )
-        
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
\ No newline at end of file
+        )
\ No newline at end of file
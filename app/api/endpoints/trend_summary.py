@@ -3,6 +3,7 @@
 from fastapi import APIRouter, Body, HTTPException
 from app.api.models.trend_summary_model import TrendDataInput, TrendCombinedResponse
 from app.services import trend_summary_service
+from app.utils.sse import sse_response
 
 router = APIRouter()
 
@@ -54,4 +55,20 @@ async def analyze_trends(
     Accepts data from all 12 trend sections and returns a structured, three-part AI-generated summary.
     """
     response = await trend_summary_service.generate_combined_summary_and_trends(trend_data)
-    return response
\ No newline at end of file
+    return response
+
+
+@router.post(
+    "/analyze/stream",
+    summary="Generate Trend Summary & Top 3 Trends (streaming)",
+    tags=["Trends Analysis"]
+)
+async def analyze_trends_stream(trend_data: TrendDataInput = Body(...)):
+    """
+    Server-Sent Events variant of /analyze. Each `section` event carries one completed
+    top-level field (`summary`, `trend_synthesis`, ...) as soon as the model has written it;
+    the final `done` event carries the validated full response. If the upstream call is shed
+    (rate limit, overload or deadline), an `error` event with `detail`, `status_code` and
+    `retry_after` ends the stream instead.
+    """
+    return sse_response(trend_summary_service.stream_combined_summary_and_trends(trend_data))
@@ -30,11 +30,12 @@ class GoalItem(BaseModel):
 #  Main Request Model
 
 class BusinessGoalAnalysisRequest(BaseModel):
-    vision: str
-    strategic_themes: List[ThemeItem]
-    challenges: List[ScoredChallengeInput]
+    vision: Optional[str] = None
+    strategic_themes: Optional[List[ThemeItem]] = None
+    challenges: Optional[List[ScoredChallengeInput]] = None
     tone: Optional[Literal["coach", "advisor", "challenger"]] = "coach"
     goals: List[GoalItem]
+    context_id: Optional[str] = None  # uploaded context supplying vision/themes/challenges
 
     class Config:
         json_schema_extra = {
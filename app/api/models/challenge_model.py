@@ -1,7 +1,7 @@
 # app/api/models/challenge_model.py
 
-from pydantic import BaseModel
-from typing import Literal
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 from app.api.models.trend_summary_model import TrendDataInput
 from app.api.models.swot_model import SWOTDataInput
 from typing import List
@@ -18,16 +18,41 @@ class ScoredChallengeInput(ChallengeInput):
 
 class ChallengeEvaluationRequest(BaseModel):
     challenge: ChallengeInput
-    swot: SWOTDataInput
-    trends: TrendDataInput
+    swot: Optional[SWOTDataInput] = None
+    trends: Optional[TrendDataInput] = None
+    context_id: Optional[str] = None  # uploaded context supplying swot/trends
 
 class ChallengeRiskScoreResponse(BaseModel):
     risk_score: int  
 
+class ChallengeBatchEvaluationRequest(BaseModel):
+    challenges: List[ChallengeInput] = Field(..., min_length=1)
+    swot: Optional[SWOTDataInput] = None
+    trends: Optional[TrendDataInput] = None
+    context_id: Optional[str] = None
+
+class ChallengeBatchScore(BaseModel):
+    title: str
+    risk_score: Optional[int] = None
+    latency_ms: float
+    error: Optional[str] = None
+
+class ChallengeBatchEvaluationResponse(BaseModel):
+    results: List[ChallengeBatchScore]
+    total_latency_ms: float
+
 class ChallengeRecommendationRequest(BaseModel):
     challenges: List[ScoredChallengeInput] 
-    swot: SWOTDataInput
-    trends: TrendDataInput
+    swot: Optional[SWOTDataInput] = None
+    trends: Optional[TrendDataInput] = None
+    context_id: Optional[str] = None
 
 class ChallengeRecommendationResponse(BaseModel):
-    recommendations: str
\ No newline at end of file
+    recommendations: str
+
+# Structured outputs requested from the model
+class RiskScoreModelOutput(BaseModel):
+    risk_score: Optional[int] = Field(None, ge=1, le=100, description="1-100, or null if the challenge is unclear or insufficient.")
+
+class RecommendationsModelOutput(BaseModel):
+    recommendations: List[str]
@@ -11,4 +11,6 @@ class ChatbotRequest(BaseModel):
     history: Optional[List[Dict]] = []
 
 class ChatbotResponse(BaseModel):
-    response: str
\ No newline at end of file
+    response: str
+    session_id: Optional[str] = None
+    prompt_tokens: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,24 @@
+# app/api/models/context_model.py
+
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.api.models.swot_model import SWOTDataInput
+from app.api.models.trend_summary_model import TrendDataInput
+from app.api.models.strategic_theme2_model import ScoredChallengeInput, StrategyContext, ThemeItem
+
+# Request validation: a strategy context uploaded once and referenced by ID
+class ContextUploadRequest(BaseModel):
+    vision: Optional[str] = None
+    swot: Optional[SWOTDataInput] = None
+    trends: Optional[TrendDataInput] = None
+    challenges: Optional[List[ScoredChallengeInput]] = None
+    strategic_themes: Optional[List[ThemeItem]] = None
+    strategy: Optional[StrategyContext] = Field(
+        None, description="Full strategy context used by the strategic-theme analysis."
+    )
+
+class ContextUploadResponse(BaseModel):
+    context_id: str
+    content_hash: str
+    size_bytes: int
+    ttl_seconds: Optional[float] = None
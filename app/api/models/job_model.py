@@ -0,0 +1,23 @@
+# app/api/models/job_model.py
+
+from pydantic import BaseModel, Field
+from typing import Any, Literal, Optional
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: JobStatus
+    status_url: str
+    result_url: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: JobStatus
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Any] = Field(None, description="The analysis response, once the job has finished.")
@@ -47,8 +47,9 @@ class StrategyContext(BaseModel):
 #  Main Request Model 
 class CombinedAnalysisRequest(BaseModel):
     themes: List[ThemeItem]
-    context: StrategyContext
+    context: Optional[StrategyContext] = None
     tone: Optional[str] = "coach"
+    context_id: Optional[str] = None  # uploaded context supplying `context`
  
 #  Individual Request Models
 class GapDetectionRequest(BaseModel):
@@ -25,4 +25,21 @@ class SWOTRecommendation(BaseModel):
 # Response validation
 class SWOTAnalysisResponse(BaseModel):
     scores: SWOTScore
-    recommendations: SWOTRecommendation
\ No newline at end of file
+    recommendations: SWOTRecommendation
+
+# Structured output requested from the model (converted to SWOTAnalysisResponse)
+class SWOTCategoryScores(BaseModel):
+    strengths: float
+    weaknesses: float
+    opportunities: float
+    threats: float
+
+class SWOTCategoryRecommendations(BaseModel):
+    strengths: List[str]
+    weaknesses: List[str]
+    opportunities: List[str]
+    threats: List[str]
+
+class SWOTModelOutput(BaseModel):
+    scores: SWOTCategoryScores
+    recommendations: SWOTCategoryRecommendations
@@ -51,4 +51,25 @@ class TrendCombinedResponse(BaseModel):
     analyst_recommendations: Optional[str] = None
     radar_executive_summary: Optional[List[str]] = []
     radar_recommendation: Optional[List[str]] = []
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+# Structured outputs requested from the model (converted to TrendCombinedResponse)
+class TrendSummarySection(BaseModel):
+    key_opportunities: str
+    strengths: str
+    significant_risks: str
+    challenges: str
+    strategic_recommendations: str
+
+class TrendModelOutput(BaseModel):
+    # First, so a stream can send the summary with its irrelevant answers as soon as it is written
+    irrelevant_answers: List[str]
+    summary: TrendSummarySection
+    trend_synthesis: List[str]
+    early_warnings: str
+    strategic_opportunities: List[str]
+    analyst_recommendations: str
+
+class RadarModelOutput(BaseModel):
+    summary: List[str]
+    recommendations: List[str]
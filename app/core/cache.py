@@ -0,0 +1,186 @@
+# app/core/cache.py
+
+# Content-addressed cache for analysis responses. Identical inputs (same
+# Pydantic payload, model, tone and prompt version) hash to the same key, so
+# a Streamlit rerun or a double click is served without a new LLM call, and
+# identical requests that arrive while the first is still running share it.
+#
+# Tier 1 is an in-process LRU with TTL; tier 2 is an optional SQLite file
+# (CACHE_SQLITE_PATH) that survives restarts and is shared between workers.
+
+import asyncio
+import functools
+import hashlib
+import json
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from . import profiling
+from .config import settings
+from .request_context import cache_bypass
+from .singleflight import SingleFlight
+from ..memory.backends import MemoryBackend, SQLiteBackend
+
+# Set by a service when it fell back to a default/error response that must not be cached
+_uncacheable: ContextVar[bool] = ContextVar("uncacheable", default=False)
+
+
+def mark_uncacheable() -> None:
+    """Tells the surrounding @cached_response not to store the current result."""
+    _uncacheable.set(True)
+
+
+def canonical_hash(payload: BaseModel, **parts: Any) -> str:
+    """Stable SHA-256 of a Pydantic payload plus any extra key parts."""
+    document = {"input": payload.model_dump(mode="json"), **parts}
+    encoded = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, sqlite_path: Optional[str] = None):
+        self.memory = MemoryBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.disk = SQLiteBackend(sqlite_path, table="response_cache", ttl_seconds=ttl_seconds) if sqlite_path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypassed = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.stores += 1
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "bypassed": self.bypassed,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Returns the process-wide response cache, or None when caching is disabled."""
+    global _response_cache
+    if not settings.CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.CACHE_TTL_SECONDS,
+            sqlite_path=settings.CACHE_SQLITE_PATH,
+        )
+    return _response_cache
+
+
+_in_flight = SingleFlight()
+
+
+def get_in_flight() -> SingleFlight:
+    return _in_flight
+
+
+def cached_response(namespace: str, response_model: Type[BaseModel], model: str, prompt_version: str = "1"):
+    """
+    Caches an async service function whose first argument is its Pydantic
+    request. Only results that are instances of `response_model` without an
+    `error` are stored; error dicts and fallbacks always go to the LLM again.
+
+    Concurrent calls with the same key that miss the cache are coalesced
+    into a single upstream call. `func.cache_lookup(request)` and
+    `func.cache_store(request, result)` expose the same cache entry to code
+    that produces the response another way, e.g. by streaming it.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        def key_for(request: BaseModel) -> str:
+            return canonical_hash(
+                request,
+                namespace=namespace,
+                model=model,
+                tone=getattr(request, "tone", None),
+                prompt_version=prompt_version,
+            )
+
+        async def lookup(key: str) -> Optional[BaseModel]:
+            cache = get_response_cache()
+            if cache is None:
+                return None
+            if cache_bypass.get():
+                cache.bypassed += 1
+                return None
+            cached = await cache.get(key)
+            return response_model.model_validate_json(cached) if cached is not None else None
+
+        async def store(key: str, result: Any) -> None:
+            cache = get_response_cache()
+            if (
+                cache is not None
+                and isinstance(result, response_model)
+                and not getattr(result, "error", None)
+                and not _uncacheable.get()
+            ):
+                await cache.set(key, result.model_dump_json())
+
+        async def cache_lookup(request: BaseModel) -> Optional[BaseModel]:
+            """The cached response for `request`, or None on a miss, a bypass or with caching disabled."""
+            return await lookup(key_for(request))
+
+        async def cache_store(request: BaseModel, result: Any) -> None:
+            """Stores `result` for `request` if it is an error-free `response_model`."""
+            await store(key_for(request), result)
+
+        @functools.wraps(func)
+        async def wrapper(request: BaseModel, *args, **kwargs):
+            with profiling.stage("cache"):
+                key = key_for(request)
+                cached = await lookup(key)
+            if cached is not None:
+                return cached
+
+            async def compute():
+                _uncacheable.set(False)
+                result = await func(request, *args, **kwargs)
+                await store(key, result)
+                return result
+
+            # Profiled under the namespace, for the calls that share a leader's result too
+            with profiling.stage(namespace):
+                return await _in_flight.do(key, compute)
+
+        # Streaming variants compute the response themselves but share the cache
+        wrapper.cache_lookup = cache_lookup
+        wrapper.cache_store = cache_store
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+# app/core/cassette.py
+
+# Record/replay of upstream LLM traffic, for deterministic reruns in
+# regression and performance tests. The cassette sits under the gateway as
+# its HTTP transport, so it sees plain and streamed calls alike.
+#
+# - record: every call goes upstream as usual; each successful response is
+#   stored with its chunk timing under a hash of the canonical request.
+# - replay: calls are answered from the store with the recorded timing
+#   scaled by LLM_CASSETTE_TIME_SCALE (0 = instant) and nothing is sent
+#   upstream. A request that was never recorded gets a 404, which the
+#   resilience layer does not retry.
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+from . import metrics
+from .config import settings
+from ..memory.cassette_store import CassetteEntry, CassetteStore, ChunkTiming, build_cassette_store, request_key
+
+CASSETTE_CALLS = metrics.counter("llm_cassette_calls_total", "Upstream calls seen by the cassette, by mode and outcome (recorded, hit, miss)")
+
+# Response headers kept in a recording; the rest are provider bookkeeping
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes the upstream body through and stores it once it has been read to the end."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, started: float, headers_after: float, on_complete):
+        self._stream = stream
+        self._started = started
+        self._headers_after = headers_after
+        self._on_complete = on_complete
+        self._chunks: List[bytes] = []
+        self._timings: List[ChunkTiming] = []
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._chunks.append(chunk)
+            self._timings.append((time.monotonic() - self._started, len(chunk)))
+            yield chunk
+        # Only complete bodies are recorded; a stream abandoned midway is not
+        await self._on_complete(b"".join(self._chunks), self._headers_after, self._timings)
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    """Yields a recorded body in its original chunks, spaced as they originally arrived."""
+
+    def __init__(self, entry: CassetteEntry, time_scale: float):
+        self._entry = entry
+        self._time_scale = time_scale
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        body = self._entry.body
+        position = 0
+        previous = self._entry.headers_after
+        for offset, length in self._entry.chunks:
+            if self._time_scale:
+                await asyncio.sleep(max(0.0, offset - previous) * self._time_scale)
+            previous = offset
+            yield body[position:position + length]
+            position += length
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, store: CassetteStore, mode: str, time_scale: float = 1.0):
+        self.inner = inner
+        self.store = store
+        self.mode = mode
+        self.time_scale = time_scale
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key(request.method, request.url.path, body)
+        if self.mode == "replay":
+            return await self._replay(key)
+        return await self._record(key, request, body)
+
+    async def _replay(self, key: str) -> httpx.Response:
+        entry = await self.store.get(key)
+        if entry is None:
+            self.misses += 1
+            CASSETTE_CALLS.inc(mode=self.mode, outcome="miss")
+            return httpx.Response(404, json={"error": {
+                "message": "No recorded response for this request in the LLM cassette.",
+                "type": "cassette_miss", "code": None,
+            }})
+        self.hits += 1
+        CASSETTE_CALLS.inc(mode=self.mode, outcome="hit")
+        if self.time_scale:
+            await asyncio.sleep(entry.headers_after * self.time_scale)
+        return httpx.Response(entry.status_code, headers=entry.headers, stream=_ReplayStream(entry, self.time_scale))
+
+    async def _record(self, key: str, request: httpx.Request, body: bytes) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        if response.status_code >= 400:
+            # Errors are not recorded, so a retried call is stored by its successful take
+            return response
+
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+
+        async def store(content: bytes, headers_after: float, chunks: List[ChunkTiming]) -> None:
+            entry = CassetteEntry(response.status_code, headers, content, headers_after, chunks, _request_model(body))
+            await self.store.put(key, entry)
+            self.recorded += 1
+            CASSETTE_CALLS.inc(mode=self.mode, outcome="recorded")
+
+        response.stream = _RecordingStream(response.stream, started, time.monotonic() - started, store)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "time_scale": self.time_scale,
+            "recorded": self.recorded,
+            "hits": self.hits,
+            "misses": self.misses,
+            "store": self.store.stats(),
+        }
+
+
+def _request_model(body: bytes) -> Optional[str]:
+    try:
+        return json.loads(body).get("model")
+    except (ValueError, AttributeError):
+        return None
+
+
+def build_cassette_transport(inner: httpx.AsyncBaseTransport) -> Optional[CassetteTransport]:
+    """Wraps `inner` in a cassette when LLM_CASSETTE_MODE is set; otherwise returns None."""
+    if not settings.LLM_CASSETTE_MODE:
+        return None
+    return CassetteTransport(inner, build_cassette_store(), settings.LLM_CASSETTE_MODE, settings.LLM_CASSETTE_TIME_SCALE)
@@ -1,5 +1,6 @@
 # app/core/config.py
 
+from typing import Dict, Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +8,119 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str
     GROQ_API_KEY: str
 
+    # Shared LLM gateway: HTTP connection pool and timeouts (seconds)
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_REQUEST_TIMEOUT: float = 120.0
+
+    # Upstream resilience: jittered retries on transient errors (the SDK's own
+    # retries are off), optional hedging past the p95 latency, and a circuit breaker
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Upstream admission control per model: requests/min, tokens/min and
+    # concurrent calls. RPM and TPM default to OpenAI's published limits for the
+    # account's LLM_USAGE_TIER (OPENAI_TIER_LIMITS in app/core/rate_limit.py);
+    # LLM_RATE_LIMITS overrides them per model (JSON in the environment, e.g.
+    # {"gpt-4o": {"tpm": 800000, "concurrency": 64}}). Calls that cannot be
+    # admitted within LLM_QUEUE_MAX_WAIT_SECONDS are shed with 429/503.
+    LLM_LIMITS_ENABLED: bool = True
+    LLM_USAGE_TIER: Literal[1, 2, 3, 4, 5] = 2
+    LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "gpt-4o": {"concurrency": 32},
+        "gpt-4o-mini": {"concurrency": 32},
+        # The chatbot's model. At tier 2 its 40k TPM covers about 14 chat turns a
+        # minute that fill the history budget (~2.9k tokens with the completion
+        # allowance), i.e. a handful in flight at gpt-4's latency; more slots
+        # would only empty the bucket faster. Raise both with the tier.
+        "gpt-4": {"concurrency": 8},
+    }
+    LLM_DEFAULT_RPM: int = 500
+    LLM_DEFAULT_TPM: int = 30000
+    LLM_DEFAULT_CONCURRENCY: int = 16
+    LLM_QUEUE_MAX_WAIT_SECONDS: float = 15.0
+    LLM_QUEUE_MAX_WAITERS: int = 256
+    # Completion allowance counted against TPM when a call sets no max_tokens
+    LLM_DEFAULT_COMPLETION_TOKENS: int = 1024
+
+    # USD per million tokens, for the llm_cost_usd_total metric ("cached_input"
+    # defaults to "input"); models missing here are not costed
+    LLM_PRICES_PER_MILLION_TOKENS: Dict[str, Dict[str, float]] = {
+        "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+        "gpt-4": {"input": 30.00, "output": 60.00},
+    }
+
+    # Record/replay of upstream LLM calls for deterministic test reruns: "record" stores
+    # every successful call under a hash of its request, "replay" answers from the
+    # store without calling out, at the recorded timing times LLM_CASSETTE_TIME_SCALE (0 = instant)
+    LLM_CASSETTE_MODE: Optional[Literal["record", "replay"]] = None
+    LLM_CASSETTE_PATH: str = "llm_cassette.db"
+    LLM_CASSETTE_TIME_SCALE: float = 1.0
+
+    # Opt-in profiling: stage timings in a Server-Timing header for requests sent with
+    # X-Profile: 1 (if PROFILING_HEADER_ENABLED) or sampled at PROFILING_SAMPLE_RATE (0-1).
+    # With PROFILING_DUMP_DIR set, those requests also write a cProfile dump (.prof) there.
+    PROFILING_HEADER_ENABLED: bool = True
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_DUMP_DIR: Optional[str] = None
+
+    # Local pre-check of free-text inputs (app/core/input_check.py): empty and obviously
+    # garbled inputs are refused without an upstream call. With INPUT_CHECK_TRUST_VALID,
+    # inputs the check is confident about also tell the LLM to skip its own validation
+    # (which is the only thing that catches jokes and off-topic statements).
+    INPUT_CHECK_ENABLED: bool = True
+    INPUT_CHECK_TRUST_VALID: bool = False
+
+    # Per-request deadline for upstream calls; clients may set their own with
+    # X-Request-Timeout (seconds), up to REQUEST_MAX_TIMEOUT_SECONDS. None = no deadline.
+    REQUEST_TIMEOUT_SECONDS: Optional[float] = None
+    REQUEST_MAX_TIMEOUT_SECONDS: float = 600.0
+
+    # Response cache: in-memory LRU with TTL, plus an optional SQLite tier
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 512
+    CACHE_TTL_SECONDS: float = 3600.0
+    CACHE_SQLITE_PATH: Optional[str] = None
+
+    # Server-side strategy contexts referenced by context_id
+    CONTEXT_STORE_MAX_ENTRIES: int = 256
+    CONTEXT_STORE_TTL_SECONDS: float = 86400.0
+    CONTEXT_STORE_SQLITE_PATH: Optional[str] = None
+
+    # Per-session server-side state ("memory" per worker, "sqlite" shared across workers)
+    SESSION_STORE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    SESSION_STORE_SQLITE_PATH: str = "session_store.db"
+    SESSION_STORE_MAX_ENTRIES: int = 10000
+    SESSION_STORE_TTL_SECONDS: float = 6 * 3600.0
+
+    # Chatbot history ("memory" per worker, "sqlite" shared across workers)
+    CHAT_STORE_BACKEND: Literal["memory", "sqlite"] = "memory"
+    CHAT_STORE_SQLITE_PATH: str = "chat_sessions.db"
+    CHAT_STORE_MAX_SESSIONS: int = 10000
+    CHAT_STORE_MAX_BYTES: int = 32 * 1024 * 1024
+    CHAT_STORE_IDLE_TTL_SECONDS: float = 2 * 3600.0
+    CHAT_HISTORY_MAX_MESSAGES: int = 20
+    # Token budget for verbatim history; older turns are folded into a rolling summary
+    CHAT_HISTORY_TOKEN_BUDGET: int = 1500
+    CHAT_SUMMARY_MAX_TOKENS: int = 250
+
+    # Background jobs for long-running analyses (submit, then poll for the result)
+    JOBS_WORKERS: int = 4
+    JOBS_MAX_QUEUED: int = 100
+    JOBS_TIMEOUT_SECONDS: float = 300.0
+    JOBS_RESULT_TTL_SECONDS: float = 3600.0
+    JOBS_MAX_ENTRIES: int = 1000
+    JOBS_SQLITE_PATH: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
@@ -1,23 +1,38 @@
-# backend/core.py
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
+# app/core/core.py
+from typing import AsyncIterator, Dict, List
+from app.core.llm_client import get_llm_gateway
+from app.core.rate_limit import UpstreamOverloaded
 
 class AIService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.model = "gpt-4"  
-    
-    async def generate_response(self, prompt: str) -> str:
+        self.model = "gpt-4"
+        self.max_tokens = 500
+        self.temperature = 0.5
+
+    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
         try:
-            response = self.client.chat.completions.create(
+            response = await get_llm_gateway().chat_completion(
                 model=self.model,
-                messages=[{"role": "system", "content": prompt}],  
-                max_tokens=500,  
-                temperature=0.5
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
             )
             return response.choices[0].message.content
+        except UpstreamOverloaded:
+            raise
         except Exception as e:
-            return f"Sorry, I encountered an error: {str(e)}"
\ No newline at end of file
+            return f"Sorry, I encountered an error: {str(e)}"
+
+    async def stream_response(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Yields the response token by token as the model produces it. Errors,
+        UpstreamOverloaded included, propagate: once tokens have been sent an
+        apology cannot replace the reply, so the caller reports the failure.
+        """
+        async for token in get_llm_gateway().stream_chat_completion(
+            model=self.model,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
+        ):
+            yield token
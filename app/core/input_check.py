@@ -0,0 +1,191 @@
+# app/core/input_check.py
+
+# Local pre-check of the free text users type (vision statements, goals,
+# themes, capabilities), run before the services call the LLM. Prompts that
+# validate their input would otherwise spend a full gpt-4o round trip on
+# empty fields or keyboard mashing just to answer `"is_valid": false`.
+#
+# Each text gets one of three verdicts:
+#
+# - invalid: empty, no words, one character repeated, a keyboard run, or
+#   letters that do not read as words. The service answers with its usual
+#   error response and makes no upstream call.
+# - valid: at least four distinct words, a fair share of them common
+#   English words, with letter sequences that read as English. With
+#   INPUT_CHECK_TRUST_VALID the prompt is told to skip its own validation
+#   step; otherwise the LLM still judges (it alone can tell a joke or an
+#   off-topic statement).
+# - uncertain: everything else, including other scripts and languages and
+#   any text with acronyms or codes (B2B, KPI, Q4), is left to the LLM as
+#   before.
+#
+# The "reads as English" score comes from a character-bigram model trained at
+# import time on the word list below: the mean log-probability of a word's
+# letter pairs, relative to chance. Words score well above zero, random
+# letters near or below it. Checking a text takes microseconds.
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from . import metrics
+from .config import settings
+
+INPUT_CHECKS = metrics.counter("input_checks_total", "Local input pre-checks, by service and verdict (invalid, valid, uncertain)")
+
+# Appended to the prompt's per-request system message when a confident local
+# check lets the LLM skip validation
+TRUSTED_INPUT_NOTE = (
+    "The input has already been validated as a genuine, relevant business input. "
+    "Skip input validation: mark the input as valid and go straight to the analysis."
+)
+
+LEXICON = frozenset("""
+    a about above across after again against all also an and any are around as at be because been before
+    being below best better between both build but by can create customer customers deliver do does drive
+    during each every for from get give grow growth have help high how if in into is it its join keep
+    lead leading less local long make many market markets more most much new no not of on once one only
+    or other our out over own people provide quality reach same serve service services should so some
+    such than that the their them then there these they this those through to under up us use value very
+    want was we well were what when where which while who will with within without world would year years
+    you your
+
+    ability access account achieve action adoption agile analysis analytics approach areas automation
+    awareness brand business capabilities capability capacity change channel channels client clients
+    cloud collaboration commerce communities community company competitive compliance connect cost costs
+    culture data design development digital distribution diversity efficiency employee employees
+    empower engagement enhance enterprise environment excellence expand expansion experience experiences
+    finance financial focus future global goal goals governance health impact improve improvement
+    inclusive industry information infrastructure innovation innovative insight insights integrate
+    investment leader leaders leadership learning management manufacturing marketing members mission
+    model modern network offering offerings operational operations opportunities opportunity
+    organisation organization partner partners partnership partnerships performance planning platform
+    platforms portfolio practices price pricing process processes product products productivity
+    program programs purpose recruitment regional regulatory reliable reputation research resilience
+    resilient resources retail retention revenue risk risks safety sales scale secure security share
+    skills smart social software solution solutions strategic strategy strengthen supply support
+    sustainable sustainability systems talent team teams technology technologies training
+    transformation transparent trust trusted vision workforce
+""".split())
+
+# Rows and runs that keyboard mashing produces
+_KEYBOARD_RUNS = ("qwertyuiop", "asdfghjkl", "zxcvbnm", "abcdefghijklmnopqrstuvwxyz")
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+# Calibrated on the word list: English words score about 0.3 to 1.3, mashing below 0
+_UNREADABLE_WORD_SCORE = -0.1
+_TRUSTED_TEXT_SCORE = 0.4
+
+
+class InputVerdict(NamedTuple):
+    status: str  # "invalid", "valid" or "uncertain"
+    score: float  # mean bigram log-probability over chance; higher reads more like English
+    reason: Optional[str] = None
+
+    @property
+    def rejected(self) -> bool:
+        return self.status == "invalid" and settings.INPUT_CHECK_ENABLED
+
+    @property
+    def trusted(self) -> bool:
+        return self.status == "valid" and settings.INPUT_CHECK_ENABLED and settings.INPUT_CHECK_TRUST_VALID
+
+
+def _train_bigrams(words: Iterable[str]) -> Dict[str, float]:
+    """Log-probability of each letter pair ("^" and "$" mark word edges), relative to chance, add-one smoothed."""
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    counts: Counter = Counter()
+    for word in words:
+        padded = f"^{word}$"
+        counts.update(padded[i:i + 2] for i in range(len(padded) - 1))
+    firsts = "^" + alphabet
+    seconds = alphabet + "$"
+    totals = {first: sum(counts[first + second] for second in seconds) + len(seconds) for first in firsts}
+    chance = math.log(1 / len(seconds))
+    return {
+        first + second: math.log((counts[first + second] + 1) / totals[first]) - chance
+        for first in firsts for second in seconds
+    }
+
+
+_BIGRAMS = _train_bigrams(LEXICON)
+
+
+def _word_score(word: str) -> float:
+    padded = f"^{word}$"
+    pairs = [padded[i:i + 2] for i in range(len(padded) - 1)]
+    return sum(_BIGRAMS.get(pair, 0.0) for pair in pairs) / len(pairs)
+
+
+def _is_keyboard_run(word: str) -> bool:
+    return len(word) >= 4 and any(word in run or word in run[::-1] for run in _KEYBOARD_RUNS)
+
+
+def _is_code(token: str) -> bool:
+    """Acronyms and codes (B2B, KPI, Q4): letters the bigram model cannot judge."""
+    return any(char.isdigit() for char in token) or (len(token) > 1 and token.isupper())
+
+
+def check_text(text: Optional[str]) -> InputVerdict:
+    """The verdict on one free-text field."""
+    text = (text or "").strip()
+    if not text:
+        return InputVerdict("invalid", 0.0, "The input is empty.")
+    all_letters = "".join(char for char in text.lower() if char.isalpha())
+    if not all_letters:
+        return InputVerdict("invalid", 0.0, "The input contains no words.")
+    if len(all_letters) >= 6 and Counter(all_letters).most_common(1)[0][1] / len(all_letters) > 0.6:
+        return InputVerdict("invalid", 0.0, "The input is one character repeated.")
+    if not all_letters.isascii():
+        # Other scripts and accented languages are beyond the model below
+        return InputVerdict("uncertain", 0.0)
+
+    # Plain numbers are ignored; acronyms and codes are left out of the
+    # scoring and keep the text from being rejected or trusted
+    tokens = [token for token in _TOKEN.findall(text) if not token.isdigit()]
+    words = [token.lower() for token in tokens if not _is_code(token)]
+    has_codes = len(words) < len(tokens)
+    if not words:
+        return InputVerdict("uncertain", 0.0)
+    letters = "".join(words)
+
+    scores = [_word_score(word) for word in words]
+    score = sum(word_score * len(word) for word_score, word in zip(scores, words)) / len(letters)
+    known = sum(word in LEXICON for word in words) / len(words)
+    if has_codes:
+        return InputVerdict("uncertain", score)
+    if any(_is_keyboard_run(word) for word in words) and all(_is_keyboard_run(word) or len(word) < 3 for word in words):
+        return InputVerdict("invalid", score, "The input is a run of keyboard keys, not text.")
+
+    # Letters in words that do not read as English; a single short word is
+    # left to the LLM, since names and jargon can score as low as mashing
+    unreadable = sum(
+        len(word) for word_score, word in zip(scores, words)
+        if word_score < _UNREADABLE_WORD_SCORE or _is_keyboard_run(word)
+    )
+    if known == 0 and unreadable / len(letters) >= 0.6 and (len(words) >= 2 or len(letters) >= 7):
+        return InputVerdict("invalid", score, "The input looks like random characters rather than words.")
+    if len(set(words)) >= 4 and known >= 0.3 and score >= _TRUSTED_TEXT_SCORE:
+        return InputVerdict("valid", score)
+    return InputVerdict("uncertain", score)
+
+
+def check_inputs(service: str, texts: Iterable[Optional[str]]) -> InputVerdict:
+    """
+    The combined verdict on a request's free-text fields: invalid if any is
+    invalid (with that field's reason), valid if all are, else uncertain.
+    Counted by service.
+    """
+    verdicts: List[InputVerdict] = [check_text(text) for text in texts]
+    rejected = next((verdict for verdict in verdicts if verdict.status == "invalid"), None)
+    score = min((verdict.score for verdict in verdicts), default=0.0)
+    if rejected is not None:
+        verdict = rejected
+    elif verdicts and all(verdict.status == "valid" for verdict in verdicts):
+        verdict = InputVerdict("valid", score)
+    else:
+        verdict = InputVerdict("uncertain", score)
+    INPUT_CHECKS.inc(service=service, verdict=verdict.status)
+    return verdict
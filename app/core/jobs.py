@@ -0,0 +1,177 @@
+# app/core/jobs.py
+
+# Background execution for the long-running analyses. A submit call queues
+# the job and returns its ID at once; a fixed pool of worker tasks runs the
+# queued jobs and writes status and result to the job store, where the
+# status/result endpoints read them. A job does not depend on the HTTP
+# request that submitted it, so it keeps running if that client disconnects.
+#
+# The submitting request's context variables (session scope, cache bypass,
+# priority) are captured at submit time and restored when the job runs; its
+# deadline is replaced by the job's own JOBS_TIMEOUT_SECONDS, and a profiled
+# request's stage timings do not extend into its jobs.
+
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from . import metrics
+from .config import settings
+from .profiling import current_profile
+from .request_context import deadline
+from ..memory.job_store import JobStore, build_job_store
+
+JOBS = metrics.counter("jobs_total", "Background jobs by kind and final status")
+JOB_QUEUE_WAIT = metrics.histogram("job_queue_wait_seconds", "Time a job spent queued before a worker picked it up")
+JOB_RUN = metrics.histogram("job_run_seconds", "Time a worker spent running a job")
+JOBS_QUEUED = metrics.gauge("jobs_queued", "Background jobs waiting for a worker")
+JOBS_RUNNING = metrics.gauge("jobs_running", "Background jobs being run by a worker")
+
+
+class JobQueueFull(Exception):
+    """Raised by `JobQueue.submit` when JOBS_MAX_QUEUED jobs are already waiting."""
+
+
+class _QueuedJob(NamedTuple):
+    job_id: str
+    kind: str
+    handler: Callable[[BaseModel], Awaitable[Any]]
+    request: BaseModel
+    context: contextvars.Context
+    submitted_at: float
+
+
+class JobQueue:
+    def __init__(self, store: JobStore, workers: int, max_queued: int, timeout_seconds: float):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self.timeout_seconds = timeout_seconds
+        self._queue: "asyncio.Queue[_QueuedJob]" = asyncio.Queue(maxsize=max_queued)
+        self._tasks: List[asyncio.Task] = []
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancels the workers; jobs still queued or running are marked failed."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            await self.store.update(job.job_id, status="failed", error="The server shut down before the job ran.", finished_at=time.time())
+        JOBS_QUEUED.set(0)
+
+    async def submit(self, kind: str, handler: Callable[[BaseModel], Awaitable[Any]], request: BaseModel) -> Dict[str, Any]:
+        """Queues `handler(request)` and returns the new job record without waiting for it."""
+        if self._queue.full():
+            self.rejected += 1
+            raise JobQueueFull(f"{self.max_queued} jobs are already queued.")
+        self.start()
+        record = await self.store.create(kind)
+        try:
+            self._queue.put_nowait(_QueuedJob(
+                record["job_id"], kind, handler, request, contextvars.copy_context(), record["submitted_at"]
+            ))
+        except asyncio.QueueFull:
+            # Other submits filled the queue while the record was being written
+            await self.store.delete(record["job_id"])
+            self.rejected += 1
+            raise JobQueueFull(f"{self.max_queued} jobs are already queued.") from None
+        self.submitted += 1
+        JOBS_QUEUED.set(self._queue.qsize())
+        return record
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            JOBS_QUEUED.set(self._queue.qsize())
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: _QueuedJob) -> None:
+        started_at = time.time()
+        JOB_QUEUE_WAIT.observe(started_at - job.submitted_at, kind=job.kind)
+        await self.store.update(job.job_id, status="running", started_at=started_at)
+        self.running += 1
+        JOBS_RUNNING.set(self.running)
+        status, result, error = "failed", None, None
+        try:
+            # The job's task runs in a copy of the submitting request's context,
+            # with its own deadline instead of the submitting request's, unprofiled
+            job.context.run(deadline.set, time.monotonic() + self.timeout_seconds)
+            job.context.run(current_profile.set, None)
+            task = job.context.run(asyncio.create_task, job.handler(job.request))
+            result = await asyncio.wait_for(task, timeout=self.timeout_seconds)
+            error = getattr(result, "error", None)
+            status = "failed" if error else "succeeded"
+        except asyncio.TimeoutError:
+            error = f"The job did not finish within {self.timeout_seconds:g} seconds."
+        except asyncio.CancelledError:
+            error = "The server shut down while the job was running."
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            self.running -= 1
+            JOBS_RUNNING.set(self.running)
+            finished_at = time.time()
+            JOB_RUN.observe(finished_at - started_at, kind=job.kind)
+            JOBS.inc(kind=job.kind, status=status)
+            await self.store.update(
+                job.job_id,
+                status=status,
+                result=result.model_dump(mode="json") if isinstance(result, BaseModel) else result,
+                error=error,
+                finished_at=finished_at,
+            )
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "store": self.store.stats(),
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            build_job_store(),
+            workers=settings.JOBS_WORKERS,
+            max_queued=settings.JOBS_MAX_QUEUED,
+            timeout_seconds=settings.JOBS_TIMEOUT_SECONDS,
+        )
+    return _job_queue
+
+
+def start_job_queue() -> JobQueue:
+    queue = get_job_queue()
+    queue.start()
+    return queue
+
+
+async def stop_job_queue() -> None:
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.stop()
+        _job_queue = None
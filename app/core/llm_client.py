@@ -1,10 +1,365 @@
-# api/core/llm_client.py
+# app/core/llm_client.py
 
-# This module provides a client for interacting with the OpenAI API.
+# Process-wide gateway to the OpenAI API. Every service goes through the same
+# AsyncOpenAI client so that all upstream calls share one HTTP connection pool,
+# one set of timeouts and one set of counters.
 
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Type, TypeVar
+
+import httpx
 from openai import AsyncOpenAI
-from config import settings
+from pydantic import BaseModel, ValidationError
+
+from . import metrics, profiling, prompts
+from .cassette import CassetteTransport, build_cassette_transport
+from .config import settings
+from .rate_limit import DeadlineExceeded, RateLimiter, build_rate_limiter
+from .request_context import deadline, priority, remaining_time, route
+from .resilience import ResiliencePolicy, build_resilience_policy
+from ..utils.tokens import count_tokens
+
+llm_prompt_tokens = metrics.counter(
+    "llm_prompt_tokens_total",
+    "Prompt tokens reported by the upstream usage field, by model and route."
+)
+llm_cached_prompt_tokens = metrics.counter(
+    "llm_cached_prompt_tokens_total",
+    "Prompt tokens served from the upstream prompt cache, by model and route."
+)
+llm_completion_tokens = metrics.counter(
+    "llm_completion_tokens_total",
+    "Completion tokens reported by the upstream usage field, by model and route."
+)
+llm_cost_usd = metrics.counter(
+    "llm_cost_usd_total",
+    "Estimated upstream spend from token usage and LLM_PRICES_PER_MILLION_TOKENS, by model and route."
+)
+llm_call_seconds = metrics.histogram(
+    "llm_call_seconds",
+    "Upstream call time including admission wait, by model and priority class."
+)
+llm_upstream_seconds = metrics.histogram(
+    "llm_upstream_seconds",
+    "Time spent on the upstream request itself (after admission), by model and outcome."
+)
+llm_in_flight = metrics.gauge("llm_requests_in_flight", "Upstream requests currently open, by model.")
+llm_cancelled_calls = metrics.counter(
+    "llm_cancelled_calls_total",
+    "Upstream calls abandoned because the caller went away (client disconnect, lost hedge, ...)."
+)
+llm_cancelled_tokens_saved = metrics.counter(
+    "llm_cancelled_tokens_saved_total",
+    "Estimated completion tokens not generated because their call was cancelled."
+)
+llm_structured_output_failures = metrics.counter(
+    "llm_structured_output_failures_total",
+    "Structured-output replies that did not validate against their response model."
+)
+llm_reply_parse_failures = metrics.counter(
+    "llm_reply_parse_failures_total",
+    "JSON-mode replies that could not be parsed into a response, or were patched with defaults, by service and reason."
+)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def record_reply_parse_failure(service: str, error: Exception) -> None:
+    """Counts a JSON-mode reply that was not valid JSON, or did not fit the service's response model."""
+    reason = "invalid_analysis" if isinstance(error, ValidationError) else "invalid_json"
+    llm_reply_parse_failures.inc(service=service, reason=reason)
+
+
+class StructuredOutputError(Exception):
+    """The model did not return a reply matching the requested response model."""
+
+
+class LLMGateway:
+    """Shared AsyncOpenAI client with a tuned keep-alive pool and usage counters."""
+
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        connect_timeout: float,
+        request_timeout: float,
+        limiter: Optional[RateLimiter] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+    ):
+        self.limiter = limiter
+        self.resilience = resilience
+        self.max_connections = max_connections
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ))
+        # With LLM_CASSETTE_MODE set, upstream traffic is recorded or replayed under the pool
+        self.cassette: Optional[CassetteTransport] = build_cassette_transport(transport)
+        self._http_client = httpx.AsyncClient(
+            transport=self.cassette or transport,
+            timeout=httpx.Timeout(request_timeout, connect=connect_timeout),
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=self._http_client,
+            # Retries happen in the resilience policy, once per call
+            max_retries=0,
+        )
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.failed_requests = 0
+        self.saturated_requests = 0
+        self.total_latency_seconds = 0.0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.cancelled_requests = 0
+        self.cancelled_tokens_saved = 0
+
+    @asynccontextmanager
+    async def _track(self, model: str):
+        # A request that starts while every pooled connection is busy has to
+        # wait in httpx for a free slot; count those as pool saturation.
+        if self.in_flight >= self.max_connections:
+            self.saturated_requests += 1
+
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        llm_in_flight.inc(model=model)
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            with profiling.stage("upstream"):
+                yield
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            self.failed_requests += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self.total_latency_seconds += elapsed
+            llm_in_flight.dec(model=model)
+            llm_upstream_seconds.observe(elapsed, model=model, outcome=outcome)
+
+    @staticmethod
+    def _completion_allowance(params: Dict[str, Any]) -> int:
+        return params.get("max_tokens") or settings.LLM_DEFAULT_COMPLETION_TOKENS
+
+    @classmethod
+    def _estimate_tokens(cls, params: Dict[str, Any]) -> int:
+        """Tokens the provider will count against TPM: the prompt plus the completion allowance."""
+        prompt = sum(count_tokens(message.get("content") or "") for message in params.get("messages", ()))
+        return prompt + cls._completion_allowance(params)
+
+    def _record_cancelled(self, params: Dict[str, Any], completion_tokens_received: int = 0) -> None:
+        saved = max(0, self._completion_allowance(params) - completion_tokens_received)
+        model = params.get("model", "")
+        self.cancelled_requests += 1
+        self.cancelled_tokens_saved += saved
+        llm_cancelled_calls.inc(model=model, priority=priority.get())
+        llm_cancelled_tokens_saved.inc(saved, model=model)
+
+    async def _create(self, params: Dict[str, Any]):
+        """`chat.completions.create(**params)`, cut off at the request's deadline."""
+        remaining = remaining_time()
+        if remaining is None:
+            return await self.client.chat.completions.create(**params)
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        try:
+            return await asyncio.wait_for(
+                self.client.chat.completions.create(**params, timeout=min(remaining, settings.LLM_REQUEST_TIMEOUT)),
+                timeout=remaining,
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded() from None
+
+    @asynccontextmanager
+    async def _admit(self, params: Dict[str, Any]):
+        """Waits for the model's admission control (if enabled) in the request's priority class; yields a lease or None."""
+        model, priority_class = params.get("model", ""), priority.get()
+        started = time.perf_counter()
+        try:
+            if self.limiter is None:
+                yield None
+            else:
+                async with self.limiter.limit(model, self._estimate_tokens(params), priority_class, deadline.get()) as lease:
+                    profiling.record("admission", started)
+                    yield lease
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started, model=model, priority=priority_class)
+
+    def _record_usage(self, model: str, usage: Any) -> None:
+        """Adds a response's token usage, including prompt-cache hits, to the counters."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        prompt = usage.prompt_tokens or 0
+        completion = usage.completion_tokens or 0
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.cached_prompt_tokens += cached
+        route_name = route.get()
+        llm_prompt_tokens.inc(prompt, model=model, route=route_name)
+        llm_cached_prompt_tokens.inc(cached, model=model, route=route_name)
+        llm_completion_tokens.inc(completion, model=model, route=route_name)
+
+        prices = settings.LLM_PRICES_PER_MILLION_TOKENS.get(model)
+        if prices is not None:
+            cost = (
+                (prompt - cached) * prices["input"]
+                + cached * prices.get("cached_input", prices["input"])
+                + completion * prices["output"]
+            ) / 1_000_000
+            self.cost_usd += cost
+            llm_cost_usd.inc(cost, model=model, route=route_name)
+
+    async def _resilient(self, model: str, attempt, hedge: bool = True):
+        if self.resilience is None:
+            return await attempt()
+        return await self.resilience.call(model, attempt, hedge=hedge)
+
+    async def chat_completion(self, **params: Any):
+        """Calls `chat.completions.create` through the shared pool, with retries and the circuit breaker."""
+        async def attempt():
+            try:
+                async with self._admit(params) as lease, self._track(params.get("model", "")):
+                    response = await self._create(params)
+                    if lease is not None and response.usage is not None:
+                        lease.settle(response.usage.total_tokens)
+            except asyncio.CancelledError:
+                self._record_cancelled(params)
+                raise
+            return response
+
+        response = await self._resilient(params.get("model", ""), attempt)
+        self._record_usage(params.get("model", ""), response.usage)
+        return response
+
+    async def stream_chat_completion(self, **params: Any) -> AsyncIterator[str]:
+        """Streams `chat.completions.create(stream=True)` and yields content deltas."""
+        # Ask for the final usage chunk so streamed calls report cached tokens too
+        params.setdefault("stream_options", {"include_usage": True})
+        received = 0
+        try:
+            async with self._admit(params) as lease, self._track(params.get("model", "")):
+                # Only opening the stream is retried; once tokens flow, a failure ends it
+                stream = await self._resilient(
+                    params.get("model", ""),
+                    lambda: self._create({**params, "stream": True}),
+                    hedge=False
+                )
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        self._record_usage(params.get("model", ""), chunk.usage)
+                        if lease is not None:
+                            lease.settle(chunk.usage.total_tokens)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        received += 1  # roughly one token per content chunk
+                        yield chunk.choices[0].delta.content
+        except (asyncio.CancelledError, GeneratorExit):
+            # The consumer stopped reading (client gone): the rest of the reply is not generated
+            self._record_cancelled(params, completion_tokens_received=received)
+            raise
+
+    async def structured_completion(self, response_model: Type[ModelT], attempts: int = 2, **params: Any) -> ModelT:
+        """
+        Calls the API with a strict JSON schema built from `response_model`
+        and validates the reply with `model_validate_json`, once. A reply
+        that still fails validation (e.g. cut off by max_tokens) is retried
+        up to `attempts` times in total before StructuredOutputError.
+        """
+        params["response_format"] = prompts.response_format(response_model)
+        error = None
+        for _ in range(attempts):
+            response = await self.chat_completion(**params)
+            message = response.choices[0].message
+            if getattr(message, "refusal", None):
+                raise StructuredOutputError(f"The model refused the request: {message.refusal}")
+            try:
+                with profiling.stage("parse"):
+                    return response_model.model_validate_json(message.content or "")
+            except ValidationError as e:
+                error = e
+                llm_structured_output_failures.inc(model=params.get("model", ""), schema=response_model.__name__)
+        raise StructuredOutputError(
+            f"The model returned no valid {response_model.__name__} after {attempts} attempts: {error}"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the pool and request counters."""
+        completed = self.total_requests - self.in_flight
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "failed_requests": self.failed_requests,
+            "saturated_requests": self.saturated_requests,
+            "avg_latency_ms": round(self.total_latency_seconds / completed * 1000, 2) if completed else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "cancelled_requests": self.cancelled_requests,
+            "cancelled_tokens_saved": self.cancelled_tokens_saved,
+            "prompt_cache_hit_rate": round(self.cached_prompt_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "admission": self.limiter.stats() if self.limiter is not None else None,
+            "resilience": self.resilience.stats() if self.resilience is not None else None,
+            "cassette": self.cassette.stats() if self.cassette is not None else None,
+        }
+
+    async def aclose(self) -> None:
+        await self.client.close()
+        await self._http_client.aclose()
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def init_llm_gateway() -> LLMGateway:
+    """Creates the process-wide gateway (called from the FastAPI lifespan)."""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(
+            api_key=settings.OPENAI_API_KEY,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+            request_timeout=settings.LLM_REQUEST_TIMEOUT,
+            limiter=build_rate_limiter(),
+            resilience=build_resilience_policy(),
+        )
+    return _gateway
+
+
+async def close_llm_gateway() -> None:
+    global _gateway
+    if _gateway is not None:
+        await _gateway.aclose()
+        _gateway = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """FastAPI dependency / service accessor for the shared gateway."""
+    return _gateway or init_llm_gateway()
 
-def get_llm_client():
-    return AsyncOpenAI(api_key = settings.OPENAI_API_KEY)
 
+def get_llm_client() -> AsyncOpenAI:
+    """Returns the shared AsyncOpenAI client."""
+    return get_llm_gateway().client
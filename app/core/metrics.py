@@ -0,0 +1,163 @@
+# app/core/metrics.py
+
+# Minimal in-process metrics registry (no external dependency). Metrics are
+# created once at import time by the module that owns them and read back by
+# the ops endpoints, as JSON or in the Prometheus text format at /metrics.
+
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Gauge:
+    """Value that goes up and down (in-flight calls, queue depth), optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, Dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["count"] += 1
+            series["sum"] += value
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "buckets": dict(zip(self.buckets, series["counts"])),
+                    "count": series["count"],
+                    "sum": round(series["sum"], 6),
+                }
+                for key, series in self._series.items()
+            ]
+
+
+REGISTRY: Dict[str, object] = {}
+
+
+def counter(name: str, documentation: str) -> Counter:
+    """Returns the registered counter `name`, creating it on first use."""
+    if name not in REGISTRY:
+        REGISTRY[name] = Counter(name, documentation)
+    return REGISTRY[name]
+
+
+def gauge(name: str, documentation: str) -> Gauge:
+    """Returns the registered gauge `name`, creating it on first use."""
+    if name not in REGISTRY:
+        REGISTRY[name] = Gauge(name, documentation)
+    return REGISTRY[name]
+
+
+def histogram(name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Returns the registered histogram `name`, creating it on first use."""
+    if name not in REGISTRY:
+        REGISTRY[name] = Histogram(name, documentation, buckets)
+    return REGISTRY[name]
+
+
+def snapshot() -> Dict[str, List[Dict]]:
+    return {name: metric.snapshot() for name, metric in REGISTRY.items()}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str], **extra: str) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+_PROMETHEUS_TYPES = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}
+
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    for name, metric in sorted(REGISTRY.items()):
+        help_text = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {_PROMETHEUS_TYPES[type(metric)]}")
+        for series in metric.snapshot():
+            labels = series["labels"]
+            if isinstance(metric, Histogram):
+                for bound, count in series["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=_format_value(bound))} {count}")
+                lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {series["count"]}')
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series['value'])}")
+    return "\n".join(lines) + "\n"
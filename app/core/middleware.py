@@ -0,0 +1,193 @@
+# app/core/middleware.py
+
+# Pure ASGI middleware (no response buffering, so SSE streams pass through).
+#
+# - CancelOnDisconnectMiddleware cancels a request's handler when its
+#   client goes away, e.g. a Streamlit user navigating off the page. The
+#   cancellation propagates into every awaited upstream call and closes its
+#   connection, so OpenAI stops generating (and billing) a reply nobody
+#   will read.
+# - MetricsMiddleware records request latency per route template and the
+#   number of requests in flight.
+# - ProfilingMiddleware collects stage timings for the requests that ask
+#   for them or are sampled, see app/core/profiling.py.
+
+import asyncio
+import cProfile
+import os
+import random
+import re
+import time
+
+from . import metrics
+from .config import settings
+from .profiling import Profile, current_profile
+from .request_context import route_template
+
+PROFILE_HEADER = "X-Profile"
+
+CLIENT_DISCONNECTS = metrics.counter(
+    "http_client_disconnects_total",
+    "Requests whose handler was cancelled because the client disconnected, by route template."
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the last response byte, by method, route template and status."
+)
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Requests currently being handled.")
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    Runs the app in its own task. Once the app has read the whole request body,
+    this middleware takes over listening for `http.disconnect` and cancels the
+    task when it arrives. The app can still wait for the disconnect through
+    `receive`, as StreamingResponse does. `receive` keeps a single consumer.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        disconnected = asyncio.Event()
+        response_complete = False
+        watcher = None
+        app_task = None
+
+        async def watch() -> None:
+            message = await receive()
+            while message["type"] != "http.disconnect":
+                message = await receive()
+            disconnected.set()
+            if not response_complete and app_task is not None and not app_task.done():
+                CLIENT_DISCONNECTS.inc(route=route_template(scope))
+                app_task.cancel()
+
+        async def wrapped_receive():
+            nonlocal watcher
+            if watcher is not None:
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                # Body fully read: from here on, the only message left is the disconnect
+                watcher = asyncio.create_task(watch())
+            return message
+
+        async def wrapped_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        app_task = asyncio.create_task(self.app(scope, wrapped_receive, wrapped_send))
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise  # cancelled by the server (shutdown), not by the client
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if not app_task.done():
+                app_task.cancel()
+
+
+class MetricsMiddleware:
+    """
+    Observes each request's duration under its route template (path parameters
+    as placeholders, unknown paths as "unmatched"), so label values stay bounded.
+    A request cancelled because its client left is recorded with status 499.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def wrapped_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        except asyncio.CancelledError:
+            status = 499
+            raise
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=route_template(scope), status=str(status),
+            )
+
+
+def _wants_profile(scope) -> bool:
+    if settings.PROFILING_HEADER_ENABLED:
+        header = PROFILE_HEADER.lower().encode("latin-1")
+        for name, value in scope["headers"]:
+            if name == header and value.strip().lower() in (b"1", b"true", b"yes", b"on"):
+                return True
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests that send X-Profile or are sampled: adds their
+    Server-Timing header and, with PROFILING_DUMP_DIR set, writes a cProfile
+    dump of each (one request at a time, since cProfile is per thread).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._cprofile_busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile()
+        token = current_profile.set(profile)
+
+        async def wrapped_send(message):
+            if message["type"] == "http.response.start":
+                timing = profile.server_timing(time.perf_counter())
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]}
+            await send(message)
+
+        profiler = None
+        if settings.PROFILING_DUMP_DIR and not self._cprofile_busy:
+            self._cprofile_busy = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            current_profile.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                self._cprofile_busy = False
+                self._dump(profiler, scope)
+
+    @staticmethod
+    def _dump(profiler: cProfile.Profile, scope) -> None:
+        os.makedirs(settings.PROFILING_DUMP_DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route_template(scope)).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}-{scope['method']}-{slug}.prof"
+        profiler.dump_stats(os.path.join(settings.PROFILING_DUMP_DIR, name))
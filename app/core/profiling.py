@@ -0,0 +1,88 @@
+# app/core/profiling.py
+
+# Opt-in request profiling. A request is profiled when it sends
+# `X-Profile: 1` (if PROFILING_HEADER_ENABLED) or is picked at
+# PROFILING_SAMPLE_RATE, see ProfilingMiddleware. While it runs, the code on
+# its path records stage spans (cache lookup, prompt formatting, admission,
+# upstream, parsing and the service call as a whole), and the response
+# carries them as a Server-Timing header, in milliseconds:
+#
+#   Server-Timing: request;dur=2.1, cache;dur=0.1, prompt;dur=0.3, admission;dur=0.0,
+#                  upstream;dur=1830.4, parse;dur=1.2, business_goal;dur=1832.5,
+#                  response;dur=0.8, total;dur=1835.6
+#
+# "request" is the time before the first stage (body read, routing and
+# Pydantic validation of the request) and "response" the time from the last
+# stage to the response headers (response-model validation and JSON
+# serialisation). A stage seen more than once, e.g. the upstream calls of a
+# fan-out, is summed and its count given as `desc`. Streamed responses send
+# their headers first, so they only report what happened before.
+#
+# With PROFILING_DUMP_DIR set, profiled requests are also run under cProfile
+# and the stats written there as .prof files (pstats, snakeviz). cProfile
+# sees everything the event loop runs meanwhile, other requests included,
+# and only one request is profiled this way at a time.
+#
+# Outside a profiled request, `stage` and `record` do nothing beyond one
+# context-variable lookup.
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class Profile:
+    """Stage spans of one profiled request, as (name, start, end) in perf_counter seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+
+    def add(self, name: str, start: float, end: float) -> None:
+        self.spans.append((name, start, end))
+
+    def server_timing(self, finished: float) -> str:
+        """The spans as a Server-Timing header value, summed per stage in order of first appearance."""
+        totals: Dict[str, List[float]] = {}
+        for name, start, end in self.spans:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += end - start
+            entry[1] += 1
+
+        metrics = []
+        if self.spans:
+            metrics.append(("request", min(start for _, start, _ in self.spans) - self.started, 1))
+        metrics.extend((name, duration, count) for name, (duration, count) in totals.items())
+        if self.spans:
+            metrics.append(("response", max(0.0, finished - max(end for _, _, end in self.spans)), 1))
+        metrics.append(("total", finished - self.started, 1))
+        return ", ".join(
+            f"{name};dur={duration * 1000:.1f}" + (f';desc="{count}x"' if count > 1 else "")
+            for name, duration, count in metrics
+        )
+
+
+# The current request's profile, set by ProfilingMiddleware; tasks the request spawns share it
+current_profile: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Records the enclosed block as stage `name` of the current request, if it is profiled."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, start, time.perf_counter())
+
+
+def record(name: str, start: float) -> None:
+    """Records stage `name` from `start` (time.perf_counter()) until now, if the request is profiled."""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add(name, start, time.perf_counter())
@@ -0,0 +1,115 @@
+# app/core/prompts.py
+
+# Registry of the static prompt parts. Each service registers its system
+# prompt once at import time; the JSON schemas embedded in those prompts are
+# generated and serialised once per model. Per request, a service only adds
+# its variable messages (tone, user data) after the precompiled prefix.
+#
+# Every template carries a version tag: the declared version plus a hash of
+# the rendered text. Services pass it to `cached_response`, so editing a
+# prompt retires the responses cached under the old wording.
+
+import hashlib
+import json
+from functools import lru_cache
+from typing import Dict, List, Type
+
+from pydantic import BaseModel
+
+from ..utils.tokens import count_tokens
+
+
+@lru_cache(maxsize=None)
+def json_schema(model: Type[BaseModel]) -> dict:
+    """`model.model_json_schema()`, generated once per model. Treat the result as read-only."""
+    return model.model_json_schema()
+
+
+@lru_cache(maxsize=None)
+def json_schema_text(model: Type[BaseModel], indent: int = 2) -> str:
+    """The model's JSON schema serialised for embedding in a prompt."""
+    return json.dumps(json_schema(model), indent=indent)
+
+
+# JSON Schema keywords that strict structured outputs reject (or did, on
+# older model snapshots). Pydantic still enforces them when the reply is
+# validated, so dropping them from the upstream schema loses nothing.
+_UNSUPPORTED_STRICT_KEYWORDS = {
+    "default", "format", "pattern", "minLength", "maxLength", "minimum", "maximum",
+    "exclusiveMinimum", "exclusiveMaximum", "multipleOf", "minItems", "maxItems", "uniqueItems",
+}
+
+
+def _strict(node):
+    if isinstance(node, list):
+        return [_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        # Strict mode does not allow keywords next to $ref
+        return {"$ref": node["$ref"]}
+    strict = {}
+    for key, value in node.items():
+        if key in ("properties", "$defs"):
+            # Keys of these mappings are names, not keywords
+            strict[key] = {name: _strict(schema) for name, schema in value.items()}
+        elif key not in _UNSUPPORTED_STRICT_KEYWORDS:
+            strict[key] = _strict(value)
+    node = strict
+    if node.get("type") == "object" and "properties" in node:
+        # Every property must be listed as required; optional ones are nullable instead
+        node["required"] = list(node["properties"])
+        node["additionalProperties"] = False
+    return node
+
+
+@lru_cache(maxsize=None)
+def response_format(model: Type[BaseModel]) -> dict:
+    """`response_format` for strict schema-constrained output matching `model`, built once per model. Read-only."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "strict": True, "schema": _strict(json_schema(model))},
+    }
+
+
+class PromptTemplate:
+    """A static system prompt, fixed at registration, followed by per-request messages."""
+
+    def __init__(self, name: str, version: str, system: str):
+        self.name = name
+        self.version = version
+        self.system = system
+        self.fingerprint = hashlib.sha256(system.encode("utf-8")).hexdigest()[:12]
+        self.version_tag = f"{version}-{self.fingerprint}"
+        self._system_message = {"role": "system", "content": system}
+
+    def messages(self, *variable: Dict[str, str]) -> List[Dict[str, str]]:
+        """Returns the static system message followed by `variable`."""
+        return [self._system_message, *variable]
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "chars": len(self.system),
+            "tokens": count_tokens(self.system),
+        }
+
+
+REGISTRY: Dict[str, PromptTemplate] = {}
+
+
+def register(name: str, version: str, system: str) -> PromptTemplate:
+    """Registers the prompt `name`. Registering an existing name replaces it."""
+    template = PromptTemplate(name, version, system)
+    REGISTRY[name] = template
+    return template
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return REGISTRY[name]
+
+
+def snapshot() -> List[dict]:
+    return [template.describe() for template in REGISTRY.values()]
@@ -0,0 +1,314 @@
+# app/core/rate_limit.py
+
+# Process-wide admission control for upstream LLM calls. Each model gets a
+# concurrency semaphore plus two token buckets that mirror the provider's
+# limits: requests per minute and tokens per minute (prompt tokens plus the
+# completion allowance, which is what the provider counts against TPM).
+#
+# Calls waiting for a slot are served by priority class (interactive, then
+# standard, then bulk; arrival order within a class). Classes only compete
+# within one model's limiter, as the provider's limits are per model: on
+# gpt-4o a vision check overtakes the queued calls of the bulk analyses
+# (trends, strategic themes, business goals, jobs). The chatbot runs on
+# gpt-4, which no analysis uses, so its turns never queue behind them; its
+# class would matter only if an analysis moved to that model.
+#
+# A call waits in line for a slot and for bucket capacity, but only up to
+# its deadline. If the buckets cannot cover it in time it is refused with
+# 429 and the expected wait as Retry-After. If the line is already too long,
+# or the deadline passes while waiting for a slot, it is refused with 503.
+# Refusing early keeps a burst from reaching the provider and failing there
+# all at once.
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from . import metrics
+from .config import settings
+from .request_context import PRIORITY_CLASSES
+
+ADMISSION_WAIT = metrics.histogram("llm_admission_wait_seconds", "Time an upstream call waited for a concurrency slot and rate-limit capacity, by model and priority")
+ADMISSION_SHED = metrics.counter("llm_admission_shed_total", "Upstream calls refused by admission control, by model, priority and reason")
+ADMISSION_WAITING = metrics.gauge("llm_admission_waiting", "Upstream calls currently waiting for a concurrency slot, by model and priority")
+
+_PRIORITY_RANK = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+
+
+# OpenAI's published per-model limits by usage tier, as (requests/min, tokens/min)
+OPENAI_TIER_LIMITS: Dict[int, Dict[str, Tuple[int, int]]] = {
+    1: {"gpt-4o": (500, 30000), "gpt-4o-mini": (500, 200000), "gpt-4": (500, 10000)},
+    2: {"gpt-4o": (5000, 450000), "gpt-4o-mini": (5000, 2000000), "gpt-4": (5000, 40000)},
+    3: {"gpt-4o": (5000, 800000), "gpt-4o-mini": (5000, 4000000), "gpt-4": (5000, 80000)},
+    4: {"gpt-4o": (10000, 2000000), "gpt-4o-mini": (10000, 10000000), "gpt-4": (10000, 300000)},
+    5: {"gpt-4o": (10000, 30000000), "gpt-4o-mini": (30000, 150000000), "gpt-4": (10000, 300000)},
+}
+
+
+class UpstreamOverloaded(Exception):
+    """An upstream call was refused locally; maps to HTTP `status_code` with `Retry-After`."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class DeadlineExceeded(UpstreamOverloaded):
+    """The request's deadline passed before its upstream call could complete (504)."""
+
+    def __init__(self, message: str = "The request deadline passed before the AI call could complete."):
+        super().__init__(message, 504, 0.0)
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` per second up to `per_minute`. The level may go
+    negative: capacity taken in advance by queued calls is paid back before anyone else is admitted."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available, ignoring calls admitted later."""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+class PrioritySlots:
+    """Counting semaphore that hands freed slots to the best-ranked waiter, then the longest waiting."""
+
+    def __init__(self, size: int):
+        self.free = size
+        self._waiters: list = []  # heap of (rank, arrival, future)
+        self._arrivals = itertools.count()
+
+    def locked(self) -> bool:
+        return self.free == 0
+
+    async def acquire(self, rank: int, timeout: float) -> bool:
+        """Takes a slot, or returns False if none was handed over within `timeout` seconds."""
+        if self.free > 0:
+            self.free -= 1
+            return True
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (rank, next(self._arrivals), future))
+        timer = loop.call_later(timeout, lambda: future.done() or future.set_result(False))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.result():
+                self.release()  # the slot arrived just as we were cancelled
+            raise
+        finally:
+            timer.cancel()
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():  # skip waiters that timed out or were cancelled
+                future.set_result(True)
+                return
+        self.free += 1
+
+
+class Lease:
+    """An admitted call. `settle(used)` corrects the token estimate once the actual usage is known."""
+
+    __slots__ = ("_limiter", "estimated_tokens", "_settled")
+
+    def __init__(self, limiter: "ModelLimiter", estimated_tokens: int):
+        self._limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self._settled = False
+
+    def settle(self, used_tokens: Optional[int]) -> None:
+        if self._settled or used_tokens is None:
+            return
+        self._settled = True
+        difference = self.estimated_tokens - used_tokens
+        if difference > 0:
+            self._limiter.tokens.give_back(difference)
+        elif difference < 0:
+            self._limiter.tokens.take(-difference)
+
+
+class ModelLimiter:
+    def __init__(self, model: str, rpm: int, tpm: int, concurrency: int, max_waiters: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = concurrency
+        self.max_waiters = max_waiters
+        self._slots = PrioritySlots(concurrency)
+        self.in_flight = 0
+        self.waiting = {name: 0 for name in PRIORITY_CLASSES}
+        self.admitted = {name: 0 for name in PRIORITY_CLASSES}
+        self.shed_queue_full = 0
+        self.shed_slot_timeout = 0
+        self.shed_rate_limited = 0
+
+    def _shed(self, priority: str, reason: str, message: str, status_code: int, retry_after: float) -> UpstreamOverloaded:
+        ADMISSION_SHED.inc(model=self.model, priority=priority, reason=reason)
+        return UpstreamOverloaded(f"{message} Please retry shortly.", status_code, retry_after)
+
+    async def acquire(self, estimated_tokens: int, deadline: float, priority: str = "standard") -> Lease:
+        """Waits until the call may go upstream, or raises UpstreamOverloaded if it cannot before `deadline`."""
+        started = time.monotonic()
+        rank = _PRIORITY_RANK.get(priority, _PRIORITY_RANK["standard"])
+
+        if self._slots.locked():
+            # Interactive calls are never turned away for queue length, only by their deadline
+            if priority != "interactive" and sum(self.waiting.values()) >= self.max_waiters:
+                self.shed_queue_full += 1
+                raise self._shed(priority, "queue_full", f"Too many {self.model} calls are waiting.", 503, deadline - started)
+            self.waiting[priority] += 1
+            ADMISSION_WAITING.inc(model=self.model, priority=priority)
+            try:
+                granted = await self._slots.acquire(rank, timeout=max(0.0, deadline - started))
+            finally:
+                self.waiting[priority] -= 1
+                ADMISSION_WAITING.dec(model=self.model, priority=priority)
+            if not granted:
+                self.shed_slot_timeout += 1
+                raise self._shed(priority, "slot_timeout", f"All {self.concurrency} {self.model} slots stayed busy.", 503, deadline - started)
+        else:
+            await self._slots.acquire(rank, timeout=0.0)
+
+        now = time.monotonic()
+        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+        if now + wait > deadline:
+            self._slots.release()
+            self.shed_rate_limited += 1
+            raise self._shed(priority, "rate_limited", f"The {self.model} rate limit is exhausted.", 429, wait)
+
+        # Reserve now, so calls admitted after this one see the reduced capacity
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.requests.give_back(1)
+                self.tokens.give_back(estimated_tokens)
+                self._slots.release()
+                raise
+
+        self.in_flight += 1
+        self.admitted[priority] += 1
+        ADMISSION_WAIT.observe(time.monotonic() - started, model=self.model, priority=priority)
+        return Lease(self, estimated_tokens)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self.requests._refill(now)
+        self.tokens._refill(now)
+        return {
+            "rpm": int(self.requests.capacity),
+            "tpm": int(self.tokens.capacity),
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": dict(self.waiting),
+            "admitted": dict(self.admitted),
+            "requests_available": int(self.requests.level),
+            "tokens_available": int(self.tokens.level),
+            "shed_queue_full": self.shed_queue_full,
+            "shed_slot_timeout": self.shed_slot_timeout,
+            "shed_rate_limited": self.shed_rate_limited,
+        }
+
+
+class RateLimiter:
+    """One ModelLimiter per model, created on first use from `limits` or the defaults."""
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], default_rpm: int, default_tpm: int,
+                 default_concurrency: int, max_wait_seconds: float, max_waiters: int):
+        self.limits = limits
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.default_concurrency = default_concurrency
+        self.max_wait_seconds = max_wait_seconds
+        self.max_waiters = max_waiters
+        self._models: Dict[str, ModelLimiter] = {}
+
+    def for_model(self, model: str) -> ModelLimiter:
+        limiter = self._models.get(model)
+        if limiter is None:
+            limits = self.limits.get(model, {})
+            limiter = ModelLimiter(
+                model,
+                rpm=limits.get("rpm", self.default_rpm),
+                tpm=limits.get("tpm", self.default_tpm),
+                concurrency=limits.get("concurrency", self.default_concurrency),
+                max_waiters=self.max_waiters,
+            )
+            self._models[model] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def limit(self, model: str, estimated_tokens: int, priority: str = "standard",
+                    deadline: Optional[float] = None) -> AsyncIterator[Lease]:
+        """Holds an admission slot for `model` for the duration of the block. The call queues
+        for at most LLM_QUEUE_MAX_WAIT_SECONDS, and never past `deadline` (time.monotonic())."""
+        limiter = self.for_model(model)
+        queue_deadline = time.monotonic() + self.max_wait_seconds
+        if deadline is not None:
+            queue_deadline = min(queue_deadline, deadline)
+        lease = await limiter.acquire(estimated_tokens, queue_deadline, priority)
+        try:
+            yield lease
+        finally:
+            limiter.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {model: limiter.stats() for model, limiter in self._models.items()}
+
+
+def model_limits() -> Dict[str, Dict[str, int]]:
+    """The usage tier's RPM/TPM per model, with the LLM_RATE_LIMITS overrides applied."""
+    limits = {
+        model: {"rpm": rpm, "tpm": tpm}
+        for model, (rpm, tpm) in OPENAI_TIER_LIMITS[settings.LLM_USAGE_TIER].items()
+    }
+    for model, overrides in settings.LLM_RATE_LIMITS.items():
+        limits.setdefault(model, {}).update(overrides)
+    return limits
+
+
+def build_rate_limiter() -> Optional[RateLimiter]:
+    if not settings.LLM_LIMITS_ENABLED:
+        return None
+    return RateLimiter(
+        model_limits(),
+        default_rpm=settings.LLM_DEFAULT_RPM,
+        default_tpm=settings.LLM_DEFAULT_TPM,
+        default_concurrency=settings.LLM_DEFAULT_CONCURRENCY,
+        max_wait_seconds=settings.LLM_QUEUE_MAX_WAIT_SECONDS,
+        max_waiters=settings.LLM_QUEUE_MAX_WAITERS,
+    )
@@ -0,0 +1,92 @@
+# app/core/request_context.py
+
+# Per-request settings that have to reach the service layer without being
+# threaded through every function signature. They are read from headers by
+# the HTTP middleware in main.py and stored in context variables, which
+# asyncio copies into every task the request spawns.
+
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+
+from .config import settings
+
+CACHE_BYPASS_HEADER = "X-Cache-Bypass"
+SESSION_ID_HEADER = "X-Session-ID"
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+# When True, services skip the response cache lookup (the fresh result is still stored)
+cache_bypass: ContextVar[bool] = ContextVar("cache_bypass", default=False)
+
+# Scope for per-session server-side state; requests without the header share "anonymous"
+session_id: ContextVar[str] = ContextVar("session_id", default="anonymous")
+
+# Scheduling class of the request's upstream LLM calls, set per router in main.py.
+# Queued calls are admitted in this order: interactive before standard before bulk.
+PRIORITY_CLASSES = ("interactive", "standard", "bulk")
+priority: ContextVar[str] = ContextVar("priority", default="standard")
+
+# time.monotonic() by which the request's upstream calls must finish, or None for no deadline
+deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+# Route template of the request (e.g. "/api/jobs/{job_id}"), the label of its token and
+# cost metrics. Jobs and background tasks keep the route that started them.
+route: ContextVar[str] = ContextVar("route", default="none")
+
+
+def _truthy(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _timeout_seconds(value: Optional[str]) -> Optional[float]:
+    """The request's time budget: the header value in seconds (capped), else the configured default."""
+    try:
+        seconds = float(value) if value else None
+    except ValueError:
+        seconds = None
+    if seconds is None or seconds <= 0:
+        return settings.REQUEST_TIMEOUT_SECONDS
+    return min(seconds, settings.REQUEST_MAX_TIMEOUT_SECONDS)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    current = deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def bind_request_context(request: Request) -> None:
+    """Populates the context variables from the incoming request headers."""
+    headers = request.headers
+    bypass = _truthy(headers.get(CACHE_BYPASS_HEADER, "")) or "no-cache" in headers.get("Cache-Control", "").lower()
+    cache_bypass.set(bypass)
+    session_id.set(headers.get(SESSION_ID_HEADER) or "anonymous")
+    timeout = _timeout_seconds(headers.get(TIMEOUT_HEADER))
+    deadline.set(time.monotonic() + timeout if timeout else None)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """The matched route's path with its parameters put back as placeholders, or "unmatched"."""
+    if scope.get("route") is None:
+        return "unmatched"
+    placeholders = {str(value): f"{{{name}}}" for name, value in scope.get("path_params", {}).items()}
+    return "/".join(placeholders.get(segment, segment) for segment in scope["path"].split("/"))
+
+
+async def bind_route(request: Request) -> None:
+    """App-wide dependency: records the matched route template once routing has happened."""
+    route.set(route_template(request.scope))
+
+
+def priority_class(name: str):
+    """Router dependency that runs the routes' upstream calls in priority class `name`."""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class '{name}'.")
+
+    # async so that it runs in the request's own context, not in the threadpool
+    async def set_priority() -> None:
+        priority.set(name)
+
+    return set_priority
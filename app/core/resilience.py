@@ -0,0 +1,236 @@
+# app/core/resilience.py
+
+# One resilience layer for every upstream LLM call. The gateway wraps each
+# call in it; services see either a result or a single final exception.
+#
+# - Retries: transient failures (timeouts, connection errors, 408/409/429/5xx)
+#   are retried with full-jitter exponential backoff, honouring Retry-After.
+#   The OpenAI SDK's own retries are switched off, so this is the only place
+#   that retries.
+# - Hedging (optional): if a call runs past the model's recent p95 latency,
+#   an identical second request is sent and whichever answers first wins.
+# - Circuit breaker: after LLM_BREAKER_FAILURE_THRESHOLD consecutive
+#   transient failures on a model, its calls fail fast with 503 for
+#   LLM_BREAKER_RESET_SECONDS. One trial call is then let through, and its
+#   outcome closes or re-opens the circuit.
+#
+# No retry is started that could not finish before the request's deadline.
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import openai
+
+from . import metrics
+from .config import settings
+from .rate_limit import DeadlineExceeded, UpstreamOverloaded
+from .request_context import remaining_time
+
+RETRIES = metrics.counter("llm_retries_total", "Upstream calls retried after a transient failure, by model and error")
+HEDGES = metrics.counter("llm_hedged_requests_total", "Hedged upstream requests, by model and outcome (sent, primary_won, hedge_won)")
+BREAKER_TRANSITIONS = metrics.counter("llm_circuit_breaker_transitions_total", "Circuit breaker state changes, by model and new state")
+BREAKER_REJECTIONS = metrics.counter("llm_circuit_breaker_rejections_total", "Upstream calls failed fast by an open circuit, by model")
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(UpstreamOverloaded):
+    """The model's circuit is open: the call was not sent upstream."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    def __init__(self, model: str, failure_threshold: int, reset_seconds: float):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        BREAKER_TRANSITIONS.inc(model=self.model, state=state)
+
+    def _reject(self, retry_after: float) -> CircuitOpen:
+        BREAKER_REJECTIONS.inc(model=self.model)
+        return CircuitOpen(
+            f"The {self.model} API is failing; calls are suspended. Please retry shortly.", 503, retry_after
+        )
+
+    def before_call(self) -> None:
+        """Raises CircuitOpen unless a call may go upstream now."""
+        if self.state == "open":
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_seconds:
+                raise self._reject(self.reset_seconds - elapsed)
+            self._transition("half_open")
+        if self.state == "half_open":
+            if self._probing:
+                raise self._reject(1.0)
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._probing = False
+        self.failures = 0
+        if self.state != "closed":
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != "open":
+                self._transition("open")
+
+    def record_abandoned(self) -> None:
+        """The call ended without telling us anything about upstream health."""
+        self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class ResiliencePolicy:
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float, hedge_enabled: bool,
+                 hedge_min_samples: int, hedge_min_delay: float, failure_threshold: int, reset_seconds: float):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.reset_seconds)
+        return breaker
+
+    def _backoff(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """The model's recent p95 latency, once enough calls have been seen."""
+        latencies = self._latencies.get(model)
+        if not self.hedge_enabled or latencies is None or len(latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(latencies)
+        return max(self.hedge_min_delay, ordered[int(len(ordered) * 0.95) - 1])
+
+    async def _hedged(self, model: str, attempt: Callable[[], Awaitable[T]]) -> T:
+        delay = self._hedge_delay(model)
+        if delay is None:
+            return await attempt()
+
+        primary = asyncio.create_task(attempt())
+        hedge: Optional[asyncio.Task] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            HEDGES.inc(model=model, outcome="sent")
+            hedge = asyncio.create_task(attempt())
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    HEDGES.inc(model=model, outcome="hedge_won" if winners[0] is hedge else "primary_won")
+                    return winners[0].result()
+            # Both failed; report the original request's error
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def call(self, model: str, attempt: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        """Runs `attempt()` with retries, optional hedging and the model's circuit breaker."""
+        breaker = self.breaker(model)
+        retry = 0
+        while True:
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded()
+            breaker.before_call()
+            started = time.monotonic()
+            try:
+                result = await (self._hedged(model, attempt) if hedge else attempt())
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.record_abandoned()
+                    raise
+                # A 429 means we are over quota, not that the provider is unhealthy
+                if getattr(e, "status_code", None) == 429:
+                    breaker.record_abandoned()
+                else:
+                    breaker.record_failure()
+                retry_after = _retry_after(e)
+                if retry >= self.max_retries or (retry_after is not None and retry_after > self.max_delay):
+                    raise
+                delay = max(self._backoff(retry), retry_after or 0.0)
+                remaining = remaining_time()
+                if remaining is not None and remaining <= delay:
+                    raise DeadlineExceeded() from e
+                RETRIES.inc(model=model, error=type(e).__name__)
+                await asyncio.sleep(delay)
+                retry += 1
+            except BaseException:
+                breaker.record_abandoned()
+                raise
+            else:
+                breaker.record_success()
+                self._latencies.setdefault(model, deque(maxlen=200)).append(time.monotonic() - started)
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_retries": self.max_retries,
+            "hedging": self.hedge_enabled,
+            "breakers": {model: breaker.stats() for model, breaker in self._breakers.items()},
+            "hedge_after_seconds": {model: self._hedge_delay(model) for model in self._latencies},
+        }
+
+
+def build_resilience_policy() -> ResiliencePolicy:
+    return ResiliencePolicy(
+        max_retries=settings.LLM_MAX_RETRIES,
+        base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+        hedge_enabled=settings.LLM_HEDGE_ENABLED,
+        hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+        hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+    )
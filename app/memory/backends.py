@@ -0,0 +1,268 @@
+# app/memory/backends.py
+
+# Key/value storage backends shared by the response cache and the server-side
+# stores. Values are plain strings (usually JSON); both backends apply a TTL
+# and keep simple counters so callers can report hit rates and evictions.
+# Size caps count a value's UTF-8 bytes.
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class MemoryBackend:
+    """
+    In-process LRU map with a per-entry TTL. Optionally capped by total value
+    size in bytes (`max_bytes`), and with `sliding_ttl` reads push the expiry out so
+    the TTL measures idle time rather than age.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = None, sliding_ttl: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sliding_ttl = sliding_ttl
+        # key -> (value, expires_at, size in bytes)
+        self._data: "OrderedDict[str, Tuple[str, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get_locked(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at, size = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._remove_locked(key)
+            self.expirations += 1
+            return None
+        if self.sliding_ttl and self.ttl_seconds:
+            self._data[key] = (value, time.time() + self.ttl_seconds, size)
+        self._data.move_to_end(key)
+        return value
+
+    def _set_locked(self, key: str, value: str, ttl_seconds: Optional[float]) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.time() + ttl if ttl else None
+        self._remove_locked(key)
+        size = len(value.encode("utf-8"))
+        self._data[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes and len(self._data) > 1):
+            oldest = next(iter(self._data))
+            self._remove_locked(oldest)
+            self.evictions += 1
+
+    def _remove_locked(self, key: str) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._set_locked(key, value, ttl_seconds)
+
+    def update(self, key: str, fn: Callable[[Optional[str]], Optional[str]],
+               ttl_seconds: Optional[float] = None) -> Optional[str]:
+        """Atomically replaces the value of `key` with `fn(current_value)`; if that is None, leaves it as is."""
+        with self._lock:
+            value = fn(self._get_locked(key))
+            if value is not None:
+                self._set_locked(key, value, ttl_seconds)
+            return value
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove_locked(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteBackend:
+    """
+    Disk-backed map in a single SQLite table. It survives restarts, and with
+    WAL enabled it can be shared by several uvicorn workers on the same host.
+    Capped by entry count and optionally by total value size in bytes
+    (`max_bytes`), evicting the least recently used entries first.
+    """
+
+    def __init__(self, path: str, table: str = "kv", ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None, sliding_ttl: bool = False,
+                 max_bytes: Optional[int] = None):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sliding_ttl = sliding_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL, "
+            "size INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if "size" not in columns:
+            # Files written before values were sized
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(f"UPDATE {table} SET size = length(CAST(value AS BLOB))")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get_locked(self, key: str, now: float) -> Optional[str]:
+        row = self._conn.execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self.expirations += 1
+            return None
+        if self.sliding_ttl and self.ttl_seconds:
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ?, expires_at = ? WHERE key = ?",
+                (now, now + self.ttl_seconds, key),
+            )
+        else:
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def _set_locked(self, key: str, value: str, ttl_seconds: Optional[float], now: float) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = now + ttl if ttl else None
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+            (key, value, expires_at, now, len(value.encode("utf-8"))),
+        )
+        if self.max_entries:
+            self._evict_over_capacity()
+        if self.max_bytes:
+            self._evict_over_bytes(key)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get_locked(key, time.time())
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._set_locked(key, value, ttl_seconds, time.time())
+
+    def update(self, key: str, fn: Callable[[Optional[str]], Optional[str]],
+               ttl_seconds: Optional[float] = None) -> Optional[str]:
+        """
+        Atomically replaces the value of `key` with `fn(current_value)`; if
+        that is None, leaves it as is. The write lock is taken up front, so
+        concurrent workers serialise here.
+        """
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._get_locked(key, now))
+                if value is not None:
+                    self._set_locked(key, value, ttl_seconds, now)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def _evict_over_capacity(self) -> None:
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def _evict_over_bytes(self, keep: str) -> None:
+        """Evicts least recently used entries, never `keep` (the one just written), until under max_bytes."""
+        overflow = self._bytes_locked() - self.max_bytes
+        if overflow <= 0:
+            return
+        victims = []
+        for key, size in self._conn.execute(
+            f"SELECT key, size FROM {self.table} WHERE key != ? ORDER BY accessed_at", (keep,)
+        ):
+            if overflow <= 0:
+                break
+            victims.append((key,))
+            overflow -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def _bytes_locked(self) -> int:
+        (total,) = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        return total
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            return cursor.rowcount > 0
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            self.expirations += cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            total_bytes = self._bytes_locked()
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries or 0,
+            "bytes": total_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
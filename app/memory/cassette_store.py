@@ -0,0 +1,93 @@
+# app/memory/cassette_store.py
+
+# On-disk recordings of upstream LLM calls ("cassettes"), keyed by a hash of
+# the canonical request. Each entry keeps the status, the few headers the
+# SDK needs, the zlib-compressed body and the arrival time of every body
+# chunk, so a replay can reproduce both the payload and its timing. Reads and
+# writes, compression included, run in a worker thread so they do not block
+# the event loop.
+
+import asyncio
+import base64
+import hashlib
+import json
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from .backends import SQLiteBackend
+
+# (seconds after the request was sent, chunk length in bytes)
+ChunkTiming = Tuple[float, int]
+
+
+class CassetteEntry:
+    __slots__ = ("status_code", "headers", "body", "headers_after", "chunks", "model")
+
+    def __init__(self, status_code: int, headers: Dict[str, str], body: bytes,
+                 headers_after: float, chunks: List[ChunkTiming], model: Optional[str] = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.headers_after = headers_after
+        self.chunks = chunks
+        self.model = model
+
+    def encode(self) -> str:
+        return json.dumps({
+            "status_code": self.status_code,
+            "headers": self.headers,
+            "body": base64.b64encode(zlib.compress(self.body, 9)).decode("ascii"),
+            "headers_after": round(self.headers_after, 4),
+            "chunks": [[round(offset, 4), length] for offset, length in self.chunks],
+            "model": self.model,
+            "recorded_at": time.time(),
+        }, separators=(",", ":"))
+
+    @classmethod
+    def decode(cls, payload: str) -> "CassetteEntry":
+        data = json.loads(payload)
+        return cls(
+            data["status_code"],
+            data["headers"],
+            zlib.decompress(base64.b64decode(data["body"])),
+            data["headers_after"],
+            [(offset, length) for offset, length in data["chunks"]],
+            data.get("model"),
+        )
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Hash of the canonical request: method, path and the JSON body with sorted keys."""
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except ValueError:
+        canonical = body.decode("utf-8", "replace")
+    return hashlib.sha256(f"{method} {path}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    def __init__(self, backend: SQLiteBackend):
+        self.backend = backend
+
+    async def get(self, key: str) -> Optional[CassetteEntry]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, entry: CassetteEntry) -> None:
+        await asyncio.to_thread(self._put, key, entry)
+
+    def _get(self, key: str) -> Optional[CassetteEntry]:
+        payload = self.backend.get(key)
+        return CassetteEntry.decode(payload) if payload is not None else None
+
+    def _put(self, key: str, entry: CassetteEntry) -> None:
+        # A request recorded again replaces its earlier take
+        self.backend.set(key, entry.encode())
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.backend.path, "entries": len(self.backend)}
+
+
+def build_cassette_store() -> CassetteStore:
+    return CassetteStore(SQLiteBackend(settings.LLM_CASSETTE_PATH, table="cassette"))
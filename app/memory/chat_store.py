@@ -0,0 +1,106 @@
+# app/memory/chat_store.py
+
+# Chat history storage for the chatbot. Each session is one compact JSON
+# value, a list of [role, message] pairs with role "u" or "a", kept to the
+# last CHAT_HISTORY_MAX_MESSAGES messages. The store is capped in total size
+# (CHAT_STORE_MAX_BYTES, in UTF-8 bytes) and sessions expire after
+# CHAT_STORE_IDLE_TTL_SECONDS without activity. Rolling summaries are kept in
+# a store of their own, with the same session count and idle TTL, so they
+# never evict live histories.
+#
+# CHAT_STORE_BACKEND=sqlite keeps history in a WAL-mode SQLite file so every
+# uvicorn worker sees the same conversation. Its calls run in a worker
+# thread, since a write can wait on another worker's lock.
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ..core.config import settings
+from .backends import MemoryBackend, SQLiteBackend
+
+_ROLE_CODES = {"user": "u", "assistant": "a"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+
+def _encode(messages: List[List[str]]) -> str:
+    return json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+
+
+class ChatSessionStore:
+    def __init__(self, backend: Union[MemoryBackend, SQLiteBackend],
+                 summaries: Union[MemoryBackend, SQLiteBackend], max_messages: int):
+        self.backend = backend
+        self.summaries = summaries
+        self.max_messages = max_messages
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Runs a backend call, in a worker thread for SQLite so it does not block the event loop."""
+        if isinstance(self.backend, SQLiteBackend):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Returns the history as [{"role": ..., "message": ...}] dicts."""
+        payload = await self._call(self.backend.get, session_id)
+        if payload is None:
+            return []
+        return [{"role": _ROLE_NAMES[code], "message": message} for code, message in json.loads(payload)]
+
+    async def append_turn(self, session_id: str, prompt: str, response: str) -> None:
+        """Appends a user/assistant turn, keeping only the last `max_messages` messages."""
+        def append(payload: Optional[str]) -> str:
+            messages = json.loads(payload) if payload else []
+            messages.append([_ROLE_CODES["user"], prompt])
+            messages.append([_ROLE_CODES["assistant"], response])
+            return _encode(messages[-self.max_messages:])
+
+        await self._call(self.backend.update, session_id, append)
+
+    async def get_summary(self, session_id: str) -> Optional[Dict]:
+        """Rolling summary state: {"summary": str, "folded": [message fingerprints]}."""
+        payload = await self._call(self.summaries.get, session_id)
+        return json.loads(payload) if payload is not None else None
+
+    async def set_summary(self, session_id: str, state: Dict) -> None:
+        payload = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
+        await self._call(self.summaries.set, session_id, payload)
+
+    async def clear(self, session_id: str) -> bool:
+        await self._call(self.summaries.delete, session_id)
+        return await self._call(self.backend.delete, session_id)
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), "summaries": self.summaries.stats()}
+
+
+def build_chat_session_store() -> ChatSessionStore:
+    if settings.CHAT_STORE_BACKEND == "sqlite":
+        backend = SQLiteBackend(
+            settings.CHAT_STORE_SQLITE_PATH,
+            table="chat_sessions",
+            ttl_seconds=settings.CHAT_STORE_IDLE_TTL_SECONDS,
+            max_entries=settings.CHAT_STORE_MAX_SESSIONS,
+            max_bytes=settings.CHAT_STORE_MAX_BYTES,
+            sliding_ttl=True,
+        )
+        summaries = SQLiteBackend(
+            settings.CHAT_STORE_SQLITE_PATH,
+            table="chat_summaries",
+            ttl_seconds=settings.CHAT_STORE_IDLE_TTL_SECONDS,
+            max_entries=settings.CHAT_STORE_MAX_SESSIONS,
+            sliding_ttl=True,
+        )
+    else:
+        backend = MemoryBackend(
+            max_entries=settings.CHAT_STORE_MAX_SESSIONS,
+            ttl_seconds=settings.CHAT_STORE_IDLE_TTL_SECONDS,
+            max_bytes=settings.CHAT_STORE_MAX_BYTES,
+            sliding_ttl=True,
+        )
+        summaries = MemoryBackend(
+            max_entries=settings.CHAT_STORE_MAX_SESSIONS,
+            ttl_seconds=settings.CHAT_STORE_IDLE_TTL_SECONDS,
+            sliding_ttl=True,
+        )
+    return ChatSessionStore(backend, summaries, max_messages=settings.CHAT_HISTORY_MAX_MESSAGES)
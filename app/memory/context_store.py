@@ -0,0 +1,110 @@
+# app/memory/context_store.py
+
+# Server-side strategy contexts. A client uploads its SWOT / trends /
+# challenges / themes once, gets back a context_id, and references that ID on
+# later calls instead of resending the blobs. Prompt fragments rendered from a
+# context are cached next to it, so they are formatted once per context.
+# With a SQLite file the store's calls run in a worker thread so they do not
+# block the event loop.
+
+import asyncio
+import hashlib
+import uuid
+from typing import Any, Callable, Optional, Tuple, Union
+
+from ..api.models.context_model import ContextUploadRequest
+from ..core.config import settings
+from .backends import MemoryBackend, SQLiteBackend
+
+
+class ContextStore:
+    def __init__(self, backend: Union[MemoryBackend, SQLiteBackend], ttl_seconds: Optional[float]):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Runs a backend call, in a worker thread for SQLite so it does not block the event loop."""
+        if isinstance(self.backend, SQLiteBackend):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    @staticmethod
+    def content_hash(context: ContextUploadRequest) -> str:
+        # model_dump_json is deterministic for a given model, so it doubles as the canonical form
+        return hashlib.sha256(context.model_dump_json(exclude_none=True).encode("utf-8")).hexdigest()
+
+    async def put(self, context: ContextUploadRequest) -> Tuple[str, str, int]:
+        """Stores a context and returns (context_id, content_hash, size_bytes).
+        Uploading identical content again returns the existing ID."""
+        return await self._call(self._put, context)
+
+    def _put(self, context: ContextUploadRequest) -> Tuple[str, str, int]:
+        payload = context.model_dump_json(exclude_none=True)
+        digest = self.content_hash(context)
+
+        existing_id = self.backend.get(f"hash:{digest}")
+        if existing_id is not None and self.backend.get(f"ctx:{existing_id}") is not None:
+            return existing_id, digest, len(payload)
+
+        context_id = f"ctx_{uuid.uuid4().hex}"
+        self.backend.set(f"ctx:{context_id}", payload, self.ttl_seconds)
+        self.backend.set(f"hash:{digest}", context_id, self.ttl_seconds)
+        return context_id, digest, len(payload)
+
+    async def get(self, context_id: str) -> Optional[ContextUploadRequest]:
+        payload = await self._call(self.backend.get, f"ctx:{context_id}")
+        if payload is None:
+            return None
+        return ContextUploadRequest.model_validate_json(payload)
+
+    async def delete(self, context_id: str) -> bool:
+        return await self._call(self.backend.delete, f"ctx:{context_id}")
+
+    async def fragment(self, context_id: Optional[str], name: str, render: Callable[[], str]) -> str:
+        """
+        Returns the prompt fragment `name` for a context, rendering it with
+        `render()` only the first time. Without a context_id it just renders.
+        """
+        if not context_id:
+            return render()
+
+        key = f"frag:{context_id}:{name}"
+        cached = await self._call(self.backend.get, key)
+        if cached is not None:
+            self.fragment_hits += 1
+            return cached
+
+        self.fragment_misses += 1
+        rendered = render()
+        await self._call(self._put_fragment, context_id, key, rendered)
+        return rendered
+
+    def _put_fragment(self, context_id: str, key: str, rendered: str) -> None:
+        # Only cache fragments of contexts that still exist
+        if self.backend.get(f"ctx:{context_id}") is not None:
+            self.backend.set(key, rendered, self.ttl_seconds)
+
+    def stats(self) -> dict:
+        return {
+            **self.backend.stats(),
+            "fragment_hits": self.fragment_hits,
+            "fragment_misses": self.fragment_misses,
+        }
+
+
+_context_store: Optional[ContextStore] = None
+
+
+def get_context_store() -> ContextStore:
+    global _context_store
+    if _context_store is None:
+        # Each context takes up to a few slots (payload, hash index, fragments)
+        max_entries = settings.CONTEXT_STORE_MAX_ENTRIES * 8
+        if settings.CONTEXT_STORE_SQLITE_PATH:
+            backend = SQLiteBackend(settings.CONTEXT_STORE_SQLITE_PATH, table="strategy_context", max_entries=max_entries)
+        else:
+            backend = MemoryBackend(max_entries=max_entries)
+        _context_store = ContextStore(backend, ttl_seconds=settings.CONTEXT_STORE_TTL_SECONDS)
+    return _context_store
@@ -0,0 +1,76 @@
+# app/memory/job_store.py
+
+# Status and results of background analysis jobs. Each job is one JSON
+# record under its ID; records expire JOBS_RESULT_TTL_SECONDS after their
+# last update. With JOBS_SQLITE_PATH set the records live in a WAL-mode
+# SQLite file, so a client can poll any uvicorn worker for a job; its calls
+# then run in a worker thread so they do not block the event loop.
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Union
+
+from ..core.config import settings
+from .backends import MemoryBackend, SQLiteBackend
+
+
+class JobStore:
+    def __init__(self, backend: Union[MemoryBackend, SQLiteBackend], ttl_seconds: Optional[float]):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Runs a backend call, in a worker thread for SQLite so it does not block the event loop."""
+        if isinstance(self.backend, SQLiteBackend):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def create(self, kind: str) -> Dict[str, Any]:
+        """Records a new queued job of `kind` and returns its record."""
+        record = {
+            "job_id": f"job_{uuid.uuid4().hex}",
+            "kind": kind,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "result": None,
+        }
+        await self._call(self.backend.set, record["job_id"], json.dumps(record), self.ttl_seconds)
+        return record
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        payload = await self._call(self.backend.get, job_id)
+        return json.loads(payload) if payload is not None else None
+
+    async def update(self, job_id: str, **fields: Any) -> bool:
+        """
+        Merges `fields` into the job record. A record that has been deleted,
+        evicted or has expired meanwhile stays gone (a partial one would not
+        be a valid job status), and False is returned.
+        """
+        def merge(payload: Optional[str]) -> Optional[str]:
+            if payload is None:
+                return None
+            record = json.loads(payload)
+            record.update(fields)
+            return json.dumps(record)
+
+        return await self._call(self.backend.update, job_id, merge, self.ttl_seconds) is not None
+
+    async def delete(self, job_id: str) -> bool:
+        return await self._call(self.backend.delete, job_id)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def build_job_store() -> JobStore:
+    if settings.JOBS_SQLITE_PATH:
+        backend = SQLiteBackend(settings.JOBS_SQLITE_PATH, table="jobs", max_entries=settings.JOBS_MAX_ENTRIES)
+    else:
+        backend = MemoryBackend(max_entries=settings.JOBS_MAX_ENTRIES)
+    return JobStore(backend, ttl_seconds=settings.JOBS_RESULT_TTL_SECONDS)
@@ -1,6 +1,74 @@
-from typing import Optional
-from app.api.models.trend_summary_model import TrendDataInput
-from app.api.models.swot_model import SWOTDataInput
+# app/memory/store.py
 
+# Per-session server-side state (e.g. the last SWOT / trend input a session
+# submitted). Entries are keyed by the session scope from the X-Session-ID
+# header, bounded in size and evicted by LRU and idle TTL.
+#
+# SESSION_STORE_BACKEND=memory keeps state in the worker process;
+# SESSION_STORE_BACKEND=sqlite stores it in a WAL-mode SQLite file that every
+# uvicorn worker on the host shares (`--workers N`); its calls run in a
+# worker thread so a locked write does not block the event loop.
 
-last_swot_input: Optional[SWOTDataInput] = None
\ No newline at end of file
+import asyncio
+from typing import Any, Callable, Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+from ..core.config import settings
+from ..core.request_context import session_id
+from .backends import MemoryBackend, SQLiteBackend
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class SessionStore:
+    def __init__(self, backend: Union[MemoryBackend, SQLiteBackend]):
+        self.backend = backend
+
+    @staticmethod
+    def _key(kind: str, scope: Optional[str]) -> str:
+        return f"{scope or session_id.get()}:{kind}"
+
+    async def _call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Runs a backend call, in a worker thread for SQLite so it does not block the event loop."""
+        if isinstance(self.backend, SQLiteBackend):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def save_last_input(self, kind: str, data: BaseModel, scope: Optional[str] = None) -> None:
+        """Remembers `data` as the latest `kind` input of the current session."""
+        await self._call(self.backend.set, self._key(kind, scope), data.model_dump_json())
+
+    async def get_last_input(self, kind: str, model_class: Type[ModelT], scope: Optional[str] = None) -> Optional[ModelT]:
+        payload = await self._call(self.backend.get, self._key(kind, scope))
+        return model_class.model_validate_json(payload) if payload is not None else None
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def _build_session_store() -> SessionStore:
+    if settings.SESSION_STORE_BACKEND == "sqlite":
+        backend = SQLiteBackend(
+            settings.SESSION_STORE_SQLITE_PATH,
+            table="session_state",
+            ttl_seconds=settings.SESSION_STORE_TTL_SECONDS,
+            max_entries=settings.SESSION_STORE_MAX_ENTRIES,
+        )
+    else:
+        backend = MemoryBackend(
+            max_entries=settings.SESSION_STORE_MAX_ENTRIES,
+            ttl_seconds=settings.SESSION_STORE_TTL_SECONDS,
+        )
+    return SessionStore(backend)
+
+
+session_store = _build_session_store()
+
+
+async def save_last_input(kind: str, data: BaseModel) -> None:
+    await session_store.save_last_input(kind, data)
+
+
+async def get_last_input(kind: str, model_class: Type[ModelT]) -> Optional[ModelT]:
+    return await session_store.get_last_input(kind, model_class)
@@ -1,18 +1,21 @@
 # app/services/business_goal_service2.py
 
 import json
-from openai import AsyncOpenAI
-from typing import Dict
-
-from ..core.config import settings
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..core.llm_client import get_llm_gateway, llm_reply_parse_failures, record_reply_parse_failure
+from ..core.rate_limit import UpstreamOverloaded
+from ..core.cache import cached_response
+from ..core.input_check import TRUSTED_INPUT_NOTE, InputVerdict, check_inputs
+from ..core import profiling, prompts
+from ..memory.context_store import get_context_store
 from ..core.AI_models import MODEL, TEMPERATURE
 from ..api.models.business_goal_model2 import BusinessGoalAnalysisRequest, BusinessGoalAnalysisResponse, DashboardInsights
 from ..utils.Tone import TONE_GUIDELINES
+from ..utils.json_stream import IncrementalJSONParser
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-def _format_prompt_for_goal_analysis(request: BusinessGoalAnalysisRequest) -> str:
-    """Formats the business goals and strategic context into a clear text prompt."""
+def _format_strategic_context(request: BusinessGoalAnalysisRequest) -> str:
+    """Formats the vision, themes and challenges shared by every goal analysis."""
 
     prompt = "## STRATEGIC CONTEXT\n"
     prompt += f"- **Vision:** {request.vision}\n"
@@ -33,6 +36,20 @@ def _format_prompt_for_goal_analysis(request: BusinessGoalAnalysisRequest) -> st
             f"     - Risk Score: {challenge.risk_score}\n"
             f"     - Description: {challenge.description}\n"
         )
+    return prompt
+
+
+async def _cached_strategic_context(request: BusinessGoalAnalysisRequest) -> str:
+    """The strategic context section, rendered once per stored context."""
+    return await get_context_store().fragment(
+        request.context_id, "goal_strategic_context", lambda: _format_strategic_context(request)
+    )
+
+
+def _format_prompt_for_goal_analysis(request: BusinessGoalAnalysisRequest, strategic_context: Optional[str] = None) -> str:
+    """Formats the business goals and strategic context into a clear text prompt."""
+
+    prompt = strategic_context if strategic_context is not None else _format_strategic_context(request)
 
     prompt += "\n## BUSINESS GOALS FOR ANALYSIS\n\n"
     for i, goal in enumerate(request.goals, 1):
@@ -49,30 +66,23 @@ def _format_prompt_for_goal_analysis(request: BusinessGoalAnalysisRequest) -> st
     return prompt
 
 
-async def analyze_business_goals(request: BusinessGoalAnalysisRequest) -> BusinessGoalAnalysisResponse:
-    """
-    Analyzes a portfolio of business goals against strategic context using an AI model.
-    First, it validates the input for relevance before proceeding with the analysis.
-    """
-    user_prompt = _format_prompt_for_goal_analysis(request)
-    tone_instruction = TONE_GUIDELINES.get(request.tone, TONE_GUIDELINES["advisor"])
-
-    
-    validation_and_analysis_schema = {
-        "type": "object",
-        "properties": {
-            "is_input_valid": {"type": "boolean"},
-            "validation_error_message": {
-                "type": "string", 
-                "description": "If input is invalid, explain which goal is problematic and why. Otherwise, this should be null."
-            },
-            "analysis": BusinessGoalAnalysisResponse.model_json_schema()
+# Static instructions and schema first, so every request shares the same
+# prompt prefix; tone and the goals follow in later messages.
+VALIDATION_AND_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_input_valid": {"type": "boolean"},
+        "validation_error_message": {
+            "type": "string", 
+            "description": "If input is invalid, explain which goal is problematic and why. Otherwise, this should be null."
         },
-        "required": ["is_input_valid", "validation_error_message"]
-    }
+        "analysis": prompts.json_schema(BusinessGoalAnalysisResponse)
+    },
+    "required": ["is_input_valid", "validation_error_message"]
+}
 
-    system_prompt = f"""
-    You are an expert Chief Strategy Officer. {tone_instruction} You have two critical tasks.
+BUSINESS_GOAL_PROMPT = prompts.register("business_goal", "1", f"""
+    You are an expert Chief Strategy Officer. You have two critical tasks.
 
     **TASK 1: VALIDATE INPUT**
     First, you MUST examine the `title` and `description` of EACH goal provided by the user. If ANY goal contains clearly non-business-related content (e.g., "tell me a joke," random gibberish, personal notes), you must stop immediately.
@@ -90,43 +100,122 @@ async def analyze_business_goals(request: BusinessGoalAnalysisRequest) -> Busine
 
     **CRITICAL OUTPUT INSTRUCTIONS:**
     Your response MUST be ONLY a single, valid JSON object conforming to this exact schema. Do not include any text or markdown outside the JSON structure.
-    {json.dumps(validation_and_analysis_schema, indent=2)}
+    {json.dumps(VALIDATION_AND_ANALYSIS_SCHEMA, indent=2)}
+    """)
+
+
+def _check_goals(request: BusinessGoalAnalysisRequest) -> InputVerdict:
+    """The local pre-check of the goals' titles and descriptions."""
+    return check_inputs("business_goal", (f"{goal.title} {goal.description}" for goal in request.goals))
+
+
+def _build_messages(
+    request: BusinessGoalAnalysisRequest, trusted: bool = False, strategic_context: Optional[str] = None
+) -> List[Dict[str, str]]:
+    tone = TONE_GUIDELINES.get(request.tone, TONE_GUIDELINES["advisor"])
+    return BUSINESS_GOAL_PROMPT.messages(
+        {"role": "system", "content": f"{tone}\n{TRUSTED_INPUT_NOTE}" if trusted else tone},
+        {"role": "user", "content": _format_prompt_for_goal_analysis(request, strategic_context)}
+    )
+
+
+def _error_response(message: str) -> BusinessGoalAnalysisResponse:
+    return BusinessGoalAnalysisResponse(
+        alignment_summary="", smart_suggestions=[], strategic_priorities=[],
+        strategic_fit_scores=[], execution_watchouts=[],
+        dashboard_insights=DashboardInsights(risks=[], regulatory_compliances=[], roadblocks=[], talent=[], culture_realignment=[], change_management=[], learning_and_development=[], capabilities=[]),
+        error=message
+    )
+
+
+def _parse_analysis(content: str) -> BusinessGoalAnalysisResponse:
+    """Turns the model's JSON reply into the response, or the input-validation error it reports."""
+    try:
+        response_data = json.loads(content)
+    except ValueError as e:
+        record_reply_parse_failure("business_goal", e)
+        raise
+
+    if not response_data.get("is_input_valid"):
+        error_msg = response_data.get("validation_error_message", "An input goal was deemed irrelevant for business analysis.")
+        return _error_response(error_msg)
+
+    analysis_payload = response_data.get("analysis")
+    if not analysis_payload:
+        llm_reply_parse_failures.inc(service="business_goal", reason="missing_analysis")
+        raise ValueError("AI returned a valid flag but no analysis payload.")
+
+    try:
+        return BusinessGoalAnalysisResponse.model_validate(analysis_payload)
+    except ValueError as e:
+        record_reply_parse_failure("business_goal", e)
+        raise
+
+
+@cached_response("business_goal", BusinessGoalAnalysisResponse, model=MODEL, prompt_version=BUSINESS_GOAL_PROMPT.version_tag)
+async def analyze_business_goals(request: BusinessGoalAnalysisRequest) -> BusinessGoalAnalysisResponse:
+    """
+    Analyzes a portfolio of business goals against strategic context using an AI model.
+    First, it validates the input for relevance before proceeding with the analysis.
     """
+    verdict = _check_goals(request)
+    if verdict.rejected:
+        return _error_response(verdict.reason)
 
     try:
-        response = await client.chat.completions.create(
+        with profiling.stage("prompt"):
+            strategic_context = await _cached_strategic_context(request)
+            messages = _build_messages(request, trusted=verdict.trusted, strategic_context=strategic_context)
+        response = await get_llm_gateway().chat_completion(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=TEMPERATURE,
             response_format={"type": "json_object"}
         )
-        
-        response_data = json.loads(response.choices[0].message.content)
-
-        #  NEW VALIDATION LOGIC 
-        if not response_data.get("is_input_valid"):
-            error_msg = response_data.get("validation_error_message", "An input goal was deemed irrelevant for business analysis.")
-            return BusinessGoalAnalysisResponse(
-                alignment_summary="", smart_suggestions=[], strategic_priorities=[],
-                strategic_fit_scores=[], execution_watchouts=[],
-                dashboard_insights=DashboardInsights(risks=[], regulatory_compliances=[], roadblocks=[], talent=[], culture_realignment=[], change_management=[], learning_and_development=[]),
-                error=error_msg
-            )
-        
-        analysis_payload = response_data.get("analysis")
-        if not analysis_payload:
-             raise ValueError("AI returned a valid flag but no analysis payload.")
+        with profiling.stage("parse"):
+            return _parse_analysis(response.choices[0].message.content)
+
+    except UpstreamOverloaded:
+        raise
+    except Exception as e:
+        return _error_response(f"An error occurred during AI processing: {str(e)}")
 
-        return BusinessGoalAnalysisResponse.model_validate(analysis_payload)
 
+async def stream_business_goal_analysis(request: BusinessGoalAnalysisRequest) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of `analyze_business_goals`. Yields ("section", {"name", "value"})
+    for each top-level field of the analysis as soon as the model has finished writing it,
+    then ("done", BusinessGoalAnalysisResponse) with the validated full response.
+    """
+    cached = await analyze_business_goals.cache_lookup(request)
+    if cached is not None:
+        for name, value in cached.model_dump(mode="json", exclude={"error"}).items():
+            yield "section", {"name": name, "value": value}
+        yield "done", cached
+        return
+
+    verdict = _check_goals(request)
+    if verdict.rejected:
+        yield "done", _error_response(verdict.reason)
+        return
+
+    parser = IncrementalJSONParser(path=("analysis",))
+    try:
+        strategic_context = await _cached_strategic_context(request)
+        async for delta in get_llm_gateway().stream_chat_completion(
+            model=MODEL,
+            messages=_build_messages(request, trusted=verdict.trusted, strategic_context=strategic_context),
+            temperature=TEMPERATURE,
+            response_format={"type": "json_object"}
+        ):
+            for name, value in parser.feed(delta):
+                yield "section", {"name": name, "value": value}
+        result = _parse_analysis(parser.text)
+
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
-        error_message = f"An error occurred during AI processing: {str(e)}"
-        return BusinessGoalAnalysisResponse(
-            alignment_summary="", smart_suggestions=[], strategic_priorities=[],
-            strategic_fit_scores=[], execution_watchouts=[],
-            dashboard_insights=DashboardInsights(risks=[], regulatory_compliances=[], roadblocks=[], talent=[], culture_realignment=[], change_management=[], learning_and_development=[]),
-            error=error_message
-        )
\ No newline at end of file
+        result = _error_response(f"An error occurred during AI processing: {str(e)}")
+
+    await analyze_business_goals.cache_store(request, result)
+    yield "done", result
@@ -1,25 +1,32 @@
 # app/services/challenge_risk_service.py
 
-from openai import AsyncOpenAI
+import asyncio
+import time
+from typing import Optional
 from app.api.models.challenge_model import ChallengeEvaluationRequest, ChallengeRiskScoreResponse
-from app.core.config import settings
+from app.core.llm_client import get_llm_gateway
+from app.core.rate_limit import UpstreamOverloaded
+from app.core.cache import cached_response
+from app.core import prompts
+from app.memory.context_store import get_context_store
 
 from app.api.models.challenge_model import (
+    ChallengeInput,
     ChallengeRecommendationRequest, 
-    ChallengeRecommendationResponse
+    ChallengeRecommendationResponse,
+    ChallengeBatchEvaluationRequest,
+    ChallengeBatchEvaluationResponse,
+    ChallengeBatchScore,
+    RiskScoreModelOutput,
+    RecommendationsModelOutput
 )
+from app.api.models.swot_model import SWOTDataInput
+from app.api.models.trend_summary_model import TrendDataInput
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
-async def evaluate_challenge_risk(request: ChallengeEvaluationRequest) -> ChallengeRiskScoreResponse:
-    challenge = request.challenge
-    swot = request.swot
-    trends = request.trends
-
-    prompt = f"""
+RISK_PROMPT_HEADER = """
 You are a strategic risk evaluation AI.
 
-Evaluate the following business challenge and return a single risk score between 1 and 100, where higher means more risk. Dont provide the risk score if the challenge input (e.g. title or description) is not clear or insufficient, irrelevant information is provided, in that case, just provide NaN value to the risk score.
+Evaluate the business challenge provided by the user and return a single risk score between 1 and 100, where higher means more risk. Dont provide the risk score if the challenge input (e.g. title or description) is not clear or insufficient, irrelevant information is provided, in that case, return null as the risk score.
 
 **Guidelines:**
 - Consider the challenge's impact on the business, its category, and the ability to address it.
@@ -30,92 +37,136 @@ Evaluate the following business challenge and return a single risk score between
 - Do not use any markdown formatting.
 - Do not include any other text in the response.
 
+"""
 
-Challenge Details:
-- Title: {challenge.title}
-- Category: {challenge.category}
-- Description: {challenge.description}
-- Impact on Business: {challenge.impact_on_business}
-- Ability to Address: {challenge.ability_to_address}
+RISK_PROMPT = prompts.register("challenge_risk", "2", (
+    "You are a business risk analysis expert.\n"
+    + RISK_PROMPT_HEADER
+    + "Return the score (1–100) as `risk_score`, or null as described above."
+))
 
-SWOT Context:
-- Strengths: {', '.join(swot.strengths)}
-- Weaknesses: {', '.join(swot.weaknesses)}
-- Opportunities: {', '.join(swot.opportunities)}
-- Threats: {', '.join(swot.threats)}
+# Max upstream calls a single batch request keeps open at once
+BATCH_CONCURRENCY = 5
 
-Trends Context:
-"""
-    for section_name, items in trends.dict().items():
-        if items:
-            prompt += f"\n--- {section_name.replace('_', ' ').title()} ---\n"
+
+def _format_trends_context(trends: TrendDataInput) -> str:
+    text = ""
+    for section_name, items in trends.model_dump().items():
+        # Skip scalar fields such as `tone` or `mission`; only sections are lists
+        if items and isinstance(items, list):
+            text += f"\n--- {section_name.replace('_', ' ').title()} ---\n"
             for item in items:
                 if isinstance(item, dict):
                     q = item.get("question", "N/A")
                     a = item.get("answer", "N/A")
                     impact = item.get("impact", "N/A")
-                    prompt += f"Q: {q}\nA: {a}\nImpact: {impact}\n"
+                    text += f"Q: {q}\nA: {a}\nImpact: {impact}\n"
                 else:
-                    prompt += f"Note: Unexpected item format: {item}\n"
+                    text += f"Note: Unexpected item format: {item}\n"
+    return text
 
-    prompt += "\n\nReturn ONLY in this format:\nRISK SCORE: [1–100]"
 
-    response = await client.chat.completions.create(
+def _format_risk_context(swot: SWOTDataInput, trends: TrendDataInput) -> str:
+    """Renders the SWOT and trend context shared by every challenge in a request."""
+    return f"""
+SWOT Context:
+- Strengths: {', '.join(swot.strengths)}
+- Weaknesses: {', '.join(swot.weaknesses)}
+- Opportunities: {', '.join(swot.opportunities)}
+- Threats: {', '.join(swot.threats)}
+
+Trends Context:
+""" + _format_trends_context(trends)
+
+
+async def _score_challenge(challenge: ChallengeInput, risk_context: str) -> Optional[int]:
+    """Scores one challenge against a pre-rendered context. None if no score was returned."""
+    # Static instructions, then the context shared by a batch, then the
+    # challenge itself: requests for one context share a long common prefix.
+    prompt = risk_context + f"""
+Challenge Details:
+- Title: {challenge.title}
+- Category: {challenge.category}
+- Description: {challenge.description}
+- Impact on Business: {challenge.impact_on_business}
+- Ability to Address: {challenge.ability_to_address}
+"""
+
+    output = await get_llm_gateway().structured_completion(
+        RiskScoreModelOutput,
         model="gpt-4o-mini",
-        messages=[{"role": "system", "content": "You are a business risk analysis expert."},
-                  {"role": "user", "content": prompt}],
+        messages=RISK_PROMPT.messages({"role": "user", "content": prompt}),
         temperature=0.3,
         max_tokens=100
     )
+    return output.risk_score
 
-    content = response.choices[0].message.content
 
-    import re
-    match = re.search(r"RISK SCORE:\s*(\d+)", content)
-    score = int(match.group(1)) if match else 50
+@cached_response("challenge_risk", ChallengeRiskScoreResponse, model="gpt-4o-mini", prompt_version=RISK_PROMPT.version_tag)
+async def evaluate_challenge_risk(request: ChallengeEvaluationRequest) -> ChallengeRiskScoreResponse:
+    risk_context = await get_context_store().fragment(
+        request.context_id, "risk_context", lambda: _format_risk_context(request.swot, request.trends)
+    )
+    score = await _score_challenge(request.challenge, risk_context)
+    if score is None:
+        raise ValueError("The challenge is unclear or insufficient; no risk score was returned.")
 
     return ChallengeRiskScoreResponse(risk_score=score)
 
 
+async def evaluate_challenge_risk_batch(request: ChallengeBatchEvaluationRequest) -> ChallengeBatchEvaluationResponse:
+    """
+    Scores every challenge against one shared SWOT/trend context. The context
+    is rendered once and the per-challenge calls run concurrently, at most
+    BATCH_CONCURRENCY at a time.
+    """
+    started = time.perf_counter()
+    risk_context = await get_context_store().fragment(
+        request.context_id, "risk_context", lambda: _format_risk_context(request.swot, request.trends)
+    )
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def score_one(challenge: ChallengeInput) -> ChallengeBatchScore:
+        async with semaphore:
+            call_started = time.perf_counter()
+            try:
+                score = await _score_challenge(challenge, risk_context)
+                error = None if score is not None else "The challenge is unclear or insufficient; no risk score was returned."
+            except UpstreamOverloaded:
+                raise
+            except Exception as e:
+                score, error = None, f"Risk evaluation failed: {str(e)}"
+            return ChallengeBatchScore(
+                title=challenge.title,
+                risk_score=score,
+                latency_ms=round((time.perf_counter() - call_started) * 1000, 2),
+                error=error
+            )
+
+    results = await asyncio.gather(*(score_one(challenge) for challenge in request.challenges))
+
+    return ChallengeBatchEvaluationResponse(
+        results=list(results),
+        total_latency_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
 
-async def generate_challenge_recommendations(
-    request: ChallengeRecommendationRequest
-) -> ChallengeRecommendationResponse:
-
-    swot = request.swot
-    trends = request.trends
-    challenges = request.challenges
 
-    prompt = "You are a business strategy consultant. You are tasked with providing strategic recommendations for the organization's top challenges.\n\n"
+def _format_recommendation_context(swot: SWOTDataInput, trends: TrendDataInput) -> str:
+    text = "\nSWOT:\n"
+    text += f"- Strengths: {', '.join(swot.strengths)}\n"
+    text += f"- Weaknesses: {', '.join(swot.weaknesses)}\n"
+    text += f"- Opportunities: {', '.join(swot.opportunities)}\n"
+    text += f"- Threats: {', '.join(swot.threats)}\n"
 
-    prompt += "CHALLENGES:\n"
-    for i, ch in enumerate(challenges, 1):
-        prompt += f"{i}. Title: {ch.title}\n"
-        prompt += f"   Category: {ch.category}\n"
-        prompt += f"   Risk Score: {ch.risk_score}\n"
-        prompt += f"   Description: {ch.description}\n"
+    text += "\nTRENDS:\n"
+    text += _format_trends_context(trends)
+    return text
 
-    prompt += "\nSWOT:\n"
-    prompt += f"- Strengths: {', '.join(swot.strengths)}\n"
-    prompt += f"- Weaknesses: {', '.join(swot.weaknesses)}\n"
-    prompt += f"- Opportunities: {', '.join(swot.opportunities)}\n"
-    prompt += f"- Threats: {', '.join(swot.threats)}\n"
 
-    prompt += "\nTRENDS:\n"
-    for section_name, items in trends.dict().items():
-        if items:
-            prompt += f"\n--- {section_name.replace('_', ' ').title()} ---\n"
-            for item in items:
-                if isinstance(item, dict):
-                    q = item.get("question", "N/A")
-                    a = item.get("answer", "N/A")
-                    impact = item.get("impact", "N/A")
-                    prompt += f"Q: {q}\nA: {a}\nImpact: {impact}\n"
-                else:
-                    prompt += f"Note: Unexpected item format: {item}\n"
+RECOMMENDATION_PROMPT = prompts.register("challenge_recommendations", "2", """You are a strategic business advisor.
+You are tasked with providing strategic recommendations for the organization's top challenges.
 
-    prompt += """
-Now, based on the given challenges, SWOT, and Trend analysis above — generate a concise and strategic list of recommendations.
+Based on the challenges, SWOT, and Trend analysis provided by the user — generate a concise and strategic list of recommendations.
 Your response should address the most critical issues and propose high-level business actions.
 
 **Guidelines:**
@@ -123,33 +174,40 @@ Your response should address the most critical issues and propose high-level bus
 - Prioritize recommendations based on the risk scores of the challenges.
 - Ensure recommendations are clear, concise, and directly related to the challenges.
 - Avoid generic advice; tailor recommendations to the specific challenges and context provided.
-- Use bullet points for clarity.
+- Return each recommendation as one short item of `recommendations`.
 - If the challenges are not clear or insufficient information is provided, state that no recommendations can be generated.
 - If the SWOT or Trend analysis is lacking, indicate that as well.
- 
+""")
 
-Return output in this format:
 
-RECOMMENDATIONS:
-- [Recommendation 1]
-- [Recommendation 2]
-- ...
-    """
+@cached_response("challenge_recommendations", ChallengeRecommendationResponse, model="gpt-4o-mini", prompt_version=RECOMMENDATION_PROMPT.version_tag)
+async def generate_challenge_recommendations(
+    request: ChallengeRecommendationRequest
+) -> ChallengeRecommendationResponse:
 
-    response = await client.chat.completions.create(
+    swot = request.swot
+    trends = request.trends
+    challenges = request.challenges
+
+    prompt = await get_context_store().fragment(
+        request.context_id, "recommendation_context", lambda: _format_recommendation_context(swot, trends)
+    )
+
+    prompt += "\nCHALLENGES:\n"
+    for i, ch in enumerate(challenges, 1):
+        prompt += f"{i}. Title: {ch.title}\n"
+        prompt += f"   Category: {ch.category}\n"
+        prompt += f"   Risk Score: {ch.risk_score}\n"
+        prompt += f"   Description: {ch.description}\n"
+
+    output = await get_llm_gateway().structured_completion(
+        RecommendationsModelOutput,
         model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a strategic business advisor."},
-            {"role": "user", "content": prompt}
-        ],
+        messages=RECOMMENDATION_PROMPT.messages({"role": "user", "content": prompt}),
         temperature=0.4,
         max_tokens=800
     )
 
-    content = response.choices[0].message.content
-
-    import re
-    match = re.search(r"RECOMMENDATIONS:\s*(.*)", content, re.DOTALL)
-    rec_text = match.group(1).strip() if match else "No recommendations generated."
-
+    # Same "- item" lines the endpoint has always returned
+    rec_text = "\n".join(f"- {item}" for item in output.recommendations) or "No recommendations generated."
     return ChallengeRecommendationResponse(recommendations=rec_text)
\ No newline at end of file
@@ -1,102 +1,269 @@
 # backend/chat_manager.py
-from typing import List, Dict
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
 import asyncio
+import contextvars
+import hashlib
+import time
 from app.core.core import AIService
+from app.core import metrics, prompts
+from app.core.config import settings
+from app.core.llm_client import get_llm_gateway
+from app.core.request_context import deadline, priority
+from app.memory.chat_store import build_chat_session_store
+from app.utils.tokens import count_tokens, truncate_to_tokens
 
-class ChatManager:
-    def __init__(self):
-        self.ai_service = AIService()
-        self.user_sessions: Dict[str, List[Dict[str, str]]] = {}
-    
-    async def chat(self, user_id: str, prompt: str, chat_history: List[Dict] = None) -> str:
-        system_prompt = (
-            "You are a concise, knowledgeable business expert with global business expertise. "
-            "Answer only business-related questions clearly and briefly. "
-            "For tactical questions, provide a numbered list with brief explanations. "
-            "For strategic or ambiguous questions, offer a structured framework with key considerations and clear reasoning. "
-            "Always maintain a professional, engaging tone and end with an invitation for further engagement (e.g., 'Want a deeper dive?' or 'Ready when you are.'). "
-            "For greetings or goodbyes, be polite. "
-            "For non-business questions, politely respond: 'I don’t have knowledge on that topic, but I’m happy to help with any business-related questions!'"
-            
-            """ 
-            Instruction 2:
-            
-            When such questions arise, deflect gracefully with a witty but focused redirection, e.g.: 
-            "Let’s stay focused on what moves the needle. Got a business challenge I can help 
-            untangle?" 
-            "That’s outside our business sandbox. Let’s zoom back in—what’s the challenge that’s 
-            slowing down your next big move?" 
-            "I hear you—but I’m wired for business breakthroughs, not debates. So, what’s the next 
-            strategic puzzle we should crack?" 
-            "Interesting... but let’s stick to our lane. Got a market, product, or growth challenge I can 
-            help with?" 
-            "That might be a different conversation over dinner. Right now, let’s focus on your next 
-            smart decision."
-            
-            Instruction 3:
-            
-            You use a hybrid response strategy, like a top consultant: 
-            1. If the user asks a clear, tactical business question, answer directly 
-            with: 
-            • Clean structure (bullets or short sections) 
-            • Relevant insight, not excessive detail 
-            • Optional call-to-action (e.g. “Want to go deeper on this?”) 
-            2. If the user asks a strategic, ambiguous, or high-stakes question, first: 
-            • Pause briefly to frame the situation like a consultant would 
-            • Explain how you’re thinking (e.g., evaluating key factors, context, or options) 
-            • THEN answer 
-            Use framing language like: 
-            • “Let’s break this down from a strategic lens…” 
-            • “Here’s how I’d think through this as your advisor…” 
-            • “There are three angles to consider before we decide…” 
-            • “Before we dive in, here’s what really matters…” 
-            Only use framing when it adds clarity, not as filler. Avoid over-explaining your logic. Think 
-            like an elite consultant, not a lecture. 
-            
-            """
-            
-            
-        )
-        
-        # Use provided chat history or get from memory
-        if chat_history is None:
-            chat_history = self.user_sessions.get(user_id, [])
+chat_ttft_seconds = metrics.histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from request start to the first streamed chatbot token.",
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+)
+chat_prompt_tokens = metrics.histogram(
+    "chat_prompt_tokens",
+    "Locally counted prompt tokens per chatbot request.",
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000)
+)
+chat_history_tokens_saved = metrics.counter(
+    "chat_history_tokens_saved_total",
+    "History tokens not sent verbatim because they were folded into the rolling summary."
+)
+
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_PROMPT = prompts.register("chat_summary", "1", (
+    "You maintain a running summary of a business advisory chat. "
+    "Merge the new conversation turns into the current summary. Keep the user's goals, "
+    "company facts, decisions and open questions; drop greetings and filler. "
+    "Reply with the updated summary only, in at most a short paragraph."
+))
+# Longest single message (in tokens) passed to the summariser
+SUMMARY_MESSAGE_TOKEN_LIMIT = 500
+
+
+class ConversationContext(NamedTuple):
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    history_tokens_saved: int
+
+
+def _fingerprint(item: Dict) -> str:
+    return hashlib.sha1(f"{item.get('role')}:{item.get('message', '')}".encode("utf-8")).hexdigest()[:16]
+
+
+SYSTEM_PROMPT = (
+        "You are a concise, knowledgeable business expert with global business expertise. "
+        "Answer only business-related questions clearly and briefly. "
+        "For tactical questions, provide a numbered list with brief explanations. "
+        "For strategic or ambiguous questions, offer a structured framework with key considerations and clear reasoning. "
+        "Always maintain a professional, engaging tone and end with an invitation for further engagement (e.g., 'Want a deeper dive?' or 'Ready when you are.'). "
+        "For greetings or goodbyes, be polite. "
+        "For non-business questions, politely respond: 'I don’t have knowledge on that topic, but I’m happy to help with any business-related questions!'"
         
-        history_context = ""
-        if chat_history:
-            for item in chat_history[-10:]:  
-                if item.get("role") == "user":
-                    history_context += f"User: {item.get('message', '')}\n"
-                elif item.get("role") == "assistant":
-                    history_context += f"AI: {item.get('message', '')}\n"
+        """ 
+        Instruction 2:
         
-        # Build full conversation context
-        conversation_context = (
-            system_prompt + "\n" + history_context + f"User: {prompt}\nAI:"
-        )
+        When such questions arise, deflect gracefully with a witty but focused redirection, e.g.: 
+        "Let’s stay focused on what moves the needle. Got a business challenge I can help 
+        untangle?" 
+        "That’s outside our business sandbox. Let’s zoom back in—what’s the challenge that’s 
+        slowing down your next big move?" 
+        "I hear you—but I’m wired for business breakthroughs, not debates. So, what’s the next 
+        strategic puzzle we should crack?" 
+        "Interesting... but let’s stick to our lane. Got a market, product, or growth challenge I can 
+        help with?" 
+        "That might be a different conversation over dinner. Right now, let’s focus on your next 
+        smart decision."
         
-        response = await self.ai_service.generate_response(conversation_context)
+        Instruction 3:
         
-        # Save to in-memory storage
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = []
+        You use a hybrid response strategy, like a top consultant: 
+        1. If the user asks a clear, tactical business question, answer directly 
+        with: 
+        • Clean structure (bullets or short sections) 
+        • Relevant insight, not excessive detail 
+        • Optional call-to-action (e.g. “Want to go deeper on this?”) 
+        2. If the user asks a strategic, ambiguous, or high-stakes question, first: 
+        • Pause briefly to frame the situation like a consultant would 
+        • Explain how you’re thinking (e.g., evaluating key factors, context, or options) 
+        • THEN answer 
+        Use framing language like: 
+        • “Let’s break this down from a strategic lens…” 
+        • “Here’s how I’d think through this as your advisor…” 
+        • “There are three angles to consider before we decide…” 
+        • “Before we dive in, here’s what really matters…” 
+        Only use framing when it adds clarity, not as filler. Avoid over-explaining your logic. Think 
+        like an elite consultant, not a lecture. 
         
-        # Add the conversation to memory (keeping last 20 messages)
-        self.user_sessions[user_id].append({"role": "user", "message": prompt})
-        self.user_sessions[user_id].append({"role": "assistant", "message": response})
+        """
         
-        if len(self.user_sessions[user_id]) > 20:
-            self.user_sessions[user_id] = self.user_sessions[user_id][-20:]
         
+    )
+
+CHAT_PROMPT = prompts.register("chatbot", "1", SYSTEM_PROMPT)
+
+
+class ChatManager:
+    def __init__(self):
+        self.ai_service = AIService()
+        self.user_sessions = build_chat_session_store()
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
+    
+    def _split_history(self, chat_history: List[Dict]) -> tuple[List[Dict], List[Dict], int]:
+        """
+        Splits the history into (older, recent, recent_tokens): `recent` is the
+        longest run of latest messages that fits CHAT_HISTORY_TOKEN_BUDGET and
+        is sent verbatim; `older` gets folded into the rolling summary.
+        """
+        budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+        recent: List[Dict] = []
+        used = 0
+        cut = len(chat_history)
+        for index in range(len(chat_history) - 1, -1, -1):
+            item = chat_history[index]
+            tokens = count_tokens(item.get("message", ""))
+            if used + tokens > budget:
+                if not recent:
+                    # The latest message alone is over budget: keep a truncated copy
+                    recent.append({**item, "message": truncate_to_tokens(item.get("message", ""), budget)})
+                    used = budget
+                    cut = index
+                break
+            recent.append(item)
+            used += tokens
+            cut = index
+        recent.reverse()
+        return chat_history[:cut], recent, used
+
+    async def _summarise(self, previous: str, messages: List[Dict]) -> str:
+        transcript = "\n".join(
+            f"{'User' if item.get('role') == 'user' else 'AI'}: "
+            f"{truncate_to_tokens(item.get('message', ''), SUMMARY_MESSAGE_TOKEN_LIMIT)}"
+            for item in messages
+        )
+        response = await get_llm_gateway().chat_completion(
+            model=SUMMARY_MODEL,
+            messages=SUMMARY_PROMPT.messages(
+                {"role": "user", "content": f"Current summary:\n{previous or '(none)'}\n\nNew conversation turns:\n{transcript}"}
+            ),
+            max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+            temperature=0.2
+        )
+        return response.choices[0].message.content.strip()
+
+    async def _rolling_summary(self, user_id: str, older: List[Dict]) -> str:
+        """
+        Returns the summary covering `older`, folding in only the messages that
+        the cached summary has not seen yet. Falls back to the cached summary
+        if the summariser fails.
+        """
+        state = await self.user_sessions.get_summary(user_id) or {"summary": "", "folded": []}
+        if not older:
+            return ""
+
+        folded = set(state["folded"])
+        pending = [item for item in older if _fingerprint(item) not in folded]
+        if not pending:
+            return state["summary"]
+
+        try:
+            summary = await self._summarise(state["summary"], pending)
+        except Exception:
+            return state["summary"]
+
+        # Remember enough fingerprints to cover everything the history can still contain
+        fingerprints = (state["folded"] + [_fingerprint(item) for item in pending])[-settings.CHAT_HISTORY_MAX_MESSAGES * 2:]
+        await self.user_sessions.set_summary(user_id, {"summary": summary, "folded": fingerprints})
+        return summary
+
+    def _refresh_summary_later(self, user_id: str, chat_history: List[Dict], prompt: str, response: str) -> None:
+        """After a turn, folds whatever just fell out of the window so the next request finds it ready."""
+        if user_id in self._summary_tasks:
+            return
+        history = chat_history + [{"role": "user", "message": prompt}, {"role": "assistant", "message": response}]
+        older, _, _ = self._split_history(history)
+        if not older:
+            return
+        # Nobody waits on this call: it must not compete with chat turns for upstream
+        # slots, nor be bound by the deadline of the request that triggered it
+        context = contextvars.copy_context()
+        context.run(priority.set, "bulk")
+        context.run(deadline.set, None)
+        task = asyncio.create_task(self._rolling_summary(user_id, older), context=context)
+        self._summary_tasks[user_id] = task
+        task.add_done_callback(lambda _task: self._summary_tasks.pop(user_id, None))
+
+    async def _build_conversation_context(self, user_id: str, prompt: str, chat_history: List[Dict]) -> ConversationContext:
+        older, recent, _ = self._split_history(chat_history)
+        summary = await self._rolling_summary(user_id, older)
+
+        # Static system prompt first so the upstream prompt cache can reuse it;
+        # everything that changes per session or per turn follows it.
+        messages = CHAT_PROMPT.messages()
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        for item in recent:
+            if item.get("role") in ("user", "assistant"):
+                messages.append({"role": item["role"], "content": item.get("message", "")})
+        messages.append({"role": "user", "content": prompt})
+
+        prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        older_tokens = sum(count_tokens(item.get("message", "")) for item in older)
+        saved = max(0, older_tokens - count_tokens(summary))
+        chat_prompt_tokens.observe(prompt_tokens)
+        if saved:
+            chat_history_tokens_saved.inc(saved)
+        return ConversationContext(messages, prompt_tokens, saved)
+
+    async def _save_turn(self, user_id: str, prompt: str, response: str) -> None:
+        # Bounded, idle-evicting session store (keeps the last CHAT_HISTORY_MAX_MESSAGES messages)
+        await self.user_sessions.append_turn(user_id, prompt, response)
+
+    async def _history_for(self, user_id: str, chat_history: Optional[List[Dict]]) -> List[Dict]:
+        # Use provided chat history or get from memory (the API sends [] when the client has none)
+        if not chat_history:
+            return await self.user_sessions.get_history(user_id)
+        return chat_history
+
+    async def chat(self, user_id: str, prompt: str, chat_history: List[Dict] = None, usage: Optional[Dict] = None) -> str:
+        """
+        Returns the reply. If `usage` is given it is filled with the prompt
+        token count and the history tokens saved by summarisation.
+        """
+        chat_history = await self._history_for(user_id, chat_history)
+        context = await self._build_conversation_context(user_id, prompt, chat_history)
+        if usage is not None:
+            usage.update(prompt_tokens=context.prompt_tokens, history_tokens_saved=context.history_tokens_saved)
+
+        response = await self.ai_service.generate_response(context.messages)
+        await self._save_turn(user_id, prompt, response)
+        self._refresh_summary_later(user_id, chat_history, prompt, response)
         return response
+
+    async def stream_chat(self, user_id: str, prompt: str, chat_history: List[Dict] = None, usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """
+        Streams the reply token by token. The finished turn is saved to the
+        session once the stream completes, same as `chat`; if the upstream
+        call fails the error propagates and nothing is saved.
+        """
+        started = time.perf_counter()
+        chat_history = await self._history_for(user_id, chat_history)
+        context = await self._build_conversation_context(user_id, prompt, chat_history)
+        if usage is not None:
+            usage.update(prompt_tokens=context.prompt_tokens, history_tokens_saved=context.history_tokens_saved)
+
+        tokens: List[str] = []
+        async for token in self.ai_service.stream_response(context.messages):
+            if not tokens:
+                chat_ttft_seconds.observe(time.perf_counter() - started)
+            tokens.append(token)
+            yield token
+
+        response = "".join(tokens)
+        await self._save_turn(user_id, prompt, response)
+        self._refresh_summary_later(user_id, chat_history, prompt, response)
     
-    def get_chat_history(self, user_id: str) -> List[Dict]:
+    async def get_chat_history(self, user_id: str) -> List[Dict]:
         """Get chat history for a user"""
-        return self.user_sessions.get(user_id, [])
+        return await self.user_sessions.get_history(user_id)
     
-    def clear_chat_history(self, user_id: str) -> bool:
+    async def clear_chat_history(self, user_id: str) -> bool:
         """Clear chat history for a user"""
-        if user_id in self.user_sessions:
-            self.user_sessions[user_id] = []
-            return True
-        return False
\ No newline at end of file
+        return await self.user_sessions.clear(user_id)
@@ -1,40 +1,32 @@
-from openai import AsyncOpenAI
 import json
 from typing import Union, Dict
-from app.core.config import settings
+from fastapi import HTTPException
+from app.core.llm_client import get_llm_gateway, record_reply_parse_failure
+from app.core.rate_limit import UpstreamOverloaded
+from app.core.cache import cached_response
+from app.core.input_check import TRUSTED_INPUT_NOTE, check_inputs
+from app.core import profiling, prompts
 from app.api.models.differentiation_model import DifferentiationRequest, DifferentiationResponse
  
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
- 
-async def _call_openai_for_json(system_prompt: str, user_prompt: str) -> str:
+async def _call_openai_for_json(template: prompts.PromptTemplate, user_prompt: str, trusted: bool = False) -> str:
     """Helper function to call the OpenAI API in JSON mode."""
+    note = ({"role": "system", "content": TRUSTED_INPUT_NOTE},) if trusted else ()
+    with profiling.stage("prompt"):
+        messages = template.messages(*note, {"role": "user", "content": user_prompt})
     try:
-        response = await client.chat.completions.create(
+        response = await get_llm_gateway().chat_completion(
             model="gpt-4o",
             response_format={"type": "json_object"},
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+            messages=messages,
             temperature=0.5
         )
         return response.choices[0].message.content
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
-        return json.dumps({"is_valid": False, "error_message": f"OpenAI API call failed: {e}"})
- 
-async def generate_differentiation_analysis(request: DifferentiationRequest) -> Union[DifferentiationResponse, Dict]:
-    """
-    Analyzes a user's capability. If irrelevant, returns an error dict.
-    If valid, returns a DifferentiationResponse model.
-    """
-    validation_schema = {
-        "type": "object",
-        "properties": {
-            "is_valid": {"type": "boolean"},
-            "error_message": {"type": "string", "description": "Reason for invalid input, if applicable."},
-            "analysis": DifferentiationResponse.model_json_schema()
-        },
-        "required": ["is_valid"]
-    }
-   
-    system_prompt = f"""
+        raise HTTPException(status_code=500, detail=f"OpenAI API call failed: {e}")
+
+DIFFERENTIATION_PROMPT = prompts.register("differentiation", "1", """
     You are a brand and career strategist. First, validate if the user's input 'capability' is a plausible professional skill or offering.
  
     **CRITICAL INSTRUCTIONS:**
@@ -43,18 +35,33 @@ async def generate_differentiation_analysis(request: DifferentiationRequest) ->
     3.  If the input is VALID, you MUST return a JSON object with "is_valid": true and populate the "analysis" object with a 'summary' and 3 'differentiating_factors'.
  
     Your response MUST be ONLY a single, valid JSON object conforming to this schema:
+    """)
+
+@cached_response("differentiation", DifferentiationResponse, model="gpt-4o", prompt_version=DIFFERENTIATION_PROMPT.version_tag)
+async def generate_differentiation_analysis(request: DifferentiationRequest) -> Union[DifferentiationResponse, Dict]:
     """
-   #    {json.dumps(validation_schema, indent=2)}
-   
+    Analyzes a user's capability. If irrelevant, returns an error dict.
+    If valid, returns a DifferentiationResponse model.
+    """
+    verdict = check_inputs("differentiation", request.capabilities)
+    if verdict.rejected:
+        return {"error": verdict.reason}
+
     user_prompt = f'Analyze this capability: "{request.capabilities}"'
    
-    raw_response = await _call_openai_for_json(system_prompt, user_prompt)
-    data = json.loads(raw_response)
- 
-    if not data.get("is_valid"):
-        return {"error": data.get("error_message", "Input was deemed irrelevant for analysis.")}
-   
-    try:
-        return DifferentiationResponse(**data.get("analysis", {}))
-    except Exception as e:
-        return {"error": f"Failed to parse the 'analysis' part of the AI response. Details: {e}"}
\ No newline at end of file
+    raw_response = await _call_openai_for_json(DIFFERENTIATION_PROMPT, user_prompt, trusted=verdict.trusted)
+    with profiling.stage("parse"):
+        try:
+            data = json.loads(raw_response)
+        except ValueError as e:
+            record_reply_parse_failure("differentiation", e)
+            return {"error": f"The AI response was not valid JSON. Details: {e}"}
+
+        if not data.get("is_valid"):
+            return {"error": data.get("error_message", "Input was deemed irrelevant for analysis.")}
+
+        try:
+            return DifferentiationResponse(**data.get("analysis", {}))
+        except Exception as e:
+            record_reply_parse_failure("differentiation", e)
+            return {"error": f"Failed to parse the 'analysis' part of the AI response. Details: {e}"}
\ No newline at end of file
@@ -1,14 +1,15 @@
 # app/services/strategic_theme2_service.py
 
-from openai import AsyncOpenAI
 import json
 import asyncio
-from app.core.config import settings
+from app.core.llm_client import get_llm_gateway, record_reply_parse_failure
+from app.core.rate_limit import UpstreamOverloaded
+from app.core.cache import cached_response
+from app.core.input_check import TRUSTED_INPUT_NOTE, check_inputs
+from app.core import profiling, prompts
 from app.api.models.strategic_theme2_model import *
 from fastapi import HTTPException
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
 TONE_GUIDELINES = {
     "coach": "Your tone will be coach. Use a supportive, empathetic, and reassuring tone.",
     "advisor": "Your tone will be advisor. Use a sharp, executive-ready, and insight-focused tone.",
@@ -28,108 +29,142 @@ input.
 challenger).
 """
 
+GAP_DETECTION_PROMPT = prompts.register("strategic_theme2_gap_detection", "1", f"""
+    You are a strategic advisor helping a professional define their 
+    strategic themes. Analyze the context provided by the user and respond 
+    constructively, using the appropriate tone.
+    You MUST return a valid JSON object. Your response should first validate the input.
+    If the input is invalid (e.g., nonsensical), return a JSON object with "is_valid": false and an "error_message".
+    Otherwise, return "is_valid": true and populate the "analysis" object based on the schema.
+    The required JSON schema for the 'analysis' part is: {prompts.json_schema(GapDetectionResponse)}
+
+    {INSTRUCTIONS}
+    """)
+
+WORDING_SUGGESTIONS_PROMPT = prompts.register("strategic_theme2_wording", "1", f"""
+    You are a strategic editor. Suggest better wording for the provided themes.
+    You MUST return a valid JSON object. First, validate the input.
+    If invalid, return a JSON object with "is_valid": false and "error_message".
+    Otherwise, return "is_valid": true and the "analysis" object.
+    The required JSON schema for the 'analysis' part is: {prompts.json_schema(WordingSuggestionsResponse)}
+
+    {INSTRUCTIONS}
+    """)
+
+GOAL_MAPPING_PROMPT = prompts.register("strategic_theme2_goal_mapping", "1", f"""
+    You are a strategic planner. Map 2–3 specific business goals to each theme.
+    You MUST return a valid JSON object. First, validate the input.
+    If invalid, return a JSON with "is_valid": false and an "error_message".
+    Otherwise, return "is_valid": true and the "analysis" object.
+    The required JSON schema for the 'analysis' part is: {prompts.json_schema(GoalMappingResponse)}
+
+    {INSTRUCTIONS}
+    """)
+
+
+PROMPT_VERSION = "+".join(
+    template.version_tag for template in (GAP_DETECTION_PROMPT, WORDING_SUGGESTIONS_PROMPT, GOAL_MAPPING_PROMPT)
+)
+
+
+@cached_response("strategic_theme2", CombinedResponse, model="gpt-4o", prompt_version=PROMPT_VERSION)
 async def generate_combined_analysis(request: CombinedAnalysisRequest) -> CombinedResponse:
     """
     Orchestrates the analyses. If any fails, it catches the exception
     and returns a response with a top-level error message.
     """
+    # Garbled themes are refused here, before any of the three calls
+    verdict = check_inputs("strategic_theme2", (f"{theme.name} {theme.description}" for theme in request.themes))
+    if verdict.rejected:
+        return CombinedResponse(error=verdict.reason)
+
     try:
         tone = request.tone or "coach"
         tone_guideline = TONE_GUIDELINES.get(tone, TONE_GUIDELINES["coach"])
+        if verdict.trusted:
+            tone_guideline = f"{tone_guideline}\n{TRUSTED_INPUT_NOTE}"
 
         gap_request = GapDetectionRequest(themes=request.themes, context=request.context)
         wording_request = WordingSuggestionsRequest(themes=request.themes)
         goal_request = GoalMappingRequest(themes=request.themes)
 
-        gap_result, wording_result, goal_result = await asyncio.gather(
-            generate_gap_detection(gap_request, tone_guideline),
-            generate_wording_suggestions(wording_request, tone_guideline),
-            generate_goal_mapping(goal_request, tone_guideline)
-        )
+        tasks = [
+            asyncio.create_task(generate_gap_detection(gap_request, tone_guideline)),
+            asyncio.create_task(generate_wording_suggestions(wording_request, tone_guideline)),
+            asyncio.create_task(generate_goal_mapping(goal_request, tone_guideline))
+        ]
+        try:
+            gap_result, wording_result, goal_result = await asyncio.gather(*tasks)
+        finally:
+            # One analysis failed or was shed: the combined response is lost, so stop the others
+            for task in tasks:
+                task.cancel()
 
         return CombinedResponse(
             gap_detection=gap_result,
             wording_suggestions=wording_result,
             goal_mapping=goal_result
         )
+    except UpstreamOverloaded:
+        raise
     except HTTPException as e:
         return CombinedResponse(error=e.detail)
     except Exception as e:
+        if isinstance(e, ValueError):
+            record_reply_parse_failure("strategic_theme2", e)
         return CombinedResponse(error=f"An unexpected server error occurred: {e}")
 
-async def _call_openai_for_json(system_prompt: str, user_prompt: str) -> str:
+async def _call_openai_for_json(template: prompts.PromptTemplate, tone_guideline: str, user_prompt: str) -> str:
+    # The static system prompt goes first and the tone after it, so the
+    # prefix stays identical across tones and requests.
     try:
-        response = await client.chat.completions.create(
+        response = await get_llm_gateway().chat_completion(
             model="gpt-4o",
             response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
+            messages=template.messages(
+                {"role": "system", "content": tone_guideline},
                 {"role": "user", "content": user_prompt}
-            ],
+            ),
             temperature=0.2
         )
         return response.choices[0].message.content
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenAI API call failed: {e}")
 
 
 async def generate_gap_detection(request: GapDetectionRequest, tone_guideline: str) -> GapDetectionResponse:
-    system_prompt = f"""
-    You are a strategic advisor helping a professional define their 
-    strategic themes. Analyze the context provided below and respond 
-    constructively, using the appropriate tone.
-    {tone_guideline}
-    You MUST return a valid JSON object. Your response should first validate the input.
-    If the input is invalid (e.g., nonsensical), return a JSON object with "is_valid": false and an "error_message".
-    Otherwise, return "is_valid": true and populate the "analysis" object based on the schema.
-    The required JSON schema for the 'analysis' part is: {GapDetectionResponse.model_json_schema()}
+    with profiling.stage("prompt"):
+        user_prompt = f"Here is the business context, please analyze it and provide a response in the required JSON format: {request.model_dump_json()}"
+    raw_response = await _call_openai_for_json(GAP_DETECTION_PROMPT, tone_guideline, user_prompt)
+    with profiling.stage("parse"):
+        data = json.loads(raw_response)
 
-    {INSTRUCTIONS}
-    """
-    user_prompt = f"Here is the business context, please analyze it and provide a response in the required JSON format: {request.model_dump_json()}"
-    raw_response = await _call_openai_for_json(system_prompt, user_prompt)
-    data = json.loads(raw_response)
-
-    if not data.get("is_valid"):
-        raise HTTPException(status_code=400, detail=data.get("error_message", "Invalid input for gap analysis."))
-    return GapDetectionResponse(**data.get("analysis", {}))
+        if not data.get("is_valid"):
+            raise HTTPException(status_code=400, detail=data.get("error_message", "Invalid input for gap analysis."))
+        return GapDetectionResponse(**data.get("analysis", {}))
 
 async def generate_wording_suggestions(request: WordingSuggestionsRequest, tone_guideline: str) -> WordingSuggestionsResponse:
-    system_prompt = f"""
-    You are a strategic editor. Suggest better wording for the provided themes.
-    {tone_guideline}
-    You MUST return a valid JSON object. First, validate the input.
-    If invalid, return a JSON object with "is_valid": false and "error_message".
-    Otherwise, return "is_valid": true and the "analysis" object.
-    The required JSON schema for the 'analysis' part is: {WordingSuggestionsResponse.model_json_schema()}
-
-    {INSTRUCTIONS}
-    """
-    user_prompt = f"Please provide wording suggestions for these themes in the required JSON format: {request.model_dump_json()}"
-    raw_response = await _call_openai_for_json(system_prompt, user_prompt)
-    data = json.loads(raw_response)
+    with profiling.stage("prompt"):
+        user_prompt = f"Please provide wording suggestions for these themes in the required JSON format: {request.model_dump_json()}"
+    raw_response = await _call_openai_for_json(WORDING_SUGGESTIONS_PROMPT, tone_guideline, user_prompt)
+    with profiling.stage("parse"):
+        data = json.loads(raw_response)
 
-    if not data.get("is_valid"):
-        raise HTTPException(status_code=400, detail=data.get("error_message", "Invalid input for wording suggestions."))
-    return WordingSuggestionsResponse(**data.get("analysis", {}))
+        if not data.get("is_valid"):
+            raise HTTPException(status_code=400, detail=data.get("error_message", "Invalid input for wording suggestions."))
+        return WordingSuggestionsResponse(**data.get("analysis", {}))
 
 
 
 async def generate_goal_mapping(request: GoalMappingRequest, tone_guideline: str) -> GoalMappingResponse:
-    system_prompt = f"""
-    You are a strategic planner. Map 2–3 specific business goals to each theme.
-    {tone_guideline}
-    You MUST return a valid JSON object. First, validate the input.
-    If invalid, return a JSON with "is_valid": false and an "error_message".
-    Otherwise, return "is_valid": true and the "analysis" object.
-    The required JSON schema for the 'analysis' part is: {GoalMappingResponse.model_json_schema()}
-
-    {INSTRUCTIONS}
-    """
-    user_prompt = f"Please map goals to these themes in the required JSON format: {request.model_dump_json()}"
-    raw_response = await _call_openai_for_json(system_prompt, user_prompt)
-    data = json.loads(raw_response)
-
-    if not data.get("is_valid"):
-        raise HTTPException(status_code=400, detail=data.get("error_message", "Invalid input for goal mapping."))
-    return GoalMappingResponse(**data.get("analysis", {}))
+    with profiling.stage("prompt"):
+        user_prompt = f"Please map goals to these themes in the required JSON format: {request.model_dump_json()}"
+    raw_response = await _call_openai_for_json(GOAL_MAPPING_PROMPT, tone_guideline, user_prompt)
+    with profiling.stage("parse"):
+        data = json.loads(raw_response)
+
+        if not data.get("is_valid"):
+            raise HTTPException(status_code=400, detail=data.get("error_message", "Invalid input for goal mapping."))
+        return GoalMappingResponse(**data.get("analysis", {}))
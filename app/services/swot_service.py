@@ -1,15 +1,13 @@
 # api/services/swot_service.py
 
-from openai import AsyncOpenAI
-import json
 import re
-from ..core.config import settings
-from ..api.models.swot_model import SWOTDataInput, SWOTAnalysisResponse, SWOTScore, SWOTRecommendation
+from ..core.llm_client import get_llm_gateway, llm_reply_parse_failures
+from ..core.cache import cached_response
+from ..core import profiling, prompts
+from ..api.models.swot_model import SWOTDataInput, SWOTAnalysisResponse, SWOTScore, SWOTRecommendation, SWOTModelOutput
 from ..memory import store
 
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
 def _format_swot_data_for_prompt(data: SWOTDataInput) -> str:
     """Format SWOT data for AI prompt."""
     prompt_text = "SWOT ANALYSIS INPUT DATA:\n\n"
@@ -30,84 +28,32 @@ def _format_swot_data_for_prompt(data: SWOTDataInput) -> str:
     
     return prompt_text
 
-def _parse_swot_scores(text: str) -> SWOTScore:
-    """Parse AI response to extract percentage scores for each SWOT category."""
-    try:
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if not json_match:
-            raise ValueError("No valid JSON found in response")
-        
-        data = json.loads(json_match.group(0))
-        scores = data.get("scores", {})
-        
-        return SWOTScore(
-            strengths_percentage=float(scores.get("strengths", 25.0)),
-            weaknesses_percentage=float(scores.get("weaknesses", 25.0)),
-            opportunities_percentage=float(scores.get("opportunities", 25.0)),
-            threats_percentage=float(scores.get("threats", 25.0))
-        )
-    except Exception:
-        return SWOTScore(
-            strengths_percentage=25.0,
-            weaknesses_percentage=25.0,
-            opportunities_percentage=25.0,
-            threats_percentage=25.0
-        )
+def _format_recommendations(recommendations: list[str]) -> str:
+    """Renumbers the model's recommendations as "1. ...\n2. ...", keeping at most four."""
+    cleaned_recs = [re.sub(r'^\d+\.\s*', '', rec).strip() for rec in recommendations]
+    if len(cleaned_recs) < 3:
+        llm_reply_parse_failures.inc(service="swot", reason="recommendations_defaulted")
+        cleaned_recs = ["No specific recommendations available."] * 3
+    return "\n".join(f"{i+1}. {rec}" for i, rec in enumerate(cleaned_recs[:4]))
 
-def _parse_swot_recommendations(text: str) -> SWOTRecommendation:
-    """Parse AI response to extract recommendations for each SWOT category."""
-    try:
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if not json_match:
-            raise ValueError("No valid JSON found in response")
-        
-        data = json.loads(json_match.group(0))
-        recommendations = data.get("recommendations", {})
-        
-        for category in ["strengths", "weaknesses", "opportunities", "threats"]:
-            if category in recommendations:
-                cleaned_recs = [
-                    re.sub(r'^\d+\.\s*', '', rec).strip() 
-                    for rec in recommendations[category]
-                ]
-                if not isinstance(cleaned_recs, list) or len(cleaned_recs) < 3:
-                    cleaned_recs = ["No specific recommendations available."] * 3
-                recommendations[category] = "\n".join(
-                    f"{i+1}. {rec}" for i, rec in enumerate(cleaned_recs[:4])
-                )
-            else:
-                recommendations[category] = "\n".join(
-                    f"{i+1}. No specific recommendations available." for i in range(3)
-                )
-        
-        return SWOTRecommendation(
-            strengths_recommendation=recommendations["strengths"],
-            weaknesses_recommendation=recommendations["weaknesses"],
-            opportunities_recommendation=recommendations["opportunities"],
-            threats_recommendation=recommendations["threats"]
-        )
-    except Exception:
-        return SWOTRecommendation(
-            strengths_recommendation="\n".join(f"{i+1}. Error parsing recommendations." for i in range(3)),
-            weaknesses_recommendation="\n".join(f"{i+1}. Error parsing recommendations." for i in range(3)),
-            opportunities_recommendation="\n".join(f"{i+1}. Error parsing recommendations." for i in range(3)),
-            threats_recommendation="\n".join(f"{i+1}. Error parsing recommendations." for i in range(3))
+def _to_response(output: SWOTModelOutput) -> SWOTAnalysisResponse:
+    return SWOTAnalysisResponse(
+        scores=SWOTScore(
+            strengths_percentage=output.scores.strengths,
+            weaknesses_percentage=output.scores.weaknesses,
+            opportunities_percentage=output.scores.opportunities,
+            threats_percentage=output.scores.threats
+        ),
+        recommendations=SWOTRecommendation(
+            strengths_recommendation=_format_recommendations(output.recommendations.strengths),
+            weaknesses_recommendation=_format_recommendations(output.recommendations.weaknesses),
+            opportunities_recommendation=_format_recommendations(output.recommendations.opportunities),
+            threats_recommendation=_format_recommendations(output.recommendations.threats)
         )
+    )
 
-async def generate_swot_analysis(data: SWOTDataInput) -> SWOTAnalysisResponse:
-    """Generate SWOT analysis with AI-estimated scores and recommendations."""
-    
-    store.last_swot_input = data
-    
-        # ✅ Check if all inputs are empty
-    if not (data.strengths or data.weaknesses or data.opportunities or data.threats):
-        raise ValueError("No SWOT data provided. Please provide at least one SWOT category with content.")
-
-
-    
-    formatted_data = _format_swot_data_for_prompt(data)
-    
-    system_prompt = """
+# Static instructions lead every request so the prompt prefix is cacheable upstream
+SWOT_PROMPT = prompts.register("swot", "2", """
     You are a seasoned business consultant with deep expertise in SWOT analysis, delivering insights as if presenting to a board or executive team. Your role is to provide clear, concise, and actionable recommendations that feel professional yet approachable. Based on the provided SWOT data, deliver a structured analysis with:
 
     1. **Percentage Scores**: Assign a percentage score (0-100%) to each SWOT category (Strengths, Weaknesses, Opportunities, Threats) based on:
@@ -150,41 +96,34 @@ async def generate_swot_analysis(data: SWOTDataInput) -> SWOTAnalysisResponse:
     - Prefix each recommendation with a numbered point (e.g., "1.", "2.") for a structured, consultant-like feel.
     - Ensure the JSON output is valid, with scores as numbers (e.g., 80) and recommendations as arrays of strings with numbered prefixes.
     - Do not include any text, bullet points, or markdown symbols outside the JSON structure.
-    """
-    
-    try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": formatted_data}
-            ],
-            temperature=0.4,
-            max_tokens=1500
-        )
-        
-        analysis_text = response.choices[0].message.content
-        
-        scores = _parse_swot_scores(analysis_text)
-        recommendations = _parse_swot_recommendations(analysis_text)
-        
-        return SWOTAnalysisResponse(
-            scores=scores,
-            recommendations=recommendations,
-        )
-        
-    except Exception as e:
-        return SWOTAnalysisResponse(
-            scores=SWOTScore(
-                strengths_percentage=25.0,
-                weaknesses_percentage=25.0,
-                opportunities_percentage=25.0,
-                threats_percentage=25.0
-            ),
-            recommendations=SWOTRecommendation(
-                strengths_recommendation="\n".join(f"{i+1}. Error generating recommendations." for i in range(3)),
-                weaknesses_recommendation="\n".join(f"{i+1}. Error generating recommendations." for i in range(3)),
-                opportunities_recommendation="\n".join(f"{i+1}. Error generating recommendations." for i in range(3)),
-                threats_recommendation="\n".join(f"{i+1}. Error generating recommendations." for i in range(3))
-            )
-        )
\ No newline at end of file
+    """)
+
+
+def _build_messages(data: SWOTDataInput) -> list[dict]:
+    return SWOT_PROMPT.messages({"role": "user", "content": _format_swot_data_for_prompt(data)})
+
+
+async def generate_swot_analysis(data: SWOTDataInput) -> SWOTAnalysisResponse:
+    """Generate SWOT analysis with AI-estimated scores and recommendations."""
+    await store.save_last_input("swot", data)
+    return await _generate_swot_analysis(data)
+
+@cached_response("swot", SWOTAnalysisResponse, model="gpt-4o-mini", prompt_version=SWOT_PROMPT.version_tag)
+async def _generate_swot_analysis(data: SWOTDataInput) -> SWOTAnalysisResponse:
+    # ✅ Check if all inputs are empty
+    if not (data.strengths or data.weaknesses or data.opportunities or data.threats):
+        raise ValueError("No SWOT data provided. Please provide at least one SWOT category with content.")
+
+    # The reply is constrained to SWOTModelOutput, so there is nothing to scrape;
+    # a reply that still fails validation raises instead of returning defaults.
+    # structured_completion records the "parse" stage itself.
+    with profiling.stage("prompt"):
+        messages = _build_messages(data)
+    output = await get_llm_gateway().structured_completion(
+        SWOTModelOutput,
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.4,
+        max_tokens=1500
+    )
+    return _to_response(output)
@@ -1,15 +1,19 @@
 # app/services/trend_summary_service.py
 
-from openai import AsyncOpenAI
-import json
-import re
-from ..core.config import settings
+import asyncio
+from typing import Any, AsyncIterator, Tuple
+
+from ..core.llm_client import get_llm_gateway
+from ..core.rate_limit import UpstreamOverloaded
+from ..core.cache import cached_response
+from ..core import profiling, prompts
 from ..core.AI_models import MODEL, TEMPERATURE, MAX_TOKENS
-from ..api.models.trend_summary_model import TrendDataInput, TrendSummaryResponse, TrendCombinedResponse
+from ..api.models.trend_summary_model import (
+    TrendDataInput, TrendSummaryResponse, TrendCombinedResponse, TrendModelOutput, RadarModelOutput
+)
 from ..memory import store
 from ..utils.Tone import TONE_GUIDELINES
-
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+from ..utils.json_stream import IncrementalJSONParser
 
 def _format_data_for_prompt(data: TrendDataInput) -> str:
     section_titles = {
@@ -40,62 +44,24 @@ def _format_data_for_prompt(data: TrendDataInput) -> str:
             prompt_text += "\n"
     return prompt_text
 
-def _parse_combined_response(text: str) -> TrendCombinedResponse:
-    """Parse the entire AI JSON response into a TrendCombinedResponse object."""
-    try:
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if not json_match:
-            return TrendCombinedResponse(
-                summary=TrendSummaryResponse(key_opportunities="", strengths="", significant_risks="", challenges="", strategic_recommendations=""),
-                error=f"Could not parse AI response, no valid JSON found. Raw response: {text[:500]}"
-            )
-
-        data = json.loads(json_match.group(0))
-
-        # Parse the nested summary object
-        summary_data = data.get("summary", {})
-        summary = TrendSummaryResponse(
-            key_opportunities=summary_data.get("key_opportunities", "N/A"),
-            strengths=summary_data.get("strengths", "N/A"),
-            significant_risks=summary_data.get("significant_risks", "N/A"),
-            challenges=summary_data.get("challenges", "N/A"),
-            strategic_recommendations=summary_data.get("strategic_recommendations", "N/A"),
-            irrelevant_answers=data.get("irrelevant_answers", [])
-        )
-
-        # Parse the other top-level fields
-        return TrendCombinedResponse(
-            summary=summary,
-            trend_synthesis=data.get("trend_synthesis", []),
-            early_warnings=data.get("early_warnings", "N/A"),
-            strategic_opportunities=data.get("strategic_opportunities", []),
-            analyst_recommendations=data.get("analyst_recommendations", "N/A")
-        )
-
-    except (json.JSONDecodeError, ValueError) as e:
-        return TrendCombinedResponse(
-            summary=TrendSummaryResponse(key_opportunities="", strengths="", significant_risks="", challenges="", strategic_recommendations=""),
-            error=f"Error parsing JSON from AI response: {str(e)}. Raw text: {text[:500]}"
-        )
-    except Exception as e:
-        return TrendCombinedResponse(
-            summary=TrendSummaryResponse(key_opportunities="", strengths="", significant_risks="", challenges="", strategic_recommendations=""),
-            error=f"An unexpected error occurred during parsing: {str(e)}"
-        )
-
-async def generate_combined_summary_and_trends(data: TrendDataInput) -> TrendCombinedResponse:
-    store.last_trend_input = data
-    formatted_data = _format_data_for_prompt(data)
-
-    tone = data.tone or "coach"
-    tone_guideline = TONE_GUIDELINES.get(tone, TONE_GUIDELINES["coach"])  
+def _to_combined_response(output: TrendModelOutput) -> TrendCombinedResponse:
+    summary = TrendSummaryResponse(
+        **output.summary.model_dump(),
+        irrelevant_answers=output.irrelevant_answers
+    )
+    return TrendCombinedResponse(
+        summary=summary,
+        trend_synthesis=output.trend_synthesis,
+        early_warnings=output.early_warnings,
+        strategic_opportunities=output.strategic_opportunities,
+        analyst_recommendations=output.analyst_recommendations
+    )
 
-    system_prompt = f"""
+# Instructions and response format are the same for every request, so they
+# lead the prompt as one cacheable prefix; tone and raw data come after.
+TRENDS_PROMPT = prompts.register("trends", "3", """
         You are an expert business consultant with extensive experience in strategic planning, market trends, and innovation. Your task is to analyze TRENDS ASSESSMENT RAW DATA and deliver insights as a senior consultant would in a real business setting.
 
-        ### Tone Instructions:
-        {tone_guideline}
-
         ### General Instructions:
         - Analyze only business-related answers relevant to strategy, market trends, or innovation.
         - Ignore answers like 'I don't know' or nonsensical, non-business-related input.
@@ -118,14 +84,17 @@ async def generate_combined_summary_and_trends(data: TrendDataInput) -> TrendCom
         Return your complete analysis using the exact JSON structure below. Ensure all keys are present.
 
         ```json
-        {{
-          "summary": {{
+        {
+          "irrelevant_answers": [
+            "In response to the question '{question}', the provided answer '{answer}' was not relevant to business strategy, market trends, or innovation. Please provide a more relevant answer."
+          ],
+          "summary": {
             "key_opportunities": "...",
             "strengths": "...",
             "significant_risks": "...",
             "challenges": "...",
             "strategic_recommendations": "..."
-          }},
+          },
           "trend_synthesis": [
             "Trend 1: Detailed description of the first major synthesized trend.",
             "Trend 2: Detailed description of the second major synthesized trend.",
@@ -136,92 +105,177 @@ async def generate_combined_summary_and_trends(data: TrendDataInput) -> TrendCom
             "A forward-looking idea or new direction the business could explore.",
             "Another forward-looking idea or new direction."
           ],
-          "analyst_recommendations": "Direct and actionable recommendations for the leadership team.",
-          "irrelevant_answers": [
-            "In response to the question '{{question}}', the provided answer '{{answer}}' was not relevant to business strategy, market trends, or innovation. Please provide a more relevant answer."
-          ]
-        }}    """
+          "analyst_recommendations": "Direct and actionable recommendations for the leadership team."
+        }    """)
+
+
+RADAR_PROMPT = prompts.register("trends_radar", "2", (
+    "You are an innovation strategist. Analyze the early warning trend signals provided by the user.\n\n"
+    "Based on these signals, provide:\n"
+    "1. `summary`: a short executive summary explaining the strategic implications, as bullet points.\n"
+    "2. `recommendations`: a short, actionable list (2–3 items) of strategic recommendations.\n\n"
+    "Write each bullet point as a plain sentence without a leading dash or number."
+))
+
+
+def _build_messages(data: TrendDataInput) -> list[dict]:
+    tone = data.tone or "coach"
+    return TRENDS_PROMPT.messages(
+        {"role": "system", "content": f"### Tone Instructions:\n{TONE_GUIDELINES.get(tone, TONE_GUIDELINES['coach'])}"},
+        {"role": "user", "content": _format_data_for_prompt(data)}
+    )
+
+
+async def generate_combined_summary_and_trends(data: TrendDataInput) -> TrendCombinedResponse:
+    await store.save_last_input("trends", data)
+    return await _generate_combined_summary_and_trends(data)
+
+@cached_response("trends", TrendCombinedResponse, model=MODEL, prompt_version=f"{TRENDS_PROMPT.version_tag}+{RADAR_PROMPT.version_tag}")
+async def _generate_combined_summary_and_trends(data: TrendDataInput) -> TrendCombinedResponse:
+    # The radar analysis only depends on `on_the_radar`, so run it alongside
+    # the main synthesis instead of after it.
+    radar_task = asyncio.create_task(generate_radar_analysis(data))
 
     try:
-        result = await client.chat.completions.create(
+        # structured_completion records the "parse" stage itself
+        with profiling.stage("prompt"):
+            messages = _build_messages(data)
+        output = await get_llm_gateway().structured_completion(
+            TrendModelOutput,
             model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": formatted_data}
-            ],
+            messages=messages,
             temperature=TEMPERATURE,
             max_tokens=2048  
         )
+        parsed_response = _to_combined_response(output)
 
-        raw_response = result.choices[0].message.content.strip()
-
-        parsed_response = _parse_combined_response(raw_response)
-
-        if parsed_response.error:
-            return parsed_response
-
-        radar_summary, radar_recommendations = await generate_radar_analysis(data)
+        radar_summary, radar_recommendations = await radar_task
 
         parsed_response.radar_executive_summary = radar_summary
         parsed_response.radar_recommendation = radar_recommendations
 
         return parsed_response
 
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         return TrendCombinedResponse(
             summary=TrendSummaryResponse(key_opportunities="", strengths="", significant_risks="", challenges="", strategic_recommendations=""),
             error=f"An error occurred while generating the trend summary: {str(e)}"
         )
 
+    finally:
+        # Main call failed (or we were cancelled): don't keep paying for the radar call
+        if not radar_task.done():
+            radar_task.cancel()
+        elif not radar_task.cancelled():
+            radar_task.exception()  # mark a failed radar call as retrieved
+
+
+async def stream_combined_summary_and_trends(data: TrendDataInput) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of `generate_combined_summary_and_trends`. Yields
+    ("section", {"name", "value"}) for each top-level field of
+    TrendCombinedResponse as soon as it is complete (the radar fields once
+    the concurrent radar call returns), then ("done", TrendCombinedResponse)
+    with the validated full response. Cache hits replay the same sections.
+    UpstreamOverloaded propagates, as in the non-streamed path.
+    """
+    await store.save_last_input("trends", data)
+    cached = await _generate_combined_summary_and_trends.cache_lookup(data)
+    if cached is not None:
+        for name, value in cached.model_dump(mode="json", exclude={"error"}).items():
+            yield "section", {"name": name, "value": value}
+        yield "done", cached
+        return
+
+    radar_task = asyncio.create_task(generate_radar_analysis(data))
+    radar_sent = False
+
+    def radar_sections(radar: tuple[list[str], list[str]]) -> list[dict]:
+        return [
+            {"name": "radar_executive_summary", "value": radar[0]},
+            {"name": "radar_recommendation", "value": radar[1]},
+        ]
+
+    # The model writes irrelevant_answers at the top level; clients get them
+    # inside the summary section, as in TrendCombinedResponse
+    irrelevant_answers = None
+    pending_summary = None
+
+    def summary_section(summary: dict) -> dict:
+        value = TrendSummaryResponse(**summary, irrelevant_answers=irrelevant_answers).model_dump(mode="json")
+        return {"name": "summary", "value": value}
+
+    try:
+        parser = IncrementalJSONParser()
+        with profiling.stage("prompt"):
+            messages = _build_messages(data)
+        async for delta in get_llm_gateway().stream_chat_completion(
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=2048,
+            response_format=prompts.response_format(TrendModelOutput)
+        ):
+            for name, value in parser.feed(delta):
+                if name == "irrelevant_answers":
+                    irrelevant_answers = value
+                    if pending_summary is not None:
+                        yield "section", summary_section(pending_summary)
+                elif name == "summary":
+                    if irrelevant_answers is None:
+                        pending_summary = value
+                    else:
+                        yield "section", summary_section(value)
+                else:
+                    yield "section", {"name": name, "value": value}
+            if not radar_sent and radar_task.done():
+                radar_sent = True
+                for section in radar_sections(radar_task.result()):
+                    yield "section", section
+
+        with profiling.stage("parse"):
+            result = _to_combined_response(TrendModelOutput.model_validate_json(parser.text))
+        result.radar_executive_summary, result.radar_recommendation = await radar_task
+        if not radar_sent:
+            for section in radar_sections((result.radar_executive_summary, result.radar_recommendation)):
+                yield "section", section
+
+    except UpstreamOverloaded:
+        raise
+    except Exception as e:
+        result = TrendCombinedResponse(
+            summary=TrendSummaryResponse(key_opportunities="", strengths="", significant_risks="", challenges="", strategic_recommendations=""),
+            error=f"An error occurred while generating the trend summary: {str(e)}"
+        )
+
+    finally:
+        if not radar_task.done():
+            radar_task.cancel()
+        elif not radar_task.cancelled():
+            radar_task.exception()
+
+    await _generate_combined_summary_and_trends.cache_store(data, result)
+    yield "done", result
+
 
 async def generate_radar_analysis(data: TrendDataInput) -> tuple[list[str], list[str]]:
     radar_entries = data.on_the_radar
     if not radar_entries:
         return [], []
 
-    radar_prompt = "You are an innovation strategist. Analyze the following early warning trend signals:\n\n"
-    for item in radar_entries:
-        if item.answer and item.answer.strip():
-            radar_prompt += f"Q: {item.question}\nA: {item.answer}\nImpact: {item.impact}\n\n"
-
-    radar_prompt += (
-        "Based on these signals, provide:\n"
-        "1. A short executive summary explaining the strategic implications.\n"
-        "2. A short, actionable list (2–3 items) of strategic recommendations.\n\n"
-        "Use the following format exactly:\n"
-        "Summary:\n- Bullet point 1\n- Bullet point 2\n\nRecommendations:\n- Recommendation 1\n- Recommendation 2"
-    )
+    with profiling.stage("prompt"):
+        radar_prompt = "Early warning trend signals:\n\n"
+        for item in radar_entries:
+            if item.answer and item.answer.strip():
+                radar_prompt += f"Q: {item.question}\nA: {item.answer}\nImpact: {item.impact}\n\n"
 
-    response = await client.chat.completions.create(
+    output = await get_llm_gateway().structured_completion(
+        RadarModelOutput,
         model=MODEL,
-        messages=[
-            {"role": "system", "content": "You are an innovation strategist."},
-            {"role": "user", "content": radar_prompt}
-        ],
+        messages=RADAR_PROMPT.messages({"role": "user", "content": radar_prompt}),
         temperature=TEMPERATURE,
         max_tokens=MAX_TOKENS
     )
-
-    content = response.choices[0].message.content.strip()
-
-    summary_lines = []
-    recommendation_lines = []
-    current_section = None
-
-    for line in content.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        if line.lower().startswith("summary:"):
-            current_section = "summary"
-            continue
-        if line.lower().startswith("recommendations:"):
-            current_section = "recommendations"
-            continue
-
-        if current_section == "summary":
-            summary_lines.append(line.strip("- ").strip())
-        elif current_section == "recommendations":
-            recommendation_lines.append(line.strip("- ").strip())
-
-    return summary_lines, recommendation_lines
\ No newline at end of file
+    return output.summary, output.recommendations
@@ -1,7 +1,10 @@
-from openai import AsyncOpenAI
 import json
-from typing import Union, Dict
-from ..core.config import settings
+from typing import Dict, List, Union
+from ..core.llm_client import get_llm_gateway, record_reply_parse_failure
+from ..core.rate_limit import UpstreamOverloaded
+from ..core.cache import cached_response
+from ..core.input_check import TRUSTED_INPUT_NOTE, check_inputs
+from ..core import profiling, prompts
 from ..api.models.vision_model import VisionResponse, VisionInput
 
 TONE_GUIDELINES = {
@@ -9,35 +12,24 @@ TONE_GUIDELINES = {
     "advisor": "Your tone will be advisor. Use a sharp, executive-ready, and insight-focused tone.",
     "challenger": "Your tone will be challenger. Use a bold, urgent, and clarity-driven tone."
 }
- 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
-async def process_vision(request: VisionInput) -> Union[VisionResponse, Dict]:
-    """
-    Analyzes the user's input.
-    - If it's a valid business vision, returns a VisionResponse Pydantic model.
-    - If it's irrelevant, returns a dictionary with an 'error' key.
-    """
-    # Define a schema for the AI that includes our validation fields.
-    # The AI will use this to structure its internal thinking.
-    validation_schema = {
-        "type": "object",
-        "properties": {
-            "is_valid": {"type": "boolean"},
-            "error_message": {"type": "string", "description": "Reason for invalid input, if applicable."},
-            "analysis": VisionResponse.model_json_schema()
-        },
-        "required": ["is_valid"]
-    }
-   
-    system_prompt = f"""
+# Instructions and schema are identical for every request so they form a
+# byte-stable prefix the upstream prompt cache can reuse; the tone and the
+# vision statement follow in later messages.
+VALIDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_valid": {"type": "boolean"},
+        "error_message": {"type": "string", "description": "Reason for invalid input, if applicable."},
+        "analysis": prompts.json_schema(VisionResponse)
+    },
+    "required": ["is_valid"]
+}
+
+VISION_PROMPT = prompts.register("vision", "1", f"""
     ✳️ Vision Statement Evaluation Prompt
  
-    I’d like you to evaluate this vision statement both qualitatively and quantitatively.
-    {TONE_GUIDELINES.get(request.tone, TONE_GUIDELINES["coach"])}
-
-    Vision Statement:
-    {request.vision_statement}
+    I’d like you to evaluate the vision statement provided by the user both qualitatively and quantitatively.
 
     Please provide:
     1. A score in percentage form (0–100%), broken down by the following criteria:
@@ -66,31 +58,53 @@ async def process_vision(request: VisionInput) -> Union[VisionResponse, Dict]:
     3.  If the input is VALID, you MUST return a JSON object with "is_valid": true and populate the "analysis" object with the evaluation.
  
     Your response MUST be ONLY a single, valid JSON object conforming to this schema:
-    {json.dumps(validation_schema, indent=2)}
+    {json.dumps(VALIDATION_SCHEMA, indent=2)}
+    """)
+
+
+def _build_messages(request: VisionInput, trusted: bool = False) -> List[Dict[str, str]]:
+    tone = TONE_GUIDELINES.get(request.tone, TONE_GUIDELINES["coach"])
+    return VISION_PROMPT.messages(
+        {"role": "system", "content": f"{tone}\n{TRUSTED_INPUT_NOTE}" if trusted else tone},
+        {"role": "user", "content": f"Vision Statement:\n{request.vision_statement}"}
+    )
+
+
+@cached_response("vision", VisionResponse, model="gpt-4o", prompt_version=VISION_PROMPT.version_tag)
+async def process_vision(request: VisionInput) -> Union[VisionResponse, Dict]:
     """
- 
-    user_prompt = request.vision_statement
- 
+    Analyzes the user's input.
+    - If it's a valid business vision, returns a VisionResponse Pydantic model.
+    - If it's irrelevant, returns a dictionary with an 'error' key.
+    """
+    verdict = check_inputs("vision", [request.vision_statement])
+    if verdict.rejected:
+        return {"error": verdict.reason}
+
     try:
-        response = await client.chat.completions.create(
+        with profiling.stage("prompt"):
+            messages = _build_messages(request, trusted=verdict.trusted)
+        response = await get_llm_gateway().chat_completion(
             model="gpt-4o",
             response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.3,
             max_tokens=1200  
         )
  
-        content = response.choices[0].message.content.strip()
-        data = json.loads(content)
- 
-        # Check the validation flag from the AI
-        if not data.get("is_valid"):
-            return {"error": data.get("error_message", "Input was deemed irrelevant for analysis.")}
-       
-        return VisionResponse(**data.get("analysis", {}))
+        with profiling.stage("parse"):
+            content = response.choices[0].message.content.strip()
+            data = json.loads(content)
+
+            # Check the validation flag from the AI
+            if not data.get("is_valid"):
+                return {"error": data.get("error_message", "Input was deemed irrelevant for analysis.")}
+
+            return VisionResponse(**data.get("analysis", {}))
  
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
+        if isinstance(e, ValueError):
+            record_reply_parse_failure("vision", e)
         return {"error": f"An unexpected error occurred during AI processing: {str(e)}"}
\ No newline at end of file
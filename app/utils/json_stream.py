@@ -0,0 +1,94 @@
+# app/utils/json_stream.py
+
+# Incremental JSON parser for streamed model output. Text is fed in as it
+# arrives. Each member of the target object is returned, decoded, as soon as
+# its value is complete. That lets an endpoint forward finished sections of a
+# long analysis while the model is still writing the rest.
+
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+class _Container:
+    __slots__ = ("kind", "path", "key", "awaiting_value", "value_start")
+
+    def __init__(self, kind: str, path: Optional[Tuple[str, ...]]):
+        self.kind = kind                # "{" or "["
+        self.path = path                # member keys leading here; None inside arrays
+        self.key: Optional[str] = None  # last member key read in this object
+        self.awaiting_value = False     # between ':' and the next ',' / '}'
+        self.value_start: Optional[int] = None
+
+
+class IncrementalJSONParser:
+    """
+    Emits `(key, value)` for every member of the object at `path` (e.g.
+    ("analysis",) for {"analysis": {...}}; the root object by default) once
+    that member's value has been fully received.
+    """
+
+    def __init__(self, path: Sequence[str] = ()):
+        self.path = tuple(path)
+        self.text = ""
+        self._pos = 0
+        self._stack: List[_Container] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Adds `chunk` and returns the members completed by it, in order."""
+        self.text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    top = self._stack[-1] if self._stack else None
+                    if top is not None and top.kind == "{" and not top.awaiting_value:
+                        top.key = json.loads(text[self._string_start:i + 1])
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                parent = self._stack[-1] if self._stack else None
+                if parent is None:
+                    path = ()
+                elif parent.kind == "{" and parent.path is not None:
+                    path = parent.path + (parent.key,)
+                else:
+                    path = None
+                self._stack.append(_Container(ch, path))
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._complete_member(self._stack[-1], i, completed)
+                self._stack.pop()
+            elif ch == ":":
+                top = self._stack[-1] if self._stack else None
+                if top is not None and top.kind == "{":
+                    top.awaiting_value = True
+                    top.value_start = i + 1
+            elif ch == ",":
+                if self._stack:
+                    self._complete_member(self._stack[-1], i, completed)
+
+        self._pos = len(text)
+        return completed
+
+    def _complete_member(self, container: _Container, end: int, completed: List[Tuple[str, Any]]) -> None:
+        if container.kind != "{" or not container.awaiting_value:
+            return
+        if container.path == self.path and container.value_start is not None:
+            completed.append((container.key, json.loads(self.text[container.value_start:end])))
+        container.awaiting_value = False
+        container.value_start = None
@@ -0,0 +1,36 @@
+# app/utils/sse.py
+
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..core.rate_limit import UpstreamOverloaded
+
+
+def sse_event(event: str, data: Any) -> str:
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """
+    Serves `(event, data)` pairs as Server-Sent Events. The status line has
+    gone out by the time the events run, so an upstream call shed on the way
+    ends the stream with an `error` event carrying its status code and
+    Retry-After seconds instead.
+    """
+    async def stream():
+        try:
+            async for event, data in events:
+                yield sse_event(event, data)
+        except UpstreamOverloaded as e:
+            yield sse_event("error", {"detail": str(e), "status_code": e.status_code, "retry_after": e.retry_after})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,41 @@
+# app/utils/tokens.py
+
+# Local token counting. Uses tiktoken when it is installed; otherwise falls
+# back to the usual ~4 characters per token estimate, which is close enough
+# for budgeting prompt size.
+
+import math
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """Cuts `text` down to at most `max_tokens` tokens, marking the cut with an ellipsis."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    if tiktoken is not None:
+        encoding = _encoding(model)
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + "…"
+    return text[:max_tokens * CHARS_PER_TOKEN] + "…"
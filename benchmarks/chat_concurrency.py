@@ -0,0 +1,105 @@
+# benchmarks/chat_concurrency.py
+
+# Load test for the chatbot path. Fires N concurrent /api/chatbot/chatbot
+# requests against the app with the upstream replaced by a fixed-latency fake,
+# and checks that every one gets the fake reply and that together they finish
+# in about one round trip instead of N.
+#
+# Admission control is off by default, since its concurrency limit would
+# queue the calls on purpose; with LLM_LIMITS_ENABLED=true the expected round
+# trips follow from the chat model's configured concurrency instead.
+#
+#   python -m benchmarks.chat_concurrency --requests 20 --latency 0.5
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+os.environ.setdefault("LLM_LIMITS_ENABLED", "false")
+
+import httpx
+
+from app.core.core import AIService
+from app.core.llm_client import init_llm_gateway
+
+REPLY = "Ready when you are."
+
+
+def _fake_upstream(latency: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": REPLY},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+    return httpx.MockTransport(handler)
+
+
+async def run(requests: int, latency: float) -> dict:
+    from main import app
+
+    gateway = init_llm_gateway()
+    gateway._http_client._transport = _fake_upstream(latency)
+    # Calls queue behind the concurrency limit in waves, one round trip each
+    expected_round_trips = 1
+    if gateway.limiter is not None:
+        expected_round_trips = math.ceil(requests / gateway.limiter.for_model(AIService().model).concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # Warm-up so lazy imports and client setup are not counted
+        await client.post("/api/chatbot/chatbot", json={"message": "Hello", "session_id": "bench-warmup"})
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/chatbot/chatbot", json={"message": "How do I grow revenue?", "session_id": f"bench-{i}"})
+            for i in range(requests)
+        ])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "upstream_latency_s": latency,
+        "elapsed_s": round(elapsed, 3),
+        "round_trips": round(elapsed / latency, 2),
+        "expected_round_trips": expected_round_trips,
+        "ok": sum(r.status_code == 200 and r.json()["response"] == REPLY for r in responses),
+        "statuses": sorted({r.status_code for r in responses}),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.requests, args.latency))
+    print(json.dumps(report, indent=2))
+    if report["ok"] != report["requests"]:
+        raise SystemExit(f"Only {report['ok']} of {report['requests']} chat requests returned the upstream reply.")
+    if report["round_trips"] > report["expected_round_trips"] + 1:
+        raise SystemExit(
+            f"Chat requests took {report['round_trips']} round trips, more than the "
+            f"{report['expected_round_trips']} admission control allows: something is serialising them, "
+            "e.g. a blocking call on the event loop."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# benchmarks/fake_openai.py
+
+# Local stand-in for the OpenAI chat-completions API, so endpoints can be
+# load-tested without paying for real calls. Replies are shaped to what
+# each prompt expects:
+#
+# - Calls with a `json_schema` response_format get a minimal instance of
+#   that schema.
+# - JSON-mode calls are matched to their registered prompt, and get the
+#   validation envelope that prompt asks for around an instance of its
+#   response model.
+# - Anything else (chatbot, chat summaries) gets plain text.
+#
+# Time to first token is drawn from a latency distribution, the completion
+# then arrives at a fixed token rate (streamed chunk by chunk when
+# `stream=True`), and a share of calls can be failed with given statuses.
+#
+# In process, mount it on the gateway's HTTP client (see benchmarks.suite).
+# Standalone, serve it and point the app at it:
+#
+#   python -m benchmarks.fake_openai --port 8081 --latency lognormal:0.8,0.4 --token-rate 60
+#   OPENAI_BASE_URL=http://127.0.0.1:8081/v1 uvicorn main:app
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.core import prompts
+from app.utils.tokens import CHARS_PER_TOKEN, count_tokens
+
+PLAIN_TEXT_REPLY = (
+    "Here is a simulated reply from the benchmark upstream. Focus on the two goals "
+    "with the highest strategic fit first, and revisit the rest next quarter."
+)
+
+ERROR_FIELDS = {"error", "error_message", "validation_error_message"}
+
+
+def parse_latency(spec: str, rng: Optional[random.Random] = None) -> Callable[[], float]:
+    """
+    A sampler for time to first token, in seconds, from one of:
+    `0.5` or `fixed:0.5`, `uniform:LOW,HIGH`, `normal:MEAN,STDDEV`, `lognormal:MEDIAN,SIGMA`.
+    """
+    rng = rng or random.Random()
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "fixed", kind
+    values = [float(value) for value in params.split(",")]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(*values)
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, rng.gauss(*values))
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: median * rng.lognormvariate(0.0, sigma)
+    raise ValueError(f"Unrecognised latency distribution: {spec!r}")
+
+
+def example_from_schema(schema: dict, root: Optional[dict] = None, name: str = "value") -> Any:
+    """A small instance of a JSON schema: first enum value or non-null variant, bounded numbers, short lists."""
+    root = root if root is not None else schema
+    if "$ref" in schema:
+        definition = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            definition = definition[part]
+        return example_from_schema(definition, root, name)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            variants = [variant for variant in schema[key] if variant.get("type") != "null"]
+            return example_from_schema(variants[0] if variants else schema[key][0], root, name)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+    if isinstance(kind, list):
+        kind = next((item for item in kind if item != "null"), "null")
+    if kind == "object":
+        # Error fields stay empty, so replies read as successes
+        return {
+            key: None if key in ERROR_FIELDS else example_from_schema(value, root, key)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = max(schema.get("minItems", 0), min(2, schema.get("maxItems", 2)))
+        return [example_from_schema(schema.get("items", {}), root, name) for _ in range(count)]
+    if kind in ("integer", "number"):
+        low = schema.get("minimum", schema.get("exclusiveMinimum", 0))
+        high = schema.get("maximum", schema.get("exclusiveMaximum", 100))
+        middle = (low + high) / 2
+        return int(middle) if kind == "integer" else middle
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return f"Sample {name.replace('_', ' ')}"
+
+
+def _envelope(analysis_model: str, valid_key: str = "is_valid", error_key: str = "error_message") -> Callable[[], dict]:
+    """The validation wrapper the JSON-mode prompts ask for, around an instance of `analysis_model`."""
+    def build() -> dict:
+        # Imported on first use, so the registry below only needs the names
+        from app.api.models import (business_goal_model2, differentiation_model,
+                                    strategic_theme2_model, vision_model)
+        modules = (business_goal_model2, differentiation_model, strategic_theme2_model, vision_model)
+        model = next(getattr(module, analysis_model) for module in modules if hasattr(module, analysis_model))
+        return {valid_key: True, error_key: None, "analysis": example_from_schema(prompts.json_schema(model))}
+    return build
+
+
+# Reply for each JSON-mode prompt, by registered prompt name
+JSON_MODE_REPLIES: Dict[str, Callable[[], dict]] = {
+    "business_goal": _envelope("BusinessGoalAnalysisResponse", "is_input_valid", "validation_error_message"),
+    "differentiation": _envelope("DifferentiationResponse"),
+    "strategic_theme2_gap_detection": _envelope("GapDetectionResponse"),
+    "strategic_theme2_wording": _envelope("WordingSuggestionsResponse"),
+    "strategic_theme2_goal_mapping": _envelope("GoalMappingResponse"),
+    "vision": _envelope("VisionResponse"),
+}
+
+
+class FakeOpenAI:
+    """
+    The fake upstream as an ASGI app (`.app`). Serves POST /v1/chat/completions
+    (plain and streamed) and GET /stats with the calls seen so far.
+    """
+
+    def __init__(self, latency: str = "0.5", token_rate: float = 80.0, error_rate: float = 0.0,
+                 error_statuses: Sequence[int] = (500,), seed: Optional[int] = None):
+        self.random = random.Random(seed)
+        self.latency = parse_latency(latency, self.random)
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.completion_tokens = 0
+        self._prompt_names: Dict[str, str] = {}
+        self.app = Starlette(routes=[
+            Route("/v1/chat/completions", self.chat_completions, methods=["POST"]),
+            Route("/chat/completions", self.chat_completions, methods=["POST"]),
+            Route("/stats", self.stats_endpoint, methods=["GET"]),
+        ])
+
+    def _prompt_name(self, messages: List[dict]) -> Optional[str]:
+        if len(self._prompt_names) != len(prompts.REGISTRY):
+            self._prompt_names = {template.system: name for name, template in prompts.REGISTRY.items()}
+        system = messages[0].get("content") if messages and messages[0].get("role") == "system" else None
+        return self._prompt_names.get(system)
+
+    def reply_for(self, body: dict) -> str:
+        """The completion text for a chat-completions request body."""
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            return json.dumps(example_from_schema(response_format["json_schema"]["schema"]))
+        if response_format.get("type") == "json_object":
+            build = JSON_MODE_REPLIES.get(self._prompt_name(body.get("messages", [])))
+            return json.dumps(build() if build is not None else {"is_valid": True, "analysis": {}})
+        return PLAIN_TEXT_REPLY
+
+    def _error(self, model: str) -> Optional[Response]:
+        if not self.error_rate or self.random.random() >= self.error_rate:
+            return None
+        status = self.random.choice(self.error_statuses)
+        self.errors[(model, status)] += 1
+        headers = {"retry-after": "1"} if status == 429 else {}
+        return JSONResponse(
+            {"error": {"message": f"Injected {status} from the benchmark upstream.", "type": "benchmark", "code": None}},
+            status_code=status, headers=headers,
+        )
+
+    @staticmethod
+    def _chunks(content: str) -> Iterator[str]:
+        """The content in roughly token-sized pieces."""
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            yield content[start:start + CHARS_PER_TOKEN]
+
+    async def chat_completions(self, request: Request) -> Response:
+        body = await request.json()
+        model = body.get("model", "gpt-4o")
+        self.calls[model] += 1
+        await asyncio.sleep(self.latency())
+        error = self._error(model)
+        if error is not None:
+            return error
+
+        content = self.reply_for(body)
+        prompt_tokens = sum(count_tokens(message.get("content") or "") for message in body.get("messages", ()))
+        completion_tokens = count_tokens(content)
+        self.completion_tokens += completion_tokens
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(completion_tokens / self.token_rate)
+            return JSONResponse({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None, **extra: Any) -> str:
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                       "model": model, "choices": choices, **extra}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in self._chunks(content):
+                await asyncio.sleep(1 / self.token_rate)
+                yield chunk({"content": piece})
+            yield chunk({}, "stop")
+            if include_usage:
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "errors": {f"{model}:{status}": count for (model, status), count in self.errors.items()},
+            "completion_tokens": self.completion_tokens,
+        }
+
+    async def stats_endpoint(self, request: Request) -> Response:
+        return JSONResponse(self.stats())
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """The fake upstream's options, shared with benchmarks.suite."""
+    parser.add_argument("--latency", default="lognormal:0.6,0.35",
+                        help="Time to first token: SECONDS, uniform:LOW,HIGH, normal:MEAN,STDDEV or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-rate", type=float, default=80.0, help="Completion tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failed with one of --error-statuses")
+    parser.add_argument("--error-statuses", default="500,503,429", help="Comma-separated HTTP statuses to inject")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def from_arguments(args: argparse.Namespace) -> FakeOpenAI:
+    return FakeOpenAI(
+        latency=args.latency,
+        token_rate=args.token_rate,
+        error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",") if status],
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+    import main as application  # noqa: F401  registers every prompt, so JSON-mode calls are recognised
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(from_arguments(args).app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/priority_scheduling.py
+
+# Priority scheduling check. Limits gpt-4o to a few concurrent upstream
+# calls, floods it with bulk strategic-theme analyses (three calls each),
+# then sends interactive vision requests into the backlog. Both run on
+# gpt-4o, so they share one limiter and its slot queue. With priority
+# classes the vision calls skip the queued bulk calls. The "fifo" run ranks
+# every class equally for comparison. The latency metrics are reported per
+# class for both runs, along with the admission order: how many times an
+# interactive call was admitted ahead of a bulk call that had queued before it.
+#
+#   python -m benchmarks.priority_scheduling --bulk 12 --interactive 4 --latency 0.3
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+import httpx
+
+from app.core import metrics, rate_limit
+from app.core.cache import get_response_cache
+from app.core.config import settings
+from app.core.llm_client import close_llm_gateway, init_llm_gateway
+
+
+def _fake_upstream(latency: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": '{"is_valid": false, "error_message": "benchmark"}'},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+    return httpx.MockTransport(handler)
+
+
+def _p95(values: list) -> float:
+    return sorted(values)[max(0, round(len(values) * 0.95) - 1)]
+
+
+def _trace_admissions(admissions: list) -> None:
+    """Records (model, priority, queued_at, admitted_at) for every admitted upstream call."""
+    acquire = rate_limit.ModelLimiter.acquire
+
+    async def traced(self, estimated_tokens, deadline, priority="standard"):
+        queued_at = time.perf_counter()
+        lease = await acquire(self, estimated_tokens, deadline, priority)
+        admissions.append((self.model, priority, queued_at, time.perf_counter()))
+        return lease
+
+    rate_limit.ModelLimiter.acquire = traced
+
+
+def _overtakes(admissions: list) -> int:
+    """Pairs where an interactive call was admitted before a bulk call on the same model that queued earlier."""
+    return sum(
+        1
+        for model, priority, queued_at, admitted_at in admissions if priority == "interactive"
+        for other_model, other_priority, other_queued_at, other_admitted_at in admissions
+        if other_priority == "bulk" and other_model == model
+        and other_queued_at < queued_at and other_admitted_at > admitted_at
+    )
+
+
+async def run(mode: str, bulk: int, interactive: int, latency: float, admissions: list) -> dict:
+    from main import app
+
+    if mode == "fifo":
+        rate_limit._PRIORITY_RANK = dict.fromkeys(rate_limit._PRIORITY_RANK, 0)
+    await close_llm_gateway()
+    gateway = init_llm_gateway()
+    gateway._http_client._transport = _fake_upstream(latency)
+    cache = get_response_cache()
+    if cache is not None:
+        cache.clear()
+    metrics.REGISTRY["llm_admission_wait_seconds"]._series.clear()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        async def timed(path: str, body: dict) -> float:
+            started = time.perf_counter()
+            response = await client.post(path, json=body)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        bulk_requests = [
+            asyncio.create_task(timed("/api/strategic-theme2/combined-analysis", {
+                "themes": [{"name": f"{mode} theme {i}", "description": "Expand into new regions"}],
+                "context": {"vision": "Fresh bread for everyone"}, "tone": "advisor",
+            }))
+            for i in range(bulk)
+        ]
+        await asyncio.sleep(latency / 2)  # let the bulk calls fill the slots and the queue
+        bulk_queued = gateway.limiter.for_model("gpt-4o").waiting["bulk"]
+        interactive_latencies = await asyncio.gather(*[
+            timed("/api/blueprint/vision", {"vision_statement": f"{mode} vision {i}: the most trusted bakery", "tone": "coach"})
+            for i in range(interactive)
+        ])
+        bulk_latencies = await asyncio.gather(*bulk_requests)
+
+    waits = {
+        series["labels"]["priority"]: round(series["sum"] / series["count"], 3)
+        for series in metrics.REGISTRY["llm_admission_wait_seconds"].snapshot()
+        if series["labels"].get("model") == "gpt-4o"
+    }
+    models = {model: dict(limiter.admitted) for model, limiter in gateway.limiter._models.items()}
+    await close_llm_gateway()
+    return {
+        "mode": mode,
+        "admitted_by_model": models,
+        "bulk_calls_queued_when_interactive_sent": bulk_queued,
+        "interactive_overtook_queued_bulk": _overtakes(admissions),
+        "interactive_request_p50_s": round(statistics.median(interactive_latencies), 3),
+        "interactive_request_p95_s": round(_p95(interactive_latencies), 3),
+        "bulk_request_p50_s": round(statistics.median(bulk_latencies), 3),
+        "bulk_request_p95_s": round(_p95(bulk_latencies), 3),
+        "mean_admission_wait_s": waits,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bulk", type=int, default=12)
+    parser.add_argument("--interactive", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=3)
+    args = parser.parse_args()
+
+    settings.LLM_RATE_LIMITS = {"gpt-4o": {"rpm": 100000, "tpm": 10 ** 9, "concurrency": args.concurrency}}
+    settings.LLM_QUEUE_MAX_WAIT_SECONDS = 120.0
+    settings.LLM_QUEUE_MAX_WAITERS = 10 ** 6
+
+    admissions: list = []
+    _trace_admissions(admissions)
+    reports = []
+    for mode in ("priority", "fifo"):
+        admissions.clear()
+        reports.append(asyncio.run(run(mode, args.bulk, args.interactive, args.latency, admissions)))
+    print(json.dumps(reports, indent=2))
+    priority_run = reports[0]
+    if set(priority_run["admitted_by_model"]) != {"gpt-4o"}:
+        raise SystemExit("The bulk and interactive calls did not share one model's limiter.")
+    if not priority_run["bulk_calls_queued_when_interactive_sent"]:
+        raise SystemExit("No bulk calls were queued when the interactive requests arrived; raise --bulk.")
+    if not priority_run["interactive_overtook_queued_bulk"] or reports[1]["interactive_overtook_queued_bulk"]:
+        raise SystemExit("Interactive calls were not admitted ahead of bulk calls queued before them.")
+    if priority_run["interactive_request_p95_s"] >= reports[1]["interactive_request_p95_s"]:
+        raise SystemExit("Interactive requests were not scheduled ahead of queued bulk calls.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/prompt_prefix.py
+
+# Prompt-cache layout report. Calls every service with a mocked upstream,
+# captures the messages actually sent, and prints how many tokens the leading
+# system message holds, i.e. the prefix upstream caching can reuse. That the
+# prefix is byte-identical across requests and free of request data is
+# asserted in tests/test_prompt_prefix.py, which reuses the calls below.
+#
+#   python -m benchmarks.prompt_prefix
+
+import asyncio
+import json
+import os
+import time
+from typing import List, Set
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+import httpx
+
+from app.core.llm_client import init_llm_gateway
+from app.utils.tokens import count_tokens
+
+CAPTURED: List[dict] = []
+
+
+async def capture_upstream(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    CAPTURED.append(body)
+    return httpx.Response(200, json={
+        "id": "chatcmpl-benchmark",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"is_valid": false, "error_message": "benchmark"}'},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    })
+
+
+def service_calls(variant: int):
+    """Service calls for one variant. Every piece of request data contains `marker`."""
+    from app.api.models.business_goal_model2 import BusinessGoalAnalysisRequest
+    from app.api.models.challenge_model import (
+        ChallengeEvaluationRequest, ChallengeRecommendationRequest
+    )
+    from app.api.models.differentiation_model import DifferentiationRequest
+    from app.api.models.strategic_theme2_model import CombinedAnalysisRequest
+    from app.api.models.swot_model import SWOTDataInput
+    from app.api.models.trend_summary_model import TrendDataInput
+    from app.api.models.vision_model import VisionInput
+    from app.api.endpoints.chat_api import chat_manager
+    from app.services import (
+        business_goal_service2, challenge_risk_service, differentiation_service,
+        strategic_theme2_service, swot_service, trend_summary_service, vision_service
+    )
+
+    marker = f"MARKER{variant}"
+    tone = ("coach", "challenger")[variant]
+    swot = SWOTDataInput(strengths=[f"{marker} brand"], weaknesses=[f"{marker} cost"],
+                         opportunities=[f"{marker} export"], threats=[f"{marker} rivals"])
+    trends = TrendDataInput(
+        customer_insights=[{"question": f"{marker} q", "answer": f"{marker} a", "impact": "High"}],
+        on_the_radar=[{"question": f"{marker} radar", "answer": f"{marker} signal", "impact": "Low"}],
+        tone=tone,
+    )
+    challenge = {"title": f"{marker} churn", "category": "Market", "impact_on_business": "high",
+                 "ability_to_address": "moderate", "description": f"{marker} customers leave"}
+    themes = [{"name": f"{marker} growth", "description": f"{marker} expand"}]
+
+    return {
+        "vision": lambda: vision_service.process_vision(
+            VisionInput(vision_statement=f"{marker} be the best bakery", tone=tone)),
+        "swot": lambda: swot_service.generate_swot_analysis(swot),
+        "trends": lambda: trend_summary_service.generate_combined_summary_and_trends(trends),
+        "challenge_risk": lambda: challenge_risk_service.evaluate_challenge_risk(
+            ChallengeEvaluationRequest(challenge=challenge, swot=swot, trends=trends)),
+        "challenge_recommendations": lambda: challenge_risk_service.generate_challenge_recommendations(
+            ChallengeRecommendationRequest(challenges=[{**challenge, "risk_score": 70}], swot=swot, trends=trends)),
+        "business_goal": lambda: business_goal_service2.analyze_business_goals(BusinessGoalAnalysisRequest(
+            vision=f"{marker} vision", strategic_themes=themes,
+            challenges=[{**challenge, "risk_score": 70}], tone=tone,
+            goals=[{"title": f"{marker} goal", "description": f"{marker} grow revenue",
+                    "related_strategic_theme": f"{marker} growth", "priority": "High",
+                    "resource_readiness": "Partial", "assigned_functions": ["Sales"], "duration": "Short-term",
+                    "esg_issues": "No", "new_capabilities_needed": "No", "existing_capabilities_to_enhance": "Yes",
+                    "impact_ratings": {"risks": "High", "compliance": "Low", "culture": "Low",
+                                       "change_management": "Medium", "l_and_d": "Low", "capabilities": None}}])),
+        "strategic_theme2": lambda: strategic_theme2_service.generate_combined_analysis(
+            CombinedAnalysisRequest(themes=themes, tone=tone, context={"vision": f"{marker} vision"})),
+        "differentiation": lambda: differentiation_service.generate_differentiation_analysis(
+            DifferentiationRequest(capabilities=[f"{marker} pastry"])),
+        "chat": lambda: chat_manager.chat(user_id=f"benchmark-{marker}", prompt=f"{marker} how do I price?"),
+    }, marker
+
+
+async def static_prefixes(name: str, variant: int) -> tuple[Set[str], str]:
+    """Leading system messages sent upstream by one call of service `name`, and the call's marker."""
+    calls, marker = service_calls(variant)
+    CAPTURED.clear()
+    try:
+        await calls[name]()
+    except Exception:
+        pass  # only the outbound prompt matters here
+    await asyncio.sleep(0.05)  # let concurrent sub-calls (gather / background tasks) finish
+    return {body["messages"][0]["content"] for body in CAPTURED}, marker
+
+
+async def main() -> None:
+    gateway = init_llm_gateway()
+    gateway._http_client._transport = httpx.MockTransport(capture_upstream)
+
+    print(f"{'service':28} {'prefixes':>8} {'prefix tokens':>14}")
+    for name in service_calls(0)[0]:
+        prefixes, _ = await static_prefixes(name, 0)
+        tokens = min((count_tokens(prefix) for prefix in prefixes), default=0)
+        print(f"{name:28} {len(prefixes):>8} {tokens:>14}")
+
+    await gateway.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
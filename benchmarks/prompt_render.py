@@ -0,0 +1,127 @@
+# benchmarks/prompt_render.py
+
+# Micro-benchmark for prompt assembly. "before" rebuilds the prompt the way
+# the services used to on every request: generate the Pydantic JSON schema,
+# json.dumps it and format the whole system prompt as an f-string. "after"
+# is the current per-request path, which reuses the precompiled templates
+# from app.core.prompts and only adds the variable messages.
+#
+#   python -m benchmarks.prompt_render --iterations 2000
+
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+from app.api.models.business_goal_model2 import BusinessGoalAnalysisRequest, BusinessGoalAnalysisResponse
+from app.api.models.strategic_theme2_model import GapDetectionResponse, GoalMappingResponse, WordingSuggestionsResponse
+from app.api.models.vision_model import VisionInput, VisionResponse
+from app.services import business_goal_service2, strategic_theme2_service, vision_service
+
+VISION_REQUEST = VisionInput(vision_statement="To be the most trusted neighbourhood bakery in every city we serve.", tone="advisor")
+GOAL_REQUEST = BusinessGoalAnalysisRequest(
+    vision="Fresh bread for everyone",
+    strategic_themes=[{"name": "Growth", "description": "Open new stores"}],
+    challenges=[{"title": "Rising flour cost", "category": "Supply", "impact_on_business": "high",
+                 "ability_to_address": "moderate", "description": "Wheat prices doubled", "risk_score": 70}],
+    tone="challenger",
+    goals=[{"title": "Open 5 stores", "description": "Expand into two new cities", "related_strategic_theme": "Growth",
+            "priority": "High", "resource_readiness": "Partial", "assigned_functions": ["Operations"],
+            "duration": "Medium-term", "esg_issues": "No", "new_capabilities_needed": "Yes",
+            "existing_capabilities_to_enhance": "Yes",
+            "impact_ratings": {"risks": "High", "compliance": "Low", "culture": "Medium",
+                               "change_management": "Medium", "l_and_d": "Low", "capabilities": "Medium"}}],
+)
+
+
+def vision_before() -> list:
+    schema = {
+        "type": "object",
+        "properties": {
+            "is_valid": {"type": "boolean"},
+            "error_message": {"type": "string", "description": "Reason for invalid input, if applicable."},
+            "analysis": VisionResponse.model_json_schema()
+        },
+        "required": ["is_valid"]
+    }
+    system_prompt = f"""
+    ✳️ Vision Statement Evaluation Prompt
+    {vision_service.TONE_GUIDELINES.get(VISION_REQUEST.tone)}
+    Vision Statement:
+    {VISION_REQUEST.vision_statement}
+    {vision_service.VISION_PROMPT.system}
+    {json.dumps(schema, indent=2)}
+    """
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": VISION_REQUEST.vision_statement}]
+
+
+def vision_after() -> list:
+    return vision_service._build_messages(VISION_REQUEST)
+
+
+def business_goal_before() -> list:
+    schema = {
+        "type": "object",
+        "properties": {
+            "is_input_valid": {"type": "boolean"},
+            "validation_error_message": {"type": "string"},
+            "analysis": BusinessGoalAnalysisResponse.model_json_schema()
+        },
+        "required": ["is_input_valid", "validation_error_message"]
+    }
+    system_prompt = f"""
+    You are an expert Chief Strategy Officer. {business_goal_service2.TONE_GUIDELINES.get(GOAL_REQUEST.tone)}
+    {business_goal_service2.BUSINESS_GOAL_PROMPT.system}
+    {json.dumps(schema, indent=2)}
+    """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": business_goal_service2._format_prompt_for_goal_analysis(GOAL_REQUEST)},
+    ]
+
+
+def business_goal_after() -> list:
+    return business_goal_service2._build_messages(GOAL_REQUEST)
+
+
+def strategic_theme2_before() -> list:
+    return [
+        f"{strategic_theme2_service.INSTRUCTIONS} {model.model_json_schema()}"
+        for model in (GapDetectionResponse, WordingSuggestionsResponse, GoalMappingResponse)
+    ]
+
+
+def strategic_theme2_after() -> list:
+    return [
+        template.messages({"role": "system", "content": "tone"})
+        for template in (strategic_theme2_service.GAP_DETECTION_PROMPT,
+                         strategic_theme2_service.WORDING_SUGGESTIONS_PROMPT,
+                         strategic_theme2_service.GOAL_MAPPING_PROMPT)
+    ]
+
+
+CASES = {
+    "vision": (vision_before, vision_after),
+    "business_goal": (business_goal_before, business_goal_after),
+    "strategic_theme2": (strategic_theme2_before, strategic_theme2_after),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'prompt':18} {'before µs':>10} {'after µs':>10} {'speed-up':>9}")
+    for name, (before, after) in CASES.items():
+        before_us = min(timeit.repeat(before, number=args.iterations, repeat=3)) / args.iterations * 1e6
+        after_us = min(timeit.repeat(after, number=args.iterations, repeat=3)) / args.iterations * 1e6
+        print(f"{name:18} {before_us:>10.1f} {after_us:>10.1f} {before_us / after_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# benchmarks/suite.py
+
+# End-to-end benchmark suite. Drives every router mounted in main.py with a
+# fixed number of requests at a given concurrency, against the fake upstream
+# from benchmarks.fake_openai, and writes a JSON report with throughput,
+# p50/p95/p99 latency and event-loop lag per scenario. The report has
+# stable keys, so two runs, e.g. before and after a release, can be diffed
+# directly.
+#
+# Responses are requested with X-Cache-Bypass, so every request runs the
+# full path; pass --cache to measure with the response cache instead.
+#
+#   python -m benchmarks.suite --requests 40 --concurrency 8 --output bench.json
+#   python -m benchmarks.suite --only chatbot,vision --latency uniform:0.2,0.6 --error-rate 0.05
+#
+# With --app-url the suite drives a running server over HTTP instead (start
+# it against `python -m benchmarks.fake_openai`); event-loop lag is then not
+# measured, since the server's loop is in another process, but time to
+# first byte is reported for the streamed routes. (In process, httpx's ASGI
+# transport buffers the whole response, so first-byte times would only
+# repeat the total.)
+#
+# With LLM_CASSETTE_MODE the fake sits under the gateway's cassette. To
+# benchmark against real payloads offline, record one run against OpenAI,
+# then replay it (the scenarios send the same requests every run):
+#
+#   LLM_CASSETTE_MODE=record OPENAI_API_KEY=sk-... python -m benchmarks.suite --upstream openai --only trends,swot,vision,business_goal
+#   LLM_CASSETTE_MODE=replay python -m benchmarks.suite --only trends,swot,vision,business_goal
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+import httpx
+
+from app.core.cache import get_response_cache
+from app.core.llm_client import close_llm_gateway, get_llm_gateway, init_llm_gateway
+from benchmarks import fake_openai
+
+# (status code, seconds to the first response byte)
+Outcome = Tuple[int, float]
+
+
+class Scenario(NamedTuple):
+    name: str
+    router: str  # mount prefix in main.py; used to check every router is covered
+    call: Callable[[httpx.AsyncClient, int], Awaitable[Outcome]]
+
+
+SWOT = {
+    "strengths": ["Loyal local customers", "Award-winning sourdough"],
+    "weaknesses": ["Single production site"],
+    "opportunities": ["Wholesale to cafes", "Online pre-orders"],
+    "threats": ["Rising flour prices"],
+}
+TRENDS = {
+    "customer_insights": [{"question": "What do customers value?", "answer": "Freshness and provenance", "impact": "High"}],
+    "competitor_landscape": [{"question": "Who competes?", "answer": "Two supermarket in-store bakeries", "impact": "Medium"}],
+    "technological_advances": [{"question": "What is changing?", "answer": "Online ordering and delivery apps", "impact": "High"}],
+    "on_the_radar": [{"question": "Anything else?", "answer": "Plant-based demand", "impact": "Medium"}],
+    "tone": "advisor",
+}
+CHALLENGE = {
+    "title": "Ingredient cost inflation",
+    "category": "Financial",
+    "impact_on_business": "high",
+    "ability_to_address": "moderate",
+    "description": "Flour and butter prices rose 30% this year and squeeze margins.",
+}
+THEMES = [
+    {"name": "Regional expansion", "description": "Open two new shops in neighbouring towns"},
+    {"name": "Digital ordering", "description": "Let customers pre-order online for pickup"},
+]
+GOAL = {
+    "title": "Open a second shop",
+    "description": "Open a second shop in the neighbouring town within 18 months.",
+    "related_strategic_theme": "Regional expansion",
+    "priority": "High",
+    "resource_readiness": "Partial",
+    "assigned_functions": ["Operations", "Finance"],
+    "duration": "Medium-term",
+    "impact_ratings": {"risks": "Medium", "compliance": "Low", "culture": "Medium",
+                       "change_management": "Medium", "l_and_d": "Low", "capabilities": "Medium"},
+    "esg_issues": "No",
+    "new_capabilities_needed": "Yes",
+    "existing_capabilities_to_enhance": "Yes",
+}
+
+
+def _business_goal(i: int) -> dict:
+    return {"vision": "Fresh bread for every neighbourhood", "strategic_themes": THEMES, "tone": "advisor",
+            "challenges": [{**CHALLENGE, "risk_score": 70}], "goals": [{**GOAL, "title": f"Open shop {i}"}]}
+
+
+def _themes(i: int) -> dict:
+    return {"themes": [{**THEMES[0], "name": f"Regional expansion {i}"}, THEMES[1]],
+            "context": {"vision": "Fresh bread for every neighbourhood", "swot": SWOT}, "tone": "advisor"}
+
+
+async def _get(client: httpx.AsyncClient, path: str) -> Outcome:
+    started = time.perf_counter()
+    response = await client.get(path)
+    return response.status_code, time.perf_counter() - started
+
+
+async def _post(client: httpx.AsyncClient, path: str, body: dict) -> Outcome:
+    started = time.perf_counter()
+    response = await client.post(path, json=body)
+    return response.status_code, time.perf_counter() - started
+
+
+async def _stream(client: httpx.AsyncClient, path: str, body: dict) -> Outcome:
+    started = time.perf_counter()
+    first_byte = None
+    async with client.stream("POST", path, json=body) as response:
+        async for _ in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+    return response.status_code, first_byte if first_byte is not None else time.perf_counter() - started
+
+
+async def _context_round_trip(client: httpx.AsyncClient, i: int) -> Outcome:
+    started = time.perf_counter()
+    response = await client.post("/api/context", json={"vision": f"Fresh bread for neighbourhood {i}", "swot": SWOT})
+    if response.status_code == 200:
+        response = await client.get(f"/api/context/{response.json()['context_id']}")
+    return response.status_code, time.perf_counter() - started
+
+
+async def _job(client: httpx.AsyncClient, i: int) -> Outcome:
+    """Submits a trends job and polls its result until it is ready; the latency covers the whole job."""
+    started = time.perf_counter()
+    response = await client.post("/api/jobs/trends", json={**TRENDS, "mission": f"Bake for neighbourhood {i}"})
+    if response.status_code != 202:
+        return response.status_code, time.perf_counter() - started
+    job_id = response.json()["job_id"]
+    while True:
+        response = await client.get(f"/api/jobs/{job_id}/result")
+        if response.status_code != 202:
+            return response.status_code, time.perf_counter() - started
+        await asyncio.sleep(0.05)
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("trends", "/api/trends", lambda c, i: _post(c, "/api/trends/analyze", {**TRENDS, "mission": f"Bake {i}"})),
+    Scenario("trends_stream", "/api/trends", lambda c, i: _stream(c, "/api/trends/analyze/stream", {**TRENDS, "mission": f"Bake {i}"})),
+    Scenario("swot", "/api/swot", lambda c, i: _post(c, "/api/swot/analysis", {**SWOT, "threats": [f"Rising flour prices ({i})"]})),
+    Scenario("challenge_evaluate", "/api/challenge", lambda c, i: _post(c, "/api/challenge/evaluate", {
+        "challenge": {**CHALLENGE, "title": f"Ingredient cost inflation {i}"}, "swot": SWOT, "trends": TRENDS})),
+    Scenario("challenge_evaluate_batch", "/api/challenge", lambda c, i: _post(c, "/api/challenge/evaluate-batch", {
+        "challenges": [{**CHALLENGE, "title": f"Ingredient cost inflation {i}"}, {**CHALLENGE, "title": f"Staff turnover {i}"}],
+        "swot": SWOT, "trends": TRENDS})),
+    Scenario("challenge_recommendations", "/api/challenge", lambda c, i: _post(c, "/api/challenge/recommendations", {
+        "challenges": [{**CHALLENGE, "title": f"Ingredient cost inflation {i}", "risk_score": 70}], "swot": SWOT, "trends": TRENDS})),
+    Scenario("vision", "/api/blueprint", lambda c, i: _post(c, "/api/blueprint/vision", {
+        "vision_statement": f"To be the most trusted neighbourhood bakery in region {i}", "tone": "coach"})),
+    Scenario("strategic_theme2", "/api/strategic-theme2", lambda c, i: _post(c, "/api/strategic-theme2/combined-analysis", _themes(i))),
+    Scenario("differentiation", "/api/differentiation", lambda c, i: _post(c, "/api/differentiation/analyze", {
+        "capabilities": [f"Artisan sourdough baking {i}", "Same-day local delivery"]})),
+    Scenario("business_goal", "/api/business-goal", lambda c, i: _post(c, "/api/business-goal/analyze2", _business_goal(i))),
+    Scenario("business_goal_stream", "/api/business-goal", lambda c, i: _stream(c, "/api/business-goal/analyze2/stream", _business_goal(i))),
+    Scenario("chatbot", "/api/chatbot", lambda c, i: _post(c, "/api/chatbot/chatbot", {
+        "message": "How should I prioritise my goals?", "session_id": f"benchmark-{i}"})),
+    Scenario("chatbot_stream", "/api/chatbot", lambda c, i: _stream(c, "/api/chatbot/chatbot/stream", {
+        "message": "How should I prioritise my goals?", "session_id": f"benchmark-stream-{i}"})),
+    Scenario("context", "/api/context", _context_round_trip),
+    Scenario("jobs", "/api/jobs", _job),
+    Scenario("ops", "/api/ops", lambda c, i: _get(c, "/api/ops/llm")),
+]
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a task that sleeps `interval` seconds."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def __enter__(self) -> "LoopLagMonitor":
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._task.cancel()
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 4)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1], 4),
+            "mean": round(statistics.fmean(ordered), 4)}
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int,
+                       in_process: bool) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(i: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            try:
+                status, first_byte = await scenario.call(client, i)
+            except httpx.HTTPError as e:
+                status, first_byte = type(e).__name__, None
+            statuses[str(status)] += 1
+            if isinstance(status, int) and status < 400:
+                latencies.append(time.perf_counter() - started)
+                first_bytes.append(first_byte)
+
+    lag = LoopLagMonitor()
+    started = time.perf_counter()
+    if in_process:
+        with lag:
+            await asyncio.gather(*[one(i) for i in range(requests)])
+    else:
+        await asyncio.gather(*[one(i) for i in range(requests)])
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "requests": requests,
+        "ok": len(latencies),
+        "statuses": dict(sorted(statuses.items())),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_s": _percentiles(latencies),
+        "event_loop_lag_s": _percentiles(lag.samples) if in_process else None,
+    }
+    if scenario.name.endswith("_stream"):
+        report["first_byte_s"] = None if in_process else _percentiles(first_bytes)
+    return report
+
+
+def _uncovered_routers(app, scenarios: List[Scenario]) -> List[str]:
+    """Router prefixes mounted in main.py that no scenario exercises."""
+    covered = {scenario.router for scenario in scenarios}
+    mounted = {"/".join(path.split("/")[:3]) for path in app.openapi()["paths"] if path.startswith("/api/")}
+    return sorted(mounted - covered)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from main import app
+
+    scenarios = [scenario for scenario in SCENARIOS if not args.only or scenario.name in args.only.split(",")]
+    in_process = args.app_url is None
+    upstream = fake_openai.from_arguments(args)
+    headers = {} if args.cache else {"X-Cache-Bypass": "1"}
+
+    if in_process:
+        await close_llm_gateway()
+        gateway = init_llm_gateway()
+        if args.upstream == "fake":
+            fake_transport = httpx.ASGITransport(app=upstream.app)
+            if gateway.cassette is not None:
+                gateway.cassette.inner = fake_transport
+            else:
+                gateway._http_client._transport = fake_transport
+        cache = get_response_cache()
+        if cache is not None:
+            cache.clear()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+    else:
+        transport = None
+        base_url = args.app_url
+
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, headers=headers, timeout=args.timeout) as client:
+        for scenario in scenarios:
+            # One warm-up call, so lazy imports and connection setup are not measured
+            await scenario.call(client, -1)
+            results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency, in_process)
+
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "target": "in-process" if in_process else args.app_url,
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+            "upstream": {"kind": args.upstream, "latency": args.latency, "token_rate": args.token_rate,
+                         "error_rate": args.error_rate, "error_statuses": args.error_statuses},
+        },
+        "uncovered_routers": _uncovered_routers(app, scenarios) if not args.only else [],
+        "scenarios": results,
+    }
+    if in_process:
+        report["upstream"] = upstream.stats() if args.upstream == "fake" else None
+        gateway = get_llm_gateway().stats()
+        report["gateway"] = {key: gateway[key] for key in ("total_requests", "failed_requests", "peak_in_flight")}
+        if gateway["cassette"] is not None:
+            report["cassette"] = {key: gateway["cassette"][key] for key in ("mode", "recorded", "hits", "misses")}
+        await close_llm_gateway()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight per scenario")
+    parser.add_argument("--only", default="", help="Comma-separated scenario names: " + ",".join(s.name for s in SCENARIOS))
+    parser.add_argument("--cache", action="store_true", help="Let the response cache answer repeated requests")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--app-url", default=None, help="Drive a running server instead of the app in process")
+    parser.add_argument("--upstream", choices=("fake", "openai"), default="fake",
+                        help="Upstream for the in-process app: the local fake, or the real API (e.g. to record a cassette)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    fake_openai.add_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if report["uncovered_routers"]:
+        raise SystemExit(f"No scenario covers: {', '.join(report['uncovered_routers'])}")
+
+
+if __name__ == "__main__":
+    main()
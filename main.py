@@ -1,13 +1,36 @@
 # main.py
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import strategic_theme2, trend_summary,swot_analysis,challenge_risk, vision, differentiation, chat_api, business_goal2 
+from app.api.endpoints import strategic_theme2, trend_summary,swot_analysis,challenge_risk, vision, differentiation, chat_api, business_goal2, context, ops, jobs
+from app.core import metrics
+from app.core.llm_client import init_llm_gateway, close_llm_gateway
+from app.core.jobs import start_job_queue, stop_job_queue
+from app.core.middleware import CancelOnDisconnectMiddleware, MetricsMiddleware, ProfilingMiddleware
+from app.core.rate_limit import UpstreamOverloaded
+from app.core.request_context import bind_request_context, bind_route, priority_class
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One shared upstream connection pool for the whole process
+    app.state.llm_gateway = init_llm_gateway()
+    # Worker pool for background analysis jobs
+    app.state.job_queue = start_job_queue()
+    yield
+    await stop_job_queue()
+    await close_llm_gateway()
+
 
 app = FastAPI(
     title="Zenith AI API",
     description="API for strategic business analysis, including Trends and SWOT.",
-    version="1.2.1"
+    version="1.2.1",
+    lifespan=lifespan,
+    # Route template for per-route token and cost metrics
+    dependencies=[Depends(bind_route)]
 )
 
 # CORS configuration
@@ -19,10 +42,42 @@ app.add_middleware(
     allow_headers=["*"], 
 )
 
+# Per-request context (cache bypass, deadline, ...) read from headers:
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    bind_request_context(request)
+    return await call_next(request)
+
+# Stage timings (Server-Timing) for requests sent with X-Profile: 1 or sampled
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency per route and requests in flight, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Cancel a request's handler (and its upstream calls) when the client disconnects.
+# Added last so it is the outermost middleware and wraps the ones above.
+app.add_middleware(CancelOnDisconnectMiddleware)
+
+# Upstream calls shed locally: 429 (rate limit), 503 (queue / open circuit) or 504 (deadline), with Retry-After
+@app.exception_handler(UpstreamOverloaded)
+async def upstream_overloaded_handler(request: Request, exc: UpstreamOverloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": exc.retry_after_header}
+    )
+
+# Upstream calls are scheduled by priority class: chat and vision are
+# interactive, the long multi-call analyses (and jobs) are bulk, and every
+# other route is standard. Classes are ranked within each model's limiter
+# (see app/core/rate_limit.py), so this lets vision overtake the bulk
+# analyses on gpt-4o; chat has gpt-4 to itself.
+
 # trend_summary route:
 app.include_router(
     trend_summary.router, 
-    prefix="/api/trends"
+    prefix="/api/trends",
+    dependencies=[Depends(priority_class("bulk"))]
 )
 
 # swot_analysis route:
@@ -40,14 +95,16 @@ app.include_router(
 # vision route:
 app.include_router(
     vision.router,
-    prefix="/api/blueprint"
+    prefix="/api/blueprint",
+    dependencies=[Depends(priority_class("interactive"))]
 )
 
 # strategic_theme2 route:
 app.include_router(
     strategic_theme2.router,
     prefix="/api/strategic-theme2",
-    tags=["Strategic Theme2"] 
+    tags=["Strategic Theme2"],
+    dependencies=[Depends(priority_class("bulk"))]
 )
 
 # differentiation route:
@@ -61,16 +118,45 @@ app.include_router(
 app.include_router(
     business_goal2.router,
     prefix="/api/business-goal",
-    tags=["Business Goals"] 
+    tags=["Business Goals"],
+    dependencies=[Depends(priority_class("bulk"))]
 )
 
 # chat_api route:
 app.include_router(
     chat_api.router,
     prefix="/api/chatbot",
-    tags=["Chatbot"]
+    tags=["Chatbot"],
+    dependencies=[Depends(priority_class("interactive"))]
 )
 
+# context route:
+app.include_router(
+    context.router,
+    prefix="/api/context",
+    tags=["Strategy Context"]
+)
+
+# jobs route:
+app.include_router(
+    jobs.router,
+    prefix="/api/jobs",
+    tags=["Jobs"],
+    dependencies=[Depends(priority_class("bulk"))]
+)
+
+# ops route:
+app.include_router(
+    ops.router,
+    prefix="/api/ops",
+    tags=["Ops"]
+)
+
+# Prometheus scrape endpoint (the same metrics as JSON: /api/ops/metrics)
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Root endpoint:
 @app.get("/", tags=["Root"])
 def read_root():
@@ -81,12 +167,20 @@ def read_root():
             "trends_analysis": "/api/trends/analyze",
             "swot_analysis": "/api/swot/analysis",
             "challenge_risk_evaluate": "/api/challenge/evaluate",
+            "challenge_risk_evaluate_batch": "/api/challenge/evaluate-batch",
             "challenge_risk_recommendations": "/api/challenge/recommendations",
             "vision_analysis": "/api/blueprint/vision",
             "strategic_theme2_combined": "/api/strategic-theme2/combined-analysis",
             "differentiation_analysis": "/api/differentiation/analyze",
             "business_goal_analysis": "/api/business-goal/analyze2",
-            "chatbot": "/api/chatbot/chatbot"
+            "chatbot": "/api/chatbot/chatbot",
+            "chatbot_stream": "/api/chatbot/chatbot/stream",
+            "strategy_context_upload": "/api/context",
+            "jobs_submit": "/api/jobs/{business-goal|trends|strategic-theme2}",
+            "jobs_status": "/api/jobs/{job_id}",
+            "jobs_result": "/api/jobs/{job_id}/result",
+            "llm_gateway_stats": "/api/ops/llm",
+            "cache_stats": "/api/ops/cache"
             
         }
     }
@@ -0,0 +1,8 @@
+# tests/conftest.py
+
+import os
+
+# Settings require the provider keys; the tests never call out
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("GROQ_API_KEY", "unused")
@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+
+from app.memory.backends import MemoryBackend, SQLiteBackend
+from app.memory.chat_store import ChatSessionStore
+from app.memory.job_store import JobStore
+
+
+def test_memory_backend_counts_utf8_bytes():
+    backend = MemoryBackend(max_entries=10)
+    backend.set("a", "é" * 10)
+    assert backend.stats()["bytes"] == 20
+
+
+def test_memory_backend_evicts_over_max_bytes():
+    backend = MemoryBackend(max_entries=10, max_bytes=50)
+    backend.set("a", "é" * 10)
+    backend.set("b", "é" * 10)
+    backend.set("c", "é" * 10)
+    assert backend.get("a") is None
+    assert backend.get("b") is not None and backend.get("c") is not None
+
+
+def test_sqlite_backend_evicts_least_recently_used_over_max_bytes(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "kv.db"), max_bytes=50)
+    backend.set("a", "é" * 10)
+    backend.set("b", "é" * 10)
+    backend.get("a")
+    backend.set("c", "é" * 10)
+    assert backend.get("b") is None
+    assert backend.get("a") is not None and backend.get("c") is not None
+    assert backend.stats()["bytes"] == 40
+
+
+def test_sqlite_backend_keeps_the_new_entry_even_if_oversized(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "kv.db"), max_bytes=10)
+    backend.set("a", "x" * 5)
+    backend.set("b", "x" * 20)
+    assert backend.get("a") is None
+    assert backend.get("b") == "x" * 20
+
+
+def test_sqlite_backend_sizes_rows_of_older_files(tmp_path):
+    path = str(tmp_path / "kv.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)")
+    conn.execute("INSERT INTO kv VALUES ('a', 'ééé', NULL, 0)")
+    conn.commit()
+    conn.close()
+    assert SQLiteBackend(path).stats()["bytes"] == 6
+
+
+def test_chat_summaries_do_not_evict_sessions():
+    store = ChatSessionStore(MemoryBackend(max_entries=2), MemoryBackend(max_entries=2), max_messages=20)
+
+    async def scenario():
+        await store.append_turn("one", "hi", "hello")
+        await store.append_turn("two", "hi", "hello")
+        await store.set_summary("one", {"summary": "s", "folded": []})
+        await store.set_summary("two", {"summary": "s", "folded": []})
+        return await store.get_history("one"), await store.get_summary("two")
+
+    history, summary = asyncio.run(scenario())
+    assert len(history) == 2
+    assert summary == {"summary": "s", "folded": []}
+
+
+def test_job_update_does_not_recreate_a_missing_record(tmp_path):
+    store = JobStore(SQLiteBackend(str(tmp_path / "jobs.db")), ttl_seconds=60)
+
+    async def scenario():
+        updated = await store.update("gone", status="running")
+        return updated, await store.get("gone")
+
+    assert asyncio.run(scenario()) == (False, None)
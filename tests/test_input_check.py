@@ -0,0 +1,39 @@
+# tests/test_input_check.py
+
+import pytest
+
+from app.core.input_check import check_inputs, check_text
+
+
+@pytest.mark.parametrize("text", ["B2B", "KPI OKR ROI", "SMB GTM", "Q4 GTM", "UX UI", "QA QC", "XYZ Ltd", "B2B SaaS onboarding"])
+def test_acronyms_and_codes_are_left_to_the_llm(text):
+    assert check_text(text).status == "uncertain"
+
+
+def test_one_acronym_does_not_fail_the_whole_request():
+    assert check_inputs("differentiation", ["Cloud consulting", "B2B"]).status == "uncertain"
+
+
+@pytest.mark.parametrize("text", ["", "   ", "!!!", "12345", "aaaaaaaa", "asdfghjkl", "qwerty", "sdfkjh sdkjfh wieury", "xkqzjv wplm", "lkjsdf lkj lkjsdf"])
+def test_garbage_is_rejected(text):
+    verdict = check_text(text)
+    assert verdict.status == "invalid"
+    assert verdict.reason
+
+
+@pytest.mark.parametrize("text", ["Pastry", "Rhythm", "Kubernetes", "dkfj", "Why did the chicken cross the road?", "Nous voulons devenir le leader du marché"])
+def test_short_words_names_and_other_languages_are_uncertain(text):
+    assert check_text(text).status == "uncertain"
+
+
+@pytest.mark.parametrize("text", [
+    "To be the most innovative and sustainable tech solutions provider in emerging markets.",
+    "Open three new shops in Leeds by 2026",
+])
+def test_plain_business_english_is_valid(text):
+    assert check_text(text).status == "valid"
+
+
+def test_any_invalid_field_rejects_the_request():
+    verdict = check_inputs("strategic_theme2", ["Regional expansion into the north of England", "xkqzjv wplm"])
+    assert verdict.status == "invalid"
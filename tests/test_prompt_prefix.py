@@ -0,0 +1,28 @@
+# tests/test_prompt_prefix.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.llm_client import close_llm_gateway, init_llm_gateway
+from benchmarks.prompt_prefix import capture_upstream, service_calls, static_prefixes
+
+
+async def _two_requests(name):
+    gateway = init_llm_gateway()
+    gateway._http_client._transport = httpx.MockTransport(capture_upstream)
+    try:
+        return await static_prefixes(name, 0), await static_prefixes(name, 1)
+    finally:
+        await close_llm_gateway()
+
+
+@pytest.mark.parametrize("name", list(service_calls(0)[0]))
+def test_leading_system_message_is_the_same_across_requests(name):
+    # Upstream prefix caching only applies to a prompt prefix that repeats exactly
+    (first, marker0), (second, marker1) = asyncio.run(_two_requests(name))
+    assert first, "no call reached the upstream"
+    assert first == second
+    assert not any(marker0 in prefix for prefix in first)
+    assert not any(marker1 in prefix for prefix in second)